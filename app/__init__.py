@@ -11,7 +11,7 @@ db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     
     # Configuration
@@ -19,13 +19,106 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///games.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Pending order expiry
+    app.config['PENDING_ORDER_TTL_MINUTES'] = int(os.environ.get('PENDING_ORDER_TTL_MINUTES', 24 * 60))
+    app.config['ORDER_SWEEP_INTERVAL'] = int(os.environ.get('ORDER_SWEEP_INTERVAL', 0))  # detik, 0 = nonaktif
+    app.config['ORDER_SWEEP_BATCH_SIZE'] = int(os.environ.get('ORDER_SWEEP_BATCH_SIZE', 500))
+    
+    # Cart store: 'database', 'memory' atau 'file'
+    app.config['CART_STORE'] = os.environ.get('CART_STORE', 'database')
+    app.config['CART_STORE_PATH'] = os.environ.get('CART_STORE_PATH')
+    
+    # Cache facet kategori (detik)
+    app.config['CATEGORY_CACHE_TTL'] = int(os.environ.get('CATEGORY_CACHE_TTL', 60))
+    
+    # Catalog read model
+    app.config['CATALOG_CACHE_MAX_BYTES'] = int(os.environ.get('CATALOG_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['CATALOG_CACHE_TTL'] = int(os.environ.get('CATALOG_CACHE_TTL', 300))
+    
+    # Cache bus antar worker: 'auto', 'postgres', 'file' atau 'none'
+    app.config['CACHE_BUS'] = os.environ.get('CACHE_BUS', 'auto')
+    app.config['CACHE_BUS_PATH'] = os.environ.get('CACHE_BUS_PATH')
+    app.config['CACHE_BUS_POLL_INTERVAL'] = float(os.environ.get('CACHE_BUS_POLL_INTERVAL', 0.05))
+    
+    # Typeahead /search
+    app.config['TYPEAHEAD_CACHE_SIZE'] = int(os.environ.get('TYPEAHEAD_CACHE_SIZE', 1024))
+    app.config['TYPEAHEAD_POPULARITY_TTL'] = int(os.environ.get('TYPEAHEAD_POPULARITY_TTL', 600))
+    
+    # Keyset pagination
+    app.config['PAGE_SIZE'] = int(os.environ.get('PAGE_SIZE', 24))
+    app.config['ADMIN_PAGE_SIZE'] = int(os.environ.get('ADMIN_PAGE_SIZE', 50))
+    app.config['MAX_PAGE_SIZE'] = int(os.environ.get('MAX_PAGE_SIZE', 100))
+    app.config['COUNT_CACHE_TTL'] = int(os.environ.get('COUNT_CACHE_TTL', 60))
+    
+    # Detektor N+1: 'off', 'log' atau 'raise' (default 'log' saat debug)
+    app.config['NPLUSONE_ACTION'] = os.environ.get('NPLUSONE_ACTION', 'log' if app.debug else 'off')
+    app.config['NPLUSONE_THRESHOLD'] = int(os.environ.get('NPLUSONE_THRESHOLD', 5))
+    
+    # Instrumentasi per request (SQL, template, Server-Timing)
+    app.config['PERF_MONITOR'] = os.environ.get('PERF_MONITOR', '1') == '1'
+    app.config['PERF_RING_SIZE'] = int(os.environ.get('PERF_RING_SIZE', 512))
+    # Header Server-Timing: '0' mati, 'admin' hanya untuk admin, '1' untuk semua (development)
+    app.config['PERF_SERVER_TIMING'] = os.environ.get('PERF_SERVER_TIMING', '0')
+    
+    # Slow query log (ms, negatif = nonaktif) dengan EXPLAIN otomatis
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 100))
+    app.config['SLOW_QUERY_LOG'] = os.environ.get('SLOW_QUERY_LOG')
+    app.config['SLOW_QUERY_EXPLAIN'] = os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+    
+    # Snapshot statistik dashboard admin (detik)
+    app.config['DASHBOARD_CACHE_TTL'] = int(os.environ.get('DASHBOARD_CACHE_TTL', 15))
+    
+    # Verifikasi pembayaran massal: maksimum order per submit
+    app.config['BULK_VERIFY_MAX_ORDERS'] = int(os.environ.get('BULK_VERIFY_MAX_ORDERS', 500))
+    
+    # Import katalog: thread untuk memindahkan gambar ke Cloudinary
+    app.config['CATALOG_IMAGE_WORKERS'] = int(os.environ.get('CATALOG_IMAGE_WORKERS', 4))
+    
+    # Antrian media: upload/hapus Cloudinary dikerjakan worker, bukan request
+    app.config['MEDIA_SCRATCH_DIR'] = os.environ.get('MEDIA_SCRATCH_DIR')  # default instance/media_scratch
+    app.config['MEDIA_SCRATCH_SHARED'] = os.environ.get('MEDIA_SCRATCH_SHARED', '0') == '1'
+    app.config['MEDIA_WORKER_THREADS'] = int(os.environ.get('MEDIA_WORKER_THREADS', 2))  # 0 = hanya `flask media-worker`
+    app.config['MEDIA_POLL_INTERVAL'] = float(os.environ.get('MEDIA_POLL_INTERVAL', 1.0))
+    app.config['MEDIA_JOB_MAX_ATTEMPTS'] = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 5))
+    app.config['MEDIA_RETRY_BASE'] = float(os.environ.get('MEDIA_RETRY_BASE', 2.0))  # detik
+    app.config['MEDIA_RETRY_MAX'] = float(os.environ.get('MEDIA_RETRY_MAX', 300))
+    app.config['MEDIA_JOB_TIMEOUT'] = int(os.environ.get('MEDIA_JOB_TIMEOUT', 300))
+    app.config['CLOUDINARY_FAKE'] = os.environ.get('CLOUDINARY_FAKE', '0') == '1'  # dev/offline
+    
+    # Media storage: 'cloudinary', 'local' atau 's3'; tanpa kredensial Cloudinary pakai disk lokal
+    has_cloudinary = bool(os.environ.get('CLOUDINARY_CLOUD_NAME')) or app.config['CLOUDINARY_FAKE']
+    app.config['MEDIA_STORAGE'] = os.environ.get('MEDIA_STORAGE', 'cloudinary' if has_cloudinary else 'local')
+    app.config['MEDIA_STORAGE_PATH'] = os.environ.get('MEDIA_STORAGE_PATH')  # default instance/media
+    app.config['MEDIA_BASE_URL'] = os.environ.get('MEDIA_BASE_URL', '/media')
+    app.config['MEDIA_S3_BUCKET'] = os.environ.get('MEDIA_S3_BUCKET')
+    app.config['MEDIA_S3_ENDPOINT_URL'] = os.environ.get('MEDIA_S3_ENDPOINT_URL')  # MinIO/R2/...
+    app.config['MEDIA_S3_PUBLIC_URL'] = os.environ.get('MEDIA_S3_PUBLIC_URL')
+    app.config['MEDIA_S3_REGION'] = os.environ.get('MEDIA_S3_REGION')
+    app.config['MEDIA_MAX_BYTES'] = int(os.environ.get('MEDIA_MAX_BYTES', 16 * 1024 * 1024))
+    app.config['MEDIA_BLOB_GRACE'] = int(os.environ.get('MEDIA_BLOB_GRACE', 600))  # detik
+    
+    # Preprocessing gambar sebelum upload (butuh Pillow; tanpa Pillow file dikirim apa adanya)
+    app.config['MEDIA_PREPROCESS'] = os.environ.get('MEDIA_PREPROCESS', '1') == '1'
+    app.config['MEDIA_PREPROCESS_POOL'] = os.environ.get('MEDIA_PREPROCESS_POOL', 'thread')  # 'thread' atau 'process'
+    app.config['MEDIA_PREPROCESS_WORKERS'] = int(os.environ.get('MEDIA_PREPROCESS_WORKERS', 0))  # 0 = min(4, CPU)
+    app.config['MEDIA_IMAGE_FORMAT'] = os.environ.get('MEDIA_IMAGE_FORMAT', 'webp')  # 'webp' atau 'avif'
+    app.config['MEDIA_IMAGE_QUALITY'] = int(os.environ.get('MEDIA_IMAGE_QUALITY', 80))
+    app.config['MEDIA_MAX_PIXELS'] = int(os.environ.get('MEDIA_MAX_PIXELS', 40000000))  # di atas ini ditolak
+    
+    # Override dari caller (CLI benchmark, load test)
+    if config_overrides:
+        app.config.update(config_overrides)
+    
     # Cloudinary Configuration
     cloudinary.config(
-        cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME', 'dzfkklsza'),
-        api_key=os.environ.get('CLOUDINARY_API_KEY', '588474134734416'),
-        api_secret=os.environ.get('CLOUDINARY_API_SECRET', '9c12YJe5rZSYSg7zROQuvmVZ7mg'),
+        cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.environ.get('CLOUDINARY_API_KEY'),
+        api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
         secure=True
     )
+    if app.config['CLOUDINARY_FAKE']:
+        from app.utils.cloudinary_utils import FakeCloudinary
+        app.extensions['fake_cloudinary'] = FakeCloudinary().install()
     
     # Initialize extensions
     db.init_app(app)
@@ -34,12 +127,39 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     
+    from app.utils.cart_store import create_cart_store
+    app.extensions['cart_store'] = create_cart_store(app)
+    
+    from app.utils.media_store import create_media_store
+    app.extensions['media_store'] = create_media_store(app)
+    
+    from app.utils.catalog_utils import init_catalog
+    init_catalog(app)
+    
+    from app.utils.search_utils import init_search
+    init_search(app)
+    
+    from app.utils.typeahead_utils import init_typeahead
+    init_typeahead(app)
+    
+    from app.utils.media_queue_utils import init_media_queue
+    init_media_queue(app)
+    
+    from app.utils.loading_utils import init_nplusone
+    init_nplusone(app)
+    
+    from app.utils.perf_utils import init_performance
+    init_performance(app)
+    
+    from app.utils.slow_query_utils import init_slow_query_log
+    init_slow_query_log(app)
+    
     # Register context processors
     @app.context_processor
     def utility_processor():
         def get_game_count_by_category(category):
-            from app.models import Game
-            return Game.query.filter_by(category=category, is_active=True).count()
+            from app.utils.category_utils import get_category_count
+            return get_category_count(category)
         
         def get_all_categories():
             from app.routes import get_categories
@@ -57,4 +177,24 @@ def create_app():
         app.register_blueprint(auth)
         app.register_blueprint(admin)
     
-    return app
\ No newline at end of file
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Background sweeper untuk order pending yang kadaluarsa
+    if not app.config.get('TESTING'):
+        from app.utils.expiry_utils import start_expiry_sweeper
+        start_expiry_sweeper(app)
+        
+        from app.utils.cache_bus import init_cache_bus
+        init_cache_bus(app)
+        
+        # Worker media jalan bersama web server, supaya job yang tertinggal
+        # setelah restart/deploy langsung diproses. Perintah `flask ...`
+        # (db upgrade, media-worker, benchmark) tidak ikut menjalankannya.
+        import click
+        if click.get_current_context(silent=True) is None:
+            from app.utils.media_queue_utils import start_media_workers
+            start_media_workers(app)
+    
+    return app
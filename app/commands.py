@@ -0,0 +1,1030 @@
+import click
+import os
+import tempfile
+import threading
+import time
+
+def _bench_app(database_url=None):
+    """
+    Build a throwaway app for benchmarks.
+    Default is a temporary SQLite file so the real database is untouched.
+    """
+    from app import create_app, db
+
+    tmp_dir = tempfile.mkdtemp(prefix='gamestore-bench-')
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'WTF_CSRF_ENABLED': False,
+        'TESTING': True,
+        'MEDIA_SCRATCH_DIR': os.path.join(tmp_dir, 'media_scratch'),
+        'MEDIA_STORAGE': 'local',
+        'MEDIA_STORAGE_PATH': os.path.join(tmp_dir, 'media'),
+    }
+    if database_url.startswith('sqlite'):
+        overrides['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+
+    bench_app = create_app(overrides)
+    with bench_app.app_context():
+        db.create_all()
+    return bench_app
+
+def _bus_bench_subscriber(bus_path, database_url, expected, ready, results):
+    """Child process for bench-cache-bus: count messages and report latency"""
+    from app.utils.cache_bus import CacheBus, FileTransport, PostgresTransport
+    from sqlalchemy import create_engine
+
+    if database_url:
+        transport = PostgresTransport(create_engine(database_url))
+    else:
+        transport = FileTransport(bus_path, poll_interval=0.005)
+    bus = CacheBus(transport)
+    received = []
+    bus.subscribe('bench', lambda data: received.append(data['n']))
+    bus.start()
+    time.sleep(0.2)
+    ready.put(os.getpid())
+
+    deadline = time.time() + 30
+    while len(received) < expected and time.time() < deadline:
+        time.sleep(0.01)
+    bus.stop()
+    results.put({'pid': os.getpid(), 'received': len(received), **bus.metrics()})
+
+def register_commands(app):
+    """Register all custom flask CLI commands"""
+
+    @app.cli.command('bench-stock')
+    @click.option('--threads', default=16, help='Concurrent workers')
+    @click.option('--stock', default=200, help='Initial stock of the benchmark game')
+    @click.option('--attempts', default=1000, help='Total purchase attempts')
+    @click.option('--database-url', default=None, help='Target database (default: temporary SQLite)')
+    def bench_stock(threads, stock, attempts, database_url):
+        """Hammer one game from many threads and check for oversell"""
+        from app import db
+        from app.models import Game
+        from app.utils.stock_utils import reserve_stock
+
+        bench_app = _bench_app(database_url)
+        with bench_app.app_context():
+            game = Game(title='__bench_stock__', price=1, stock=stock, initial_stock=stock, category='Bench')
+            db.session.add(game)
+            db.session.commit()
+            game_id = game.id
+
+        counters = {'sold': 0, 'rejected': 0, 'errors': 0}
+        counter_lock = threading.Lock()
+        per_thread = [attempts // threads + (1 if i < attempts % threads else 0) for i in range(threads)]
+
+        def worker(count):
+            with bench_app.app_context():
+                for _ in range(count):
+                    try:
+                        result = reserve_stock([(game_id, 1)])
+                        db.session.commit()
+                        key = 'sold' if result['success'] else 'rejected'
+                    except Exception:
+                        db.session.rollback()
+                        key = 'errors'
+                    with counter_lock:
+                        counters[key] += 1
+                db.session.remove()
+
+        workers = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with bench_app.app_context():
+            final_stock = db.session.get(Game, game_id).stock
+            db.session.delete(db.session.get(Game, game_id))
+            db.session.commit()
+
+        oversold = max(counters['sold'] - stock, 0) + max(-final_stock, 0)
+        click.echo(f"threads={threads} attempts={attempts} initial_stock={stock}")
+        click.echo(f"sold={counters['sold']} rejected={counters['rejected']} errors={counters['errors']}")
+        click.echo(f"final_stock={final_stock} oversold={oversold}")
+        click.echo(f"elapsed={elapsed:.3f}s orders/sec={counters['sold'] / elapsed if elapsed else 0:.1f} "
+                   f"attempts/sec={attempts / elapsed if elapsed else 0:.1f}")
+        if oversold or counters['sold'] + final_stock != stock:
+            raise click.ClickException('Stock invariant violated')
+
+    @app.cli.command('sweep-orders')
+    @click.option('--ttl', default=None, type=int, help='Minutes before a pending order expires (default: PENDING_ORDER_TTL_MINUTES)')
+    @click.option('--batch-size', default=None, type=int, help='Orders per transaction (default: ORDER_SWEEP_BATCH_SIZE)')
+    @click.option('--max-batches', default=None, type=int, help='Stop after this many batches')
+    def sweep_orders(ttl, batch_size, max_batches):
+        """Cancel expired pending orders and restore their stock"""
+        from flask import current_app
+        from app.utils.expiry_utils import sweep_expired_orders
+
+        stats = sweep_expired_orders(
+            ttl if ttl is not None else current_app.config['PENDING_ORDER_TTL_MINUTES'],
+            batch_size or current_app.config['ORDER_SWEEP_BATCH_SIZE'],
+            max_batches
+        )
+        click.echo(f"expired_orders={stats['orders']} units_restocked={stats['units']} batches={stats['batches']}")
+        click.echo(f"elapsed={stats['elapsed']:.3f}s orders/sec={stats['orders_per_sec']:.1f}")
+
+    @app.cli.command('bench-cache-bus')
+    @click.option('--processes', default=4, help='Subscriber processes')
+    @click.option('--messages', default=200, help='Messages to publish')
+    @click.option('--database-url', default=None, help='Postgres URL to test LISTEN/NOTIFY (default: file transport)')
+    def bench_cache_bus(processes, messages, database_url):
+        """Spin up subscriber processes and measure invalidation propagation latency"""
+        import multiprocessing
+        from app.utils.cache_bus import CacheBus, FileTransport, PostgresTransport
+        from sqlalchemy import create_engine
+
+        bus_path = os.path.join(tempfile.mkdtemp(prefix='gamestore-bus-'), 'bus.log')
+        ctx = multiprocessing.get_context('spawn')
+        ready, results = ctx.Queue(), ctx.Queue()
+        children = [ctx.Process(target=_bus_bench_subscriber, args=(bus_path, database_url, messages, ready, results))
+                    for _ in range(processes)]
+        for child in children:
+            child.start()
+        for _ in children:
+            ready.get(timeout=60)
+
+        transport = PostgresTransport(create_engine(database_url)) if database_url else FileTransport(bus_path)
+        publisher = CacheBus(transport)
+        for n in range(messages):
+            publisher.publish('bench', n=n)
+            time.sleep(0.001)
+
+        reports = [results.get(timeout=60) for _ in children]
+        for child in children:
+            child.join()
+
+        lost = 0
+        for report in reports:
+            lost += messages - report['received']
+            click.echo(f"pid={report['pid']} received={report['received']}/{messages} "
+                       f"p50={report['latency_p50_ms'] or 0:.2f}ms p95={report['latency_p95_ms'] or 0:.2f}ms "
+                       f"p99={report['latency_p99_ms'] or 0:.2f}ms max={report['latency_max_ms'] or 0:.2f}ms")
+        if lost:
+            raise click.ClickException(f'{lost} messages were not delivered')
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the full-text search index from the game table"""
+        from app.utils.search_utils import rebuild_search_index
+
+        if rebuild_search_index():
+            click.echo('✅ Search index rebuilt')
+        else:
+            click.echo('❌ Full-text search is not available on this database')
+
+    @app.cli.command('bench-search')
+    @click.option('--games', default=100000, help='Synthetic catalog size')
+    @click.option('--queries', default=200, help='Queries per engine')
+    @click.option('--seed', default=42, help='Random seed')
+    @click.option('--database-url', default=None, help='Target database (default: temporary SQLite)')
+    def bench_search(games, queries, seed, database_url):
+        """Compare ILIKE and full-text search latency on a synthetic catalog"""
+        import random
+        from app import db
+        from app.models import Game
+        from app.utils.search_utils import search_game_index, ensure_search_index
+
+        rng = random.Random(seed)
+        syllables = ['ka', 'ro', 'mi', 'zen', 'tar', 'lu', 'vex', 'dra', 'gon', 'qu', 'est', 'pix', 'el', 'nor', 'sa']
+        words = sorted({''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(3000)})
+        categories = ['Adventure', 'Racing', 'RPG', 'Sports', 'Strategy', 'Puzzle', 'Cloud Game', 'Fishing']
+
+        bench_app = _bench_app(database_url)
+        with bench_app.app_context():
+            rows = [{
+                'title': f"{rng.choice(words).title()} {rng.choice(words).title()} {n}",
+                'short_description': ' '.join(rng.choices(words, k=6)),
+                'description': ' '.join(rng.choices(words, k=30)),
+                'price': rng.randint(10, 500) * 1000,
+                'stock': rng.randint(0, 50),
+                'category': rng.choice(categories),
+                'is_active': True,
+            } for n in range(games)]
+            db.session.execute(Game.__table__.insert(), rows)
+            db.session.commit()
+
+            started = time.perf_counter()
+            ensure_search_index(db.engine)
+            click.echo(f"games={games} index_build={time.perf_counter() - started:.2f}s")
+
+            samples = [rng.choice(words)[:rng.randint(3, 8)] for _ in range(queries)]
+
+            def measure(run):
+                timings = []
+                for q in samples:
+                    t0 = time.perf_counter()
+                    run(q)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                timings.sort()
+                return timings[len(timings) // 2], timings[min(int(len(timings) * 0.99), len(timings) - 1)]
+
+            # Bentuk query /search (typeahead, LIMIT 10)
+            ilike = measure(lambda q: Game.query.filter(Game.title.ilike(f'%{q}%'), Game.is_active == True).limit(10).all())
+            fts = measure(lambda q: search_game_index(q, limit=10, columns=('title', 'category')))
+            click.echo(f"/search  ilike p50={ilike[0]:.2f}ms p99={ilike[1]:.2f}ms")
+            click.echo(f"/search  fts   p50={fts[0]:.2f}ms p99={fts[1]:.2f}ms")
+
+            # Bentuk query /games?search= (semua hasil)
+            ilike = measure(lambda q: Game.query.filter(Game.title.ilike(f'%{q}%'), Game.is_active == True)
+                            .order_by(Game.created_at.desc()).all())
+            fts = measure(lambda q: search_game_index(q, limit=None, snippets=False))
+            click.echo(f"/games   ilike p50={ilike[0]:.2f}ms p99={ilike[1]:.2f}ms (title only, unranked)")
+            click.echo(f"/games   fts   p50={fts[0]:.2f}ms p99={fts[1]:.2f}ms (all fields, ranked)")
+
+    @app.cli.command('bench-typeahead')
+    @click.option('--games', default=100000, help='Synthetic catalog size')
+    @click.option('--queries', default=5000, help='Queries per run')
+    @click.option('--seed', default=42, help='Random seed')
+    def bench_typeahead(games, queries, seed):
+        """Measure in-memory typeahead queries/sec (no database involved)"""
+        import random
+        from collections import namedtuple
+        from app.utils.catalog_utils import GameRecord
+        from app.utils.typeahead_utils import TypeaheadIndex, Typeahead
+
+        rng = random.Random(seed)
+        syllables = ['ka', 'ro', 'mi', 'zen', 'tar', 'lu', 'vex', 'dra', 'gon', 'qu', 'est', 'pix', 'el', 'nor', 'sa']
+        words = sorted({''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(3000)})
+        categories = ['Adventure', 'Racing', 'RPG', 'Sports', 'Strategy', 'Puzzle', 'Cloud Game', 'Fishing']
+        records = [GameRecord(n, f"{rng.choice(words).title()} {rng.choice(words).title()}", None, None,
+                              1000.0, None, 'cloud_code', rng.choice(categories), True, None, 1)
+                   for n in range(1, games + 1)]
+        popularity = {n: rng.randint(0, 500) for n in range(1, games + 1)}
+
+        started = time.perf_counter()
+        index = TypeaheadIndex.build(1, records, popularity)
+        click.echo(f"games={games} tokens={len(index.vocabulary)} build={time.perf_counter() - started:.2f}s")
+
+        def typo(word):
+            if len(word) < 5:
+                return word
+            i = rng.randrange(1, len(word) - 1)
+            return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+        workloads = {
+            'prefix': [rng.choice(words)[:rng.randint(2, 6)] for _ in range(queries)],
+            'typo': [typo(rng.choice(words)) for _ in range(queries)],
+            'two-word': [f"{rng.choice(words)} {rng.choice(words)[:3]}" for _ in range(queries)],
+        }
+        for name, samples in workloads.items():
+            timings = []
+            for q in samples:
+                t0 = time.perf_counter()
+                index.search(q, 10)
+                timings.append(time.perf_counter() - t0)
+            timings.sort()
+            click.echo(f"{name:9} uncached qps={len(samples) / sum(timings):,.0f} "
+                       f"p50={timings[len(timings) // 2] * 1e6:.0f}us p99={timings[int(len(timings) * 0.99)] * 1e6:.0f}us")
+
+        # Prefix yang sering diulang saat mengetik, lewat LRU cache
+        snapshot = namedtuple('Snapshot', 'version by_id')(1, {r.id: r for r in records})
+        typeahead = Typeahead(cache_size=1024)
+        typeahead.index, typeahead.snapshot = index, snapshot
+        hot = [rng.choice(workloads['prefix'][:200]) for _ in range(queries)]
+        t0 = time.perf_counter()
+        for q in hot:
+            typeahead.search(snapshot, q, 10, lambda found: found)
+        elapsed = time.perf_counter() - t0
+        click.echo(f"cached    qps={len(hot) / elapsed:,.0f} hit_rate={typeahead.stats['hits'] / len(hot):.0%}")
+
+    @app.cli.command('bench-pagination')
+    @click.option('--orders', default=1000000, help='Synthetic orders to insert')
+    @click.option('--per-page', default=50, help='Page size')
+    @click.option('--repeat', default=20, help='Timed runs per page')
+    @click.option('--database-url', default=None, help='Target database (default: temporary SQLite)')
+    def bench_pagination(orders, per_page, repeat, database_url):
+        """Compare OFFSET and keyset latency for deep pages of admin orders"""
+        from datetime import datetime, timedelta
+        from app import db
+        from app.models import Order, User
+        from app.utils.pagination_utils import paginate_query
+
+        bench_app = _bench_app(database_url)
+        with bench_app.app_context():
+            user = User(username='bench', email='bench@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+
+            started = time.perf_counter()
+            base = datetime(2020, 1, 1)
+            statuses = ('pending', 'paid', 'paid', 'cancelled')
+            batch = 50000
+            for start in range(0, orders, batch):
+                # Tiap 3 order berbagi created_at yang sama, id jadi pemecah seri
+                db.session.execute(Order.__table__.insert(), [{
+                    'id': f'{n:012d}',
+                    'user_id': user.id,
+                    'total_amount': 1000 + n % 500,
+                    'status': statuses[n % 4],
+                    'created_at': base + timedelta(seconds=n // 3),
+                } for n in range(start, min(start + batch, orders))])
+                db.session.commit()
+            click.echo(f"orders={orders} seeded in {time.perf_counter() - started:.1f}s")
+
+            columns = (Order.created_at, Order.id)
+            last_page = max((orders - 1) // per_page, 0)
+            pages = sorted({p for p in (0, 10, 100, 1000, last_page // 4, last_page // 2, last_page) if p <= last_page})
+
+            def measure(run):
+                timings = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - t0) * 1000)
+                timings.sort()
+                return timings[len(timings) // 2]
+
+            click.echo(f"{'page':>8} {'offset p50':>12} {'keyset p50':>12}")
+            for page_no in pages:
+                offset_query = Order.query.order_by(Order.created_at.desc(), Order.id.desc())
+                # Cursor halaman N diambil sekali (tidak ikut diukur)
+                cursor = None
+                if page_no:
+                    boundary = offset_query.offset(page_no * per_page - 1).first()
+                    cursor = (boundary.created_at, boundary.id)
+                offset_ms = measure(lambda: offset_query.offset(page_no * per_page).limit(per_page).all())
+                keyset_ms = measure(lambda: paginate_query(Order.query, columns, cursor, 'next', per_page))
+                db.session.expunge_all()
+                click.echo(f"{page_no + 1:>8} {offset_ms:>10.2f}ms {keyset_ms:>10.2f}ms")
+
+    @app.cli.command('bench-perf-overhead')
+    @click.option('--requests', 'total', default=4000, help='Requests per mode')
+    @click.option('--games', default=200, help='Synthetic catalog size')
+    def bench_perf_overhead(total, games):
+        """Measure the per-request cost of SQL/template instrumentation"""
+        from app import create_app, db
+        from app.models import Game
+
+        def build(enabled):
+            tmp_dir = tempfile.mkdtemp(prefix='gamestore-bench-')
+            bench_app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+                'TESTING': True,
+                'PERF_MONITOR': enabled,
+            })
+            with bench_app.app_context():
+                db.create_all()
+                db.session.execute(Game.__table__.insert(), [{
+                    'title': f'Game {n}', 'short_description': 'Synthetic game', 'description': 'Synthetic game',
+                    'price': 1000, 'stock': 5, 'category': f'Cat {n % 8}', 'is_active': True
+                } for n in range(games)])
+                db.session.commit()
+            return bench_app.test_client()
+
+        clients = {'off': build(False), 'on': build(True)}
+        paths = ['/games', '/game/1', '/api/games', '/category/Cat 1']
+        for client in clients.values():
+            for path in paths:
+                client.get(path)
+
+        # Batch kecil bergantian, median per batch supaya noise mesin terbagi rata
+        batch = 40
+        timings = {'off': [], 'on': []}
+        for _ in range(max(total // batch, 1)):
+            for mode, client in clients.items():
+                t0 = time.perf_counter()
+                for n in range(batch):
+                    client.get(paths[n % len(paths)])
+                timings[mode].append((time.perf_counter() - t0) / batch * 1e6)
+        off_us = sorted(timings['off'])[len(timings['off']) // 2]
+        on_us = sorted(timings['on'])[len(timings['on']) // 2]
+        click.echo(f"monitor off: {off_us:.0f}us/request")
+        click.echo(f"monitor on:  {on_us:.0f}us/request")
+        click.echo(f"overhead:    {on_us - off_us:.0f}us/request ({(on_us - off_us) / off_us:.1%})")
+
+    @app.cli.command('slow-queries')
+    @click.option('--limit', default=20, help='Statements to show')
+    @click.option('--plans/--no-plans', default=True, help='Print captured query plans')
+    @click.option('--clear', is_flag=True, help='Delete the log after printing')
+    def slow_queries(limit, plans, clear):
+        """List the slowest statements by total time from the slow query log"""
+        from app.utils.slow_query_utils import load_offenders, slow_query_log_path
+
+        path = slow_query_log_path(app)
+        offenders = load_offenders(path, limit)
+        if not offenders:
+            click.echo(f"No slow queries in {path}")
+        for rank, item in enumerate(offenders, 1):
+            routes = ', '.join(f'{route} ({count})' for route, count in item['routes'])
+            click.echo(f"#{rank} total={item['total_ms']:.0f}ms count={item['count']} "
+                       f"avg={item['avg_ms']:.1f}ms max={item['max_ms']:.1f}ms [{item['fingerprint']}]")
+            click.echo(f"   {item['sql']}")
+            click.echo(f"   binds: {item['bind_shape'] or '-'}")
+            click.echo(f"   routes: {routes}")
+            if plans and item['plan']:
+                for line in item['plan']:
+                    click.echo(f"   | {line}")
+            click.echo('')
+        if clear:
+            for name in (path, path + '.1'):
+                if os.path.exists(name):
+                    os.remove(name)
+            click.echo('✅ Slow query log cleared')
+
+    @app.cli.command('check-query-plans')
+    @click.option('--database-url', default=None, help='Database to inspect as-is (default: temporary SQLite from the models)')
+    @click.option('--via-migrations', is_flag=True, help='Strip the indexes and rebuild them with the Alembic migrations first')
+    @click.option('--verbose', is_flag=True, help='Print every plan, not only failures')
+    def check_query_plans_command(database_url, via_migrations, verbose):
+        """Assert that every hot query shape is served by an index (exit 1 if not)"""
+        from app import db
+        from app.utils.query_plan_utils import check_query_plans
+
+        bench_app = _bench_app(database_url)
+        with bench_app.app_context():
+            if via_migrations:
+                from flask_migrate import upgrade, downgrade, stamp
+                migrations = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+                # Skema lama (create_all tanpa index) lalu upgrade
+                stamp(directory=migrations, revision='head')
+                downgrade(directory=migrations, revision='base')
+                upgrade(directory=migrations)
+
+            with db.engine.begin() as connection:
+                results = check_query_plans(connection)
+
+        failed = 0
+        for name, index, passed, plan in results:
+            click.echo(f"{'✅' if passed else '❌'} {name} -> {index}")
+            if verbose or not passed:
+                for line in plan:
+                    click.echo(f"     | {line}")
+            failed += not passed
+        click.echo(f"{len(results) - failed}/{len(results)} hot queries use their index")
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('backfill-sales')
+    @click.option('--start', default=None, help='First day to rebuild (YYYY-MM-DD, default: all)')
+    @click.option('--end', default=None, help='Last day to rebuild (YYYY-MM-DD, default: all)')
+    def backfill_sales_command(start, end):
+        """Rebuild the daily sales rollups from paid orders"""
+        from datetime import date
+        from sqlalchemy.exc import OperationalError
+        from app.utils.sales_utils import backfill_sales
+
+        started = time.perf_counter()
+        try:
+            game_rows, payment_rows = backfill_sales(
+                date.fromisoformat(start) if start else None,
+                date.fromisoformat(end) if end else None
+            )
+        except OperationalError as e:
+            click.echo(f"❌ Backfill failed (run `flask db upgrade` first?): {e.orig}")
+            raise SystemExit(1)
+        click.echo(f"✅ Sales rollups rebuilt: {game_rows} game-days, {payment_rows} payment-days "
+                   f"in {time.perf_counter() - started:.2f}s")
+
+    @app.cli.command('bench-bulk-verify')
+    @click.option('--orders', default=500, help='Pending orders to approve')
+    @click.option('--items', default=3, help='Games per order')
+    @click.option('--games', default=50, help='Synthetic catalog size')
+    @click.option('--database-url', default=None, help='Target database (default: temporary SQLite, one per mode)')
+    def bench_bulk_verify(orders, items, games, database_url):
+        """Compare one-click-per-order approval with the bulk endpoint"""
+        import random
+        from sqlalchemy import event
+        from werkzeug.security import generate_password_hash
+        from app import db
+        from app.models import Game, Order, OrderItem, User, UserLibrary
+
+        def build():
+            bench_app = _bench_app(database_url)
+            rng = random.Random(42)
+            with bench_app.app_context():
+                db.session.add(User(username='admin', email='admin@example.com',
+                                    password_hash=generate_password_hash('bench'), is_admin=True))
+                db.session.execute(User.__table__.insert(), [{
+                    'username': f'buyer{n}', 'email': f'buyer{n}@example.com', 'password_hash': 'x'
+                } for n in range(orders // 4 + 1)])
+                db.session.execute(Game.__table__.insert(), [{
+                    'title': f'Game {n}', 'price': 1000, 'stock': 1000, 'category': 'Bench', 'is_active': True,
+                    'share_method': ('cloud_code', 'account')[n % 2]
+                } for n in range(games)])
+                db.session.execute(Order.__table__.insert(), [{
+                    'id': f'bench-{n:08d}', 'user_id': 2 + n % (orders // 4 + 1),
+                    'total_amount': 1000 * items, 'status': 'pending', 'payment_method': '1'
+                } for n in range(orders)])
+                db.session.execute(OrderItem.__table__.insert(), [{
+                    'order_id': f'bench-{n:08d}', 'game_id': game_id, 'quantity': 1, 'price': 1000
+                } for n in range(orders) for game_id in rng.sample(range(1, games + 1), min(items, games))])
+                db.session.commit()
+                statements = []
+                event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(1))
+            client = bench_app.test_client()
+            client.post('/login', data={'email': 'admin@example.com', 'password': 'bench'})
+            return bench_app, client, statements
+
+        order_ids = [f'bench-{n:08d}' for n in range(orders)]
+        rows = []
+
+        bench_app, client, statements = build()
+        del statements[:]
+        started = time.perf_counter()
+        for order_id in order_ids:
+            client.post(f'/admin/verify-payment/{order_id}', data={'action': 'approve'})
+        rows.append(('one by one', time.perf_counter() - started, len(statements), bench_app))
+
+        bench_app, client, statements = build()
+        del statements[:]
+        started = time.perf_counter()
+        response = client.post('/admin/orders/bulk-verify?format=json', json={'action': 'approve', 'order_ids': order_ids})
+        rows.append(('bulk', time.perf_counter() - started, len(statements), bench_app))
+        summary = response.get_json()
+
+        click.echo(f"{'mode':>12} {'seconds':>9} {'orders/s':>10} {'statements':>11} {'paid':>6} {'library':>8}")
+        for mode, elapsed, count, mode_app in rows:
+            with mode_app.app_context():
+                paid = Order.query.filter_by(status='paid').count()
+                library = UserLibrary.query.count()
+            click.echo(f"{mode:>12} {elapsed:>9.2f} {orders / elapsed:>10.0f} {count:>11} {paid:>6} {library:>8}")
+        click.echo(f"bulk results: {summary['processed']} approved, {summary['skipped']} skipped")
+
+    @app.cli.command('export')
+    @click.argument('kind', type=click.Choice(['orders', 'order_items', 'library', 'games']))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', help='Output format')
+    @click.option('--start', default=None, help='First day (YYYY-MM-DD)')
+    @click.option('--end', default=None, help='Last day (YYYY-MM-DD)')
+    @click.option('--status', type=click.Choice(['pending', 'paid', 'cancelled']), default=None, help='Order status filter')
+    @click.option('--gzip', 'compress', is_flag=True, help='Gzip the output')
+    @click.option('--output', '-o', default='-', help='Output file (default: stdout)')
+    def export_command(kind, fmt, start, end, status, compress, output):
+        """Stream orders, order items, library grants or the catalog as CSV / JSON Lines"""
+        import sys
+        from datetime import date
+        from app.utils.export_utils import export_stream
+
+        target = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        written = 0
+        started = time.perf_counter()
+        try:
+            for chunk in export_stream(kind, fmt, date.fromisoformat(start) if start else None,
+                                       date.fromisoformat(end) if end else None, status, compress):
+                target.write(chunk)
+                written += len(chunk)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+        if output != '-':
+            click.echo(f"✅ {kind} exported to {output} ({written / 1024 / 1024:.1f} MB in {time.perf_counter() - started:.1f}s)")
+
+    @app.cli.command('bench-export')
+    @click.option('--orders', default=1000000, help='Synthetic orders to insert')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', help='Output format')
+    @click.option('--gzip', 'compress', is_flag=True, help='Gzip the output')
+    @click.option('--database-url', default=None, help='Target database (default: temporary SQLite)')
+    def bench_export(orders, fmt, compress, database_url):
+        """Export synthetic orders and track worker RSS while streaming"""
+        import gc
+        from datetime import datetime, timedelta
+        from app import db
+        from app.models import Order, User
+        from app.utils.export_utils import export_stream
+
+        def rss_mb():
+            # RSS saat ini (Linux); fallback ke puncak RSS proses
+            try:
+                with open('/proc/self/statm') as f:
+                    return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+            except OSError:
+                import resource
+                return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        bench_app = _bench_app(database_url)
+        with bench_app.app_context():
+            user = User(username='bench', email='bench@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            base = datetime(2020, 1, 1)
+            statuses = ('pending', 'paid', 'paid', 'cancelled')
+            batch = 50000
+            for start in range(0, orders, batch):
+                db.session.execute(Order.__table__.insert(), [{
+                    'id': f'{n:012d}', 'user_id': user.id, 'total_amount': 1000 + n % 500,
+                    'status': statuses[n % 4], 'payment_method': '1',
+                    'created_at': base + timedelta(seconds=n), 'updated_at': base + timedelta(seconds=n),
+                } for n in range(start, min(start + batch, orders))])
+                db.session.commit()
+            db.session.expunge_all()
+            gc.collect()
+
+        with bench_app.test_request_context():
+            before = peak = rss_mb()
+            written = 0
+            started = time.perf_counter()
+            for n, chunk in enumerate(export_stream('orders', fmt, compress=compress)):
+                written += len(chunk)
+                if n % 50 == 0:
+                    peak = max(peak, rss_mb())
+            elapsed = time.perf_counter() - started
+            peak = max(peak, rss_mb())
+
+        click.echo(f"orders={orders} format={fmt}{' gzip' if compress else ''}")
+        click.echo(f"exported {written / 1024 / 1024:.1f} MB in {elapsed:.1f}s ({orders / elapsed:,.0f} rows/s)")
+        click.echo(f"RSS before {before:.1f} MB, peak while streaming {peak:.1f} MB (+{peak - before:.1f} MB)")
+
+    @app.cli.command('import-catalog')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'json', 'jsonl']), default=None, help='File format (default: from extension)')
+    @click.option('--dry-run', is_flag=True, help='Only print what would change')
+    @click.option('--rehost-images', is_flag=True, help='Copy image_url values to Cloudinary after the import')
+    def import_catalog_command(path, fmt, dry_run, rehost_images):
+        """Create, update and restock games from a CSV / JSON catalog"""
+        from app.utils.catalog_import_utils import read_catalog, detect_format, plan_import, apply_import
+        from app.utils.catalog_import_utils import rehost_images as start_rehost
+
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            try:
+                rows = read_catalog(f.read(), fmt or detect_format(path))
+            except ValueError as e:
+                click.echo(f"❌ Could not read {path}: {e}")
+                raise SystemExit(1)
+        plan = plan_import(rows)
+        summary = plan.summary()
+        click.echo(f"{len(rows)} rows: {summary['create']} create, {summary['update']} update, "
+                   f"{summary['restock']} restock, {summary['unchanged']} unchanged, {summary['errors']} errors")
+        if plan.ignored_columns:
+            click.echo(f"ignored columns: {', '.join(plan.ignored_columns)}")
+        for line, field, message in plan.errors[:50]:
+            click.echo(f"  line {line} {field or ''}: {message}")
+        if dry_run:
+            for line, values in plan.creates[:50]:
+                click.echo(f"  + line {line} {values['title']}")
+            for line, game_id, changes in plan.updates[:50]:
+                click.echo(f"  ~ line {line} game {game_id}: {', '.join(changes)}")
+            for line, game_id, delta in plan.restocks[:50]:
+                click.echo(f"  ^ line {line} game {game_id}: +{delta}")
+            return
+        if not plan.ok:
+            click.echo("❌ Nothing imported, fix the errors first")
+            raise SystemExit(1)
+
+        result = apply_import(plan)
+        click.echo(f"✅ Imported in {time.perf_counter() - started:.2f}s: {result['created']} created, "
+                   f"{result['updated']} updated, {result['restocked']} restocked")
+        if rehost_images and result['images']:
+            futures = start_rehost(app, result['images'])
+            done = sum(1 for future in futures if future.result())
+            click.echo(f"images copied to Cloudinary: {done}/{len(futures)}")
+
+    @app.cli.command('seed-scale')
+    @click.option('--users', default=10000, help='Users to create')
+    @click.option('--games', default=2000, help='Games to create')
+    @click.option('--orders', default=1000000, help='Orders to create')
+    @click.option('--categories', default=12, help='Number of categories')
+    @click.option('--days', default=730, help='Days of order history')
+    @click.option('--seed', default=42, help='Random seed (same seed, same data)')
+    @click.option('--batch-size', default=20000, help='Rows per INSERT batch')
+    @click.option('--database-url', default=None, help='Target database (default: the app database)')
+    @click.option('--reset', is_flag=True, help='Drop and recreate every table first')
+    @click.option('--yes', is_flag=True, help='Do not ask before --reset')
+    def seed_scale_command(users, games, orders, categories, days, seed, batch_size, database_url, reset, yes):
+        """Generate a deterministic production-scale dataset"""
+        from app import create_app, db
+        from app.utils.seed_utils import seed_scale, SEED_PASSWORD
+
+        target = create_app({'SQLALCHEMY_DATABASE_URI': database_url}) if database_url else app
+        with target.app_context():
+            click.echo(f"database: {db.engine.url.render_as_string(hide_password=True)}")
+            if reset:
+                if not yes:
+                    click.confirm('Drop every table in this database?', abort=True)
+                db.drop_all()
+            db.create_all()
+
+            started = time.perf_counter()
+            result = seed_scale(users, games, orders, categories, days, seed, batch_size, echo=click.echo)
+            elapsed = time.perf_counter() - started
+        click.echo(f"✅ {result['users']} users, {result['games']} games, {result['orders']} orders, "
+                   f"{result['order_items']} order items, {result['library']} library rows in {elapsed:.1f}s")
+        click.echo(f"   seeded users log in as s{seed}_user<n>@example.com / {SEED_PASSWORD}")
+
+    @app.cli.command('load-test')
+    @click.option('--users', default=8, help='Concurrent virtual users (threads)')
+    @click.option('--duration', default=30.0, help='Seconds to run')
+    @click.option('--mix', default='browse=60,search=25,buy=10,admin=5', help='Scenario weights')
+    @click.option('--seed', default=42, help='seed-scale seed of the database, also drives the scenario RNG')
+    @click.option('--think-time', default=0.0, help='Mean pause between scenarios, in seconds')
+    @click.option('--database-url', default=None, help='Database seeded by seed-scale (default: temporary SQLite, seeded here)')
+    @click.option('--seed-orders', default=20000, help='Orders to seed into the temporary database')
+    @click.option('--output', default=None, type=click.Path(dir_okay=False), help='Write the JSON report here')
+    @click.option('--baseline', default=None, type=click.Path(exists=True, dir_okay=False), help='Earlier report to compare with')
+    def load_test(users, duration, mix, seed, think_time, database_url, seed_orders, output, baseline):
+        """Run the storefront/checkout/admin load test offline (exit 1 on oversell or stock drift)"""
+        import json
+        from app import db
+        from app.utils.loadtest_utils import compare_reports, parse_mix, run_load_test, write_report
+        from app.utils.seed_utils import seed_scale
+
+        try:
+            mix = parse_mix(mix)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--mix')
+
+        bench_app = _bench_app(database_url)
+        if not database_url:
+            with bench_app.app_context():
+                click.echo(f"seeding temporary database ({seed_orders} orders)...")
+                seed_scale(users=1000, games=300, orders=seed_orders, seed=seed, echo=lambda *args: None)
+
+        try:
+            report = run_load_test(bench_app, users, duration, mix, seed, think_time)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{'endpoint':<15} {'requests':>9} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+        for endpoint, item in report['endpoints'].items():
+            latency = item['latency_ms']
+            click.echo(f"{endpoint:<15} {item['requests']:>9} {item['throughput_rps']:>7} {latency['p50']:>8} "
+                       f"{latency['p95']:>8} {latency['p99']:>8} {item['error_rate']:>7.2%}")
+        totals = report['totals']
+        click.echo(f"total: {totals['requests']} requests, {totals['throughput_rps']} req/s, "
+                   f"error rate {totals['error_rate']:.2%} (latency in ms)")
+        for name, item in report['scenarios'].items():
+            click.echo(f"  {name:<8} {item['runs']:>6} runs  {item['outcomes']}")
+
+        checks = report['checks']
+        click.echo(f"{'✅' if checks['passed'] else '❌'} stock: {checks['orders_created']} orders, "
+                   f"{checks['units_held']} units held, {len(checks['negative_stock'])} negative, "
+                   f"{len(checks['stock_mismatches'])} mismatched")
+        click.echo(f"media jobs: {checks['media_jobs']}, {checks['media_blobs']} stored blobs")
+
+        if baseline:
+            with open(baseline) as f:
+                rows = compare_reports(json.load(f), report)
+            click.echo(f"{'endpoint':<15} {'p95 before':>11} {'p95 now':>9} {'rps before':>11} {'rps now':>9}")
+            for endpoint, old_p95, new_p95, old_rps, new_rps in rows:
+                click.echo(f"{endpoint:<15} {old_p95 if old_p95 is not None else '-':>11} "
+                           f"{new_p95 if new_p95 is not None else '-':>9} "
+                           f"{old_rps if old_rps is not None else '-':>11} {new_rps if new_rps is not None else '-':>9}")
+        if output:
+            write_report(report, output)
+            click.echo(f"report written to {output}")
+        if not checks['passed']:
+            raise SystemExit(1)
+
+    @app.cli.command('bench-routes')
+    @click.option('--iterations', default=20, help='Warm calls per route and dataset')
+    @click.option('--route', 'only', multiple=True, help='Only these cases (repeatable)')
+    @click.option('--seed', default=42, help='Dataset seed')
+    @click.option('--output', default=None, type=click.Path(dir_okay=False), help='Write the results as JSON')
+    def bench_routes(iterations, only, seed, output):
+        """Time every route on a small and a large dataset and enforce query budgets (exit 1 on a breach)"""
+        import json
+        from app.utils.route_bench_utils import (ROUTE_CASES, TIERS, build_dataset, check_budgets,
+                                                 run_route_benchmarks, uncovered_endpoints)
+
+        cases = [case for case in ROUTE_CASES if not only or case.name in only]
+        if not cases:
+            raise click.BadParameter('no such case', param_hint='--route')
+
+        results = {}
+        for tier in TIERS:
+            bench_app = _bench_app()
+            with bench_app.app_context():
+                fields = build_dataset(tier, seed)
+            results[tier] = run_route_benchmarks(bench_app, fields, iterations, cases)
+
+        # q = kueri warm terburuk, cold = kueri dengan semua cache kosong
+        click.echo(f"{'route':<28} {'budget':>9} " + ' '.join(
+            f"{tier + ' q':>8} {'cold':>5} {'ms':>7} {'KiB':>7}" for tier in TIERS))
+        for n, case in enumerate(cases):
+            budget = '-' if case.max_queries is None else f"{case.max_queries}/{case.cold_queries}"
+            row = f"{case.name:<28} {budget:>9} "
+            row += ' '.join(f"{results[tier][n]['max_queries']:>8} {results[tier][n]['cold_queries']:>5} "
+                            f"{results[tier][n]['p50_ms']:>7.1f} {results[tier][n]['alloc_kib']:>7.0f}"
+                            for tier in TIERS)
+            click.echo(row)
+
+        problems = check_budgets(results, cases)
+        missing = uncovered_endpoints(bench_app) if not only else []
+        if missing:
+            click.echo(f"not benchmarked: {', '.join(missing)}")
+        if output:
+            with open(output, 'w') as f:
+                json.dump({'iterations': iterations, 'seed': seed, 'results': results}, f, indent=2, sort_keys=True)
+                f.write('\n')
+        for name, problem in problems:
+            click.echo(f"❌ {name}: {problem}")
+        if problems:
+            raise SystemExit(1)
+        click.echo(f"✅ {len(cases)} routes within their query budgets")
+
+    @app.cli.command('media-worker')
+    @click.option('--threads', default=None, type=int, help='Worker threads (default: MEDIA_WORKER_THREADS, at least 1)')
+    @click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit')
+    def media_worker(threads, once):
+        """Upload/delete queued media on Cloudinary (run on every node that takes uploads)"""
+        from app.utils.media_queue_utils import MediaWorker
+
+        threads = threads or max(app.config['MEDIA_WORKER_THREADS'], 1)
+        worker = MediaWorker(app, threads, app.config['MEDIA_POLL_INTERVAL'])
+        if once:
+            started = time.perf_counter()
+            claimed = worker.drain()
+            worker.pool.shutdown()
+            click.echo(f"✅ {claimed} jobs in {time.perf_counter() - started:.1f}s: {worker.stats}")
+            return
+        click.echo(f"media worker running with {threads} threads (Ctrl+C to stop)")
+        worker.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            worker.stop()
+            click.echo(f"stopped: {worker.stats}")
+
+    @app.cli.command('media-jobs')
+    @click.option('--retry-failed', is_flag=True, help='Queue failed jobs again with a fresh attempt budget')
+    @click.option('--prune-scratch', is_flag=True, help='Remove scratch files no unfinished job refers to')
+    @click.option('--gc', 'collect', is_flag=True, help='Delete stored blobs no row references any more')
+    @click.option('--dry-run', is_flag=True, help='With --gc: only list what would be deleted')
+    @click.option('--limit', default=20, help='Failed jobs to list')
+    def media_jobs(retry_failed, prune_scratch, collect, dry_run, limit):
+        """Show the media job queue"""
+        from app import db
+        from app.models import MediaJob
+        from app.utils.media_queue_utils import media_job_counts, retry_failed_jobs, scratch_dir
+
+        counts = media_job_counts()
+        click.echo(' '.join(f"{status}={counts.get(status, 0)}" for status in ('pending', 'running', 'done', 'failed')))
+        failed = MediaJob.query.filter_by(status='failed').order_by(MediaJob.updated_at.desc()).limit(limit).all()
+        for job in failed:
+            click.echo(f"  #{job.id} {job.action} {job.target_type or ''} {job.target_id or job.public_id or ''} "
+                       f"attempts={job.attempts}: {job.last_error}")
+        if retry_failed:
+            click.echo(f"✅ {retry_failed_jobs()} failed jobs queued again")
+        if prune_scratch:
+            # Upload yang transaksinya batal meninggalkan file scratch tanpa job
+            directory = scratch_dir(app)
+            wanted = set(db.session.execute(db.select(MediaJob.scratch_path).where(
+                MediaJob.status != 'done', MediaJob.scratch_path.isnot(None)
+            )).scalars())
+            removed = 0
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if path not in wanted and time.time() - os.path.getmtime(path) > app.config['MEDIA_JOB_TIMEOUT']:
+                    os.remove(path)
+                    removed += 1
+            click.echo(f"✅ {removed} orphaned scratch files removed")
+        if collect:
+            from app.utils.media_store import collect_garbage
+            keys = collect_garbage(dry_run=dry_run)
+            for key in keys[:limit]:
+                click.echo(f"  {key}")
+            click.echo(f"✅ {len(keys)} unreferenced blobs {'deletable' if dry_run else 'deleted'}")
+
+    @app.cli.command('bench-media-queue')
+    @click.option('--orders', default=40, help='Buy-now orders with a payment proof')
+    @click.option('--latency', default=0.3, help='Simulated Cloudinary round trip, in seconds')
+    @click.option('--failures', default=5, help='Injected upload failures (retried with backoff)')
+    @click.option('--threads', default=4, help='Media worker threads')
+    def bench_media_queue(orders, latency, failures, threads):
+        """Offline end-to-end check of queued uploads: request latency, drain time, retries, dedupe (exit 1 on a lost upload)"""
+        import io
+        import statistics
+        from app import db
+        from app.models import Game, MediaJob, Order, PaymentMethod, User
+        from app.utils.cloudinary_utils import FakeCloudinary
+        from app.utils.loadtest_utils import PROOF_PNG
+        from app.utils.media_queue_utils import MediaWorker, media_job_counts
+        from app.utils.media_store import CloudinaryMediaStore
+        from werkzeug.security import generate_password_hash
+
+        bench_app = _bench_app()
+        bench_app.config.update(MEDIA_RETRY_BASE=0.05, MEDIA_RETRY_MAX=0.2)
+        bench_app.extensions['media_store'] = CloudinaryMediaStore()
+        with bench_app.app_context():
+            db.session.add(User(username='mediabench', email='mediabench@example.com',
+                                password_hash=generate_password_hash('bench')))
+            db.session.add(PaymentMethod(name='BCA Transfer', type='bank_transfer',
+                                         account_number='1234567890', account_name='GAME STORE'))
+            games = [Game(title=f'Media Bench {n}', description='-', price=10000, stock=1, initial_stock=1)
+                     for n in range(orders)]
+            db.session.add_all(games)
+            db.session.commit()
+            game_ids = [game.id for game in games]
+            method_id = str(PaymentMethod.query.first().id)
+
+        client = bench_app.test_client()
+        client.post('/login', data={'email': 'mediabench@example.com', 'password': 'bench'})
+        timings = []
+        with FakeCloudinary(latency=latency) as fake:
+            for n, game_id in enumerate(game_ids):
+                # Setiap order kedua mengupload ulang bukti yang sama persis: harus kena dedupe
+                proof = PROOF_PNG + str(n // 2).encode()
+                started = time.perf_counter()
+                response = client.post(f'/buy-now/{game_id}', content_type='multipart/form-data', data={
+                    'payment_method': method_id, 'proof_image': (io.BytesIO(proof), 'proof.png'),
+                })
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 302:
+                    raise click.ClickException(f'buy-now returned {response.status_code}')
+
+            fake.fail_next = failures
+            worker = MediaWorker(bench_app, threads, poll_interval=0.05)
+            started = time.perf_counter()
+            deadline = started + 60
+            while time.perf_counter() < deadline:
+                worker.drain()
+                with bench_app.app_context():
+                    counts = media_job_counts()
+                    db.session.remove()
+                if not counts.get('pending') and not counts.get('running'):
+                    break
+                time.sleep(0.05)
+            drained = time.perf_counter() - started
+            worker.pool.shutdown()
+
+        with bench_app.app_context():
+            missing = Order.query.filter(Order.payment_proof_url.is_(None)).count()
+            retried = MediaJob.query.filter(MediaJob.attempts > 1).count()
+        click.echo(f"request p50 {statistics.median(timings) * 1000:.1f} ms (inline upload would add "
+                   f"~{latency * 1000:.0f} ms), max {max(timings) * 1000:.1f} ms")
+        click.echo(f"drained {orders} jobs with {threads} threads in {drained:.2f}s "
+                   f"({orders / drained:.1f}/s; serial {orders * latency:.1f}s); jobs {counts}, {retried} retried")
+        unique = (orders + 1) // 2
+        click.echo(f"{fake.calls - failures} upload calls, {len(fake.uploads)} stored blobs for {unique} distinct proofs")
+        if missing or counts.get('failed') or len(fake.uploads) != unique:
+            click.echo(f"❌ {missing} orders without proof, {len(fake.uploads)} blobs for {unique} distinct proofs")
+            raise SystemExit(1)
+        click.echo("✅ every payment proof uploaded once and attached")
+
+    @app.cli.command('bench-images')
+    @click.option('--corpus', default=None, type=click.Path(exists=True, file_okay=False),
+                  help='Directory of sample uploads (default: synthetic corpus); each file runs through both presets')
+    @click.option('--bandwidth', default=10.0, help='Modelled uplink bandwidth in Mbit/s')
+    @click.option('--rtt', default=80.0, help='Modelled round trip per upload in ms')
+    @click.option('--repeat', default=3, help='Runs per file (median is reported)')
+    @click.option('--pool', type=click.Choice(['thread', 'process']), default=None, help='Preprocessing pool type')
+    @click.option('--workers', default=None, type=int, help='Preprocessing pool size')
+    @click.option('--format', 'fmt', type=click.Choice(['webp', 'avif']), default=None, help='Output format')
+    @click.option('--output', default=None, type=click.Path(dir_okay=False), help='Write the results as JSON')
+    def bench_images(corpus, bandwidth, rtt, repeat, pool, workers, fmt, output):
+        """Bytes saved and upload time of local image preprocessing on a sample corpus"""
+        import json
+        from app.utils import image_utils
+        from app.utils.image_utils import ImageRejected, benchmark_corpus, preprocess_image, sample_corpus
+
+        if image_utils.Image is None:
+            raise click.ClickException('Pillow is not installed: pip install Pillow')
+        bench_app = _bench_app()
+        bench_app.config['MEDIA_PREPROCESS'] = True
+        for key, value in (('MEDIA_PREPROCESS_POOL', pool), ('MEDIA_PREPROCESS_WORKERS', workers),
+                           ('MEDIA_IMAGE_FORMAT', fmt)):
+            if value is not None:
+                bench_app.config[key] = value
+
+        if corpus:
+            files = []
+            for name in sorted(os.listdir(corpus)):
+                with open(os.path.join(corpus, name), 'rb') as f:
+                    data = f.read()
+                files += [(name, data, 'image'), (name, data, 'payment_proof')]
+        else:
+            click.echo("building synthetic corpus...")
+            files = sample_corpus()
+
+        with bench_app.app_context():
+            result = benchmark_corpus(files, bandwidth, rtt, repeat)
+
+        click.echo(f"{'file':<26} {'preset':<14} {'raw KiB':>9} {'out KiB':>8} {'saved':>6} {'prep ms':>8} "
+                   f"{'upload ms raw':>14} {'optimized':>10}")
+        for row in result['files']:
+            click.echo(f"{row['name'][:26]:<26} {row['preset']:<14} {row['raw_bytes'] / 1024:>9.0f} "
+                       f"{row['optimized_bytes'] / 1024:>8.0f} {row['saved']:>6.1%} {row['preprocess_ms']:>8.1f} "
+                       f"{row['raw_upload_ms']:>14.0f} {row['optimized_upload_ms']:>10.0f}")
+        totals = result['totals']
+        click.echo(f"total: {totals['raw_bytes'] / 1048576:.1f} MiB -> {totals['optimized_bytes'] / 1048576:.2f} MiB "
+                   f"({totals['saved']:.1%} saved); upload {totals['raw_upload_ms'] / 1000:.1f}s -> "
+                   f"{totals['optimized_upload_ms'] / 1000:.1f}s at {bandwidth} Mbit/s, {rtt:.0f} ms RTT")
+        pool_result = result['pool']
+        click.echo(f"pool ({bench_app.config['MEDIA_PREPROCESS_POOL']}): {pool_result['images']} images in "
+                   f"{pool_result['seconds']:.2f}s ({pool_result['images_per_s']:.1f}/s)")
+
+        # Decompression bomb: 400 MP di file PNG kecil, harus ditolak tanpa decode
+        from PIL import Image
+        import io
+        bomb = io.BytesIO()
+        Image.new('1', (20000, 20000)).save(bomb, 'PNG')
+        started = time.perf_counter()
+        try:
+            preprocess_image(bomb.getvalue(), (800, 600), max_pixels=bench_app.config['MEDIA_MAX_PIXELS'])
+            click.echo("❌ decompression bomb was not rejected")
+            raise SystemExit(1)
+        except ImageRejected:
+            click.echo(f"✅ {len(bomb.getvalue()) // 1024} KiB / 400 MP decompression bomb rejected in "
+                       f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        if output:
+            with open(output, 'w') as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+                f.write('\n')
@@ -43,6 +43,12 @@ class Game(db.Model):
     order_items = db.relationship('OrderItem', backref='game', lazy=True)  # Changed from 'ordered_game' to 'game'
     library_items = db.relationship('UserLibrary', backref='game', lazy=True)
 
+    # Storefront: game aktif per kategori, terbaru dulu
+    __table_args__ = (
+        db.Index('ix_game_active_category_created_at', 'is_active', 'category', 'created_at'),
+        db.Index('ix_game_stock', 'stock'),  # Peringatan stok di dashboard admin
+    )
+
 class Order(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -57,6 +63,19 @@ class Order(db.Model):
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True)
 
+    @property
+    def item_count(self):
+        # Diisi sekaligus oleh attach_item_counts(), fallback ke relasi items
+        count = self.__dict__.get('_item_count')
+        return count if count is not None else len(self.items)
+
+    # Keyset pagination admin: (created_at, id), juga per status; riwayat order per user
+    __table_args__ = (
+        db.Index('ix_order_created_at_id', 'created_at', 'id'),
+        db.Index('ix_order_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_order_user_created_at', 'user_id', 'created_at'),
+    )
+
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=False)
@@ -64,6 +83,12 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, default=1)
     price = db.Column(db.Float, nullable=False)
 
+    # Foreign key tidak otomatis ber-index (SQLite / Postgres)
+    __table_args__ = (
+        db.Index('ix_order_item_order_id', 'order_id'),
+        db.Index('ix_order_item_game_id', 'game_id'),
+    )
+
 class PaymentMethod(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -87,6 +112,73 @@ class UserLibrary(db.Model):
     account_email = db.Column(db.String(120))  # Email akun yang dibagikan
     account_password = db.Column(db.String(200))  # Password akun yang dibagikan
 
+    # Satu game hanya sekali per user; juga index untuk cek kepemilikan
+    __table_args__ = (
+        db.Index('uq_user_library_user_game', 'user_id', 'game_id', unique=True),
+    )
+
+class SavedCart(db.Model):
+    """Cart server-side, key = 'user:<id>' atau 'anon:<session id>'"""
+    key = db.Column(db.String(64), primary_key=True)
+    items = db.Column(db.Text, nullable=False, default='')  # format ringkas: "game_id:qty,game_id:qty"
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyGameSales(db.Model):
+    """Rollup penjualan per hari per game (hari = tanggal order dibuat)"""
+    day = db.Column(db.Date, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)  # harga saat order, bukan harga game sekarang
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyPaymentSales(db.Model):
+    """Rollup penjualan per hari per metode pembayaran"""
+    day = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(50), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+class GameExternalId(db.Model):
+    """ID supplier untuk import katalog massal (tabel terpisah: database lama tidak perlu ALTER game)"""
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), primary_key=True)
+    external_id = db.Column(db.String(64), nullable=False, unique=True)
+
+class MediaJob(db.Model):
+    """Antrian upload/hapus gambar Cloudinary, dikerjakan media worker di luar request"""
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(20), nullable=False)  # 'upload' atau 'delete'
+    preset = db.Column(db.String(20))  # 'image' atau 'payment_proof' (transformasi upload)
+    folder = db.Column(db.String(200))
+    scratch_path = db.Column(db.String(500))  # file mentah di disk lokal, dihapus setelah upload
+    host = db.Column(db.String(100))  # node yang punya file scratch
+    target_type = db.Column(db.String(30))  # 'game', 'order' atau 'payment_method'
+    target_id = db.Column(db.String(36))
+    public_id = db.Column(db.String(200))  # yang dihapus (delete) atau hasil upload
+    url = db.Column(db.String(500))
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_media_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_media_job_target', 'target_type', 'target_id'),
+    )
+
+class MediaBlob(db.Model):
+    """Indeks blob media yang content-addressed: key = folder/sha256 dari isi file"""
+    key = db.Column(db.String(200), primary_key=True)
+    backend = db.Column(db.String(20), nullable=False)  # 'cloudinary', 'local' atau 's3'
+    url = db.Column(db.String(500), nullable=False)
+    content_type = db.Column(db.String(50))
+    size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)  # diperbarui setiap dedupe hit
+
 @login_manager.user_loader
 def load_user(id):
     return User.query.get(int(id))
\ No newline at end of file
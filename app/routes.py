@@ -1,15 +1,30 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, session, g, abort, current_app, Response, stream_with_context, send_file
 from flask_login import login_required, current_user, login_user, logout_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from app import db
-from app.models import Game, Order, OrderItem, PaymentMethod, User, UserLibrary
+from app.models import Game, GameExternalId, Order, OrderItem, PaymentMethod, User, UserLibrary
 from app.forms import LoginForm, RegisterForm, GameForm, PaymentMethodForm, PaymentProofForm, AdminSettingsForm  # TAMBAH IMPORT
-from app.utils.cloudinary_utils import upload_image, upload_payment_proof, delete_image
+from app.utils.media_queue_utils import enqueue_upload, enqueue_delete
+from app.utils.media_store import IMMUTABLE_CACHE, sniff_content_type
+from app.utils.stock_utils import reserve_stock, format_stock_failures
+from app.utils.cart_utils import get_cart_games, get_owned_game_ids, calculate_cart_total, get_cart_store, get_cart_key, get_anonymous_cart_key
+from app.utils.cart_store import merge_carts
+from app.utils.category_utils import get_category_facets, get_category_count, invalidate_category_facets
+from app.utils.catalog_utils import list_active_games, get_game_record, get_game_records
+from app.utils.search_utils import search_game_index
+from app.utils.typeahead_utils import typeahead_search
+from app.utils.loading_utils import with_profile, attach_item_counts
+from app.utils.slow_query_utils import load_offenders, slow_query_log_path
+from app.utils.sales_utils import sales_report, GRANULARITIES
+from app.utils.catalog_import_utils import read_catalog, detect_format, plan_import, apply_import, rehost_images
+from app.utils.export_utils import EXPORTS, FORMATS, ORDER_STATUSES, export_stream, export_filename
+from app.utils.verification_utils import generate_access_code, verify_orders
+from app.utils.dashboard_utils import get_dashboard_stats, get_stock_alerts, invalidate_dashboard
+from app.utils.pagination_utils import KEY_TYPES, ORDER_KEY_TYPES, get_page_args, paginate_query, paginate_list, cached_count, clear_count_cache
 import os
-from datetime import datetime
+from datetime import datetime, date
 import json
-import secrets
 import uuid
 
 # Define blueprints di awal file
@@ -18,42 +33,58 @@ auth = Blueprint('auth', __name__)
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
 # Helper functions
+def _set_cart_count(count):
+    # Hanya tulis cookie kalau jumlahnya berubah
+    if session.get('cart_count') != count:
+        session['cart_count'] = count
+
 def get_cart():
-    cart = session.get('cart', [])
+    if 'cart' not in g:
+        store = get_cart_store()
+        # Pengunjung yang hanya melihat cart tidak perlu dibuatkan cart_sid
+        legacy = session.pop('cart', None)
+        key = get_cart_key(create=bool(legacy))
+        lines = store.load(key) if key else []
+        
+        # Pindahkan cart lama yang masih tersimpan di cookie
+        if legacy:
+            merged = dict(lines)
+            for item in legacy:
+                merged[int(item['game_id'])] = merged.get(int(item['game_id']), 0) + int(item['quantity'])
+            lines = list(merged.items())
+            store.save(key, lines)
+            db.session.commit()
+        
+        g.cart = [{'game_id': game_id, 'quantity': quantity} for game_id, quantity in lines]
     # Ensure cart count is updated in session
-    session['cart_count'] = len(cart)
-    return cart
+    _set_cart_count(len(g.cart))
+    return g.cart
 
 def save_cart(cart):
-    session['cart'] = cart
-    session['cart_count'] = len(cart)
-    session.modified = True
-
-def calculate_cart_total(cart):
-    total = 0
-    for item in cart:
-        game = Game.query.get(item['game_id'])
-        if game:
-            total += game.price * item['quantity']
-    return total
+    key = get_cart_key(create=bool(cart))
+    if key:
+        get_cart_store().save(key, [(item['game_id'], item['quantity']) for item in cart])
+        # Store database tidak commit sendiri
+        db.session.commit()
+    g.cart = cart
+    _set_cart_count(len(cart))
 
 def get_categories():
     """Get all unique categories"""
-    categories = db.session.query(Game.category).distinct().all()
-    return [category[0] for category in categories if category[0]]
+    return [facet['name'] for facet in get_category_facets()]
 
 def get_game_count_by_category(category):
     """Get game count for a specific category"""
-    return Game.query.filter_by(category=category, is_active=True).count()
+    return get_category_count(category)
 
-def generate_access_code():
-    """Generate unique access code for cloud code sharing"""
-    return secrets.token_hex(8).upper()
+def _game_key(game):
+    # Key keyset untuk daftar katalog (urutan created_at desc, id desc)
+    return (game.created_at or datetime.min, game.id)
 
 # ==================== MAIN ROUTES ====================
 @main.route('/')
 def index():
-    all_active_games = Game.query.filter_by(is_active=True).order_by(Game.created_at.desc()).all()
+    all_active_games = list_active_games()
     
     category_latest_dates = {}
     
@@ -76,23 +107,15 @@ def index():
     
     ordered_featured_games = dict(sorted_categories)
     
-    popular_games = Game.query.filter_by(is_active=True).all()
-    
-    categories = get_categories()
+    popular_games = sorted(all_active_games, key=lambda game: game.id)
     
     categories_with_counts = []
-    for category in categories:
-        latest_game = Game.query.filter_by(
-            category=category, 
-            is_active=True
-        ).order_by(Game.created_at.desc()).first()
-        
-        latest_date = latest_game.created_at if latest_game else datetime.utcnow()
-        
+    for facet in get_category_facets():
+        category = facet['name']
         categories_with_counts.append({
             'name': category,
-            'count': get_game_count_by_category(category),
-            'latest_date': latest_date,
+            'count': facet['count'],
+            'latest_date': facet['latest_date'] or datetime.utcnow(),
             'icon': 'cloud' if 'Cloud' in category or 'cloud' in category.lower() else 'fish'
         })
     
@@ -109,57 +132,62 @@ def games():
     search = request.args.get('search')
     in_stock_only = request.args.get('in_stock')
     
-    query = Game.query.filter_by(is_active=True)
-    
-    if category and category != 'all':
-        query = query.filter_by(category=category)
+    games = list_active_games(category if category and category != 'all' else None)
     
     if search:
-        query = query.filter(Game.title.ilike(f'%{search}%'))
+        # Urutkan berdasarkan relevansi full-text
+        visible = {game.id: game for game in games}
+        games = [visible[hit['id']] for hit in search_game_index(search, limit=None, snippets=False) if hit['id'] in visible]
     
     # Filter in stock only
     if in_stock_only:
-        query = query.filter(Game.stock > 0)
+        games = [game for game in games if game.stock > 0]
     
-    games = query.order_by(Game.created_at.desc()).all()
-    categories = get_categories()
+    cursor, direction, per_page = get_page_args(key_types=(int,) if search else KEY_TYPES)
+    if search:
+        # Hasil pencarian tetap urut relevansi, posisi dipakai sebagai key
+        ranked = list(enumerate(games))
+        page = paginate_list(ranked, lambda item: (-item[0],), cursor, direction, per_page)
+        page.items = [game for _, game in page.items]
+    else:
+        page = paginate_list(games, _game_key, cursor, direction, per_page)
     
     # Prepare category data with counts
-    categories_with_counts = []
-    for category_item in categories:
-        categories_with_counts.append({
-            'name': category_item,
-            'count': get_game_count_by_category(category_item)
-        })
+    categories_with_counts = [
+        {'name': facet['name'], 'count': facet['count']}
+        for facet in get_category_facets()
+    ]
     
     return render_template('games.html', 
-                         games=games, 
+                         games=page.items, 
+                         page=page,
                          categories=categories_with_counts, 
                          current_category=category)
 
 @main.route('/category/<category_name>')
 def category_games(category_name):
     """Route khusus untuk kategori"""
-    games = Game.query.filter_by(category=category_name, is_active=True).order_by(Game.created_at.desc()).all()
-    categories = get_categories()
+    cursor, direction, per_page = get_page_args()
+    page = paginate_list(list_active_games(category_name), _game_key, cursor, direction, per_page)
     
     # Prepare category data with counts
-    categories_with_counts = []
-    for category in categories:
-        categories_with_counts.append({
-            'name': category,
-            'count': get_game_count_by_category(category)
-        })
+    categories_with_counts = [
+        {'name': facet['name'], 'count': facet['count']}
+        for facet in get_category_facets()
+    ]
     
     return render_template('games.html', 
-                         games=games, 
+                         games=page.items, 
+                         page=page,
                          categories=categories_with_counts, 
                          current_category=category_name,
                          category_name=category_name)
 
 @main.route('/game/<int:game_id>')
 def game_detail(game_id):
-    game = Game.query.get_or_404(game_id)
+    game = get_game_record(game_id)
+    if game is None:
+        abort(404)
     in_library = False
     if current_user.is_authenticated:
         in_library = UserLibrary.query.filter_by(user_id=current_user.id, game_id=game_id).first() is not None
@@ -173,12 +201,11 @@ def game_detail(game_id):
                          stock_status=stock_status)
 
 @main.route('/add-to-cart/<int:game_id>')
-@login_required
 def add_to_cart(game_id):
     game = Game.query.get_or_404(game_id)
     
     # Check if user already owns the game
-    if UserLibrary.query.filter_by(user_id=current_user.id, game_id=game_id).first():
+    if current_user.is_authenticated and UserLibrary.query.filter_by(user_id=current_user.id, game_id=game_id).first():
         flash('You already own this game!', 'warning')
         return redirect(request.referrer or url_for('main.games'))
     
@@ -205,11 +232,7 @@ def add_to_cart(game_id):
     # Add new item to cart
     cart.append({
         'game_id': game_id,
-        'title': game.title,
-        'price': float(game.price),
-        'quantity': 1,
-        'image_url': game.image_url,
-        'stock': game.stock  # Simpan info stok di cart
+        'quantity': 1
     })
     
     save_cart(cart)
@@ -223,7 +246,7 @@ def buy_now(game_id):
     game = Game.query.get_or_404(game_id)
     
     # Check if user already owns the game
-    if UserLibrary.query.filter_by(user_id=current_user.id, game_id=game_id).first():
+    if current_user.is_authenticated and UserLibrary.query.filter_by(user_id=current_user.id, game_id=game_id).first():
         flash('You already own this game!', 'warning')
         return redirect(url_for('main.library'))
     
@@ -238,32 +261,28 @@ def buy_now(game_id):
         form.payment_method.choices = [(str(pm.id), f"{pm.name} - {pm.account_number} ({pm.type})") for pm in payment_methods]
         
         if form.validate_on_submit():
-            payment_proof_url = None
-            payment_proof_public_id = None
-            
-            # Upload payment proof to Cloudinary
-            if form.proof_image.data:
-                upload_result = upload_payment_proof(form.proof_image.data, folder="game_store/payment_proofs")
-                if upload_result['success']:
-                    payment_proof_url = upload_result['url']
-                    payment_proof_public_id = upload_result['public_id']
-                else:
-                    flash('Failed to upload payment proof. Please try again.', 'error')
-                    return render_template('buy_now.html', form=form, game=game)
-            
             try:
+                # Ambil stok secara atomik sebelum membuat order
+                reservation = reserve_stock([(game.id, 1)])
+                if not reservation['success']:
+                    db.session.rollback()
+                    flash(f'Sorry, {game.title} is out of stock!', 'error')
+                    return redirect(url_for('main.game_detail', game_id=game_id))
+                
                 # Create order
                 order = Order(
                     user_id=current_user.id,
                     total_amount=game.price,
-                    payment_method=form.payment_method.data,
-                    payment_proof_url=payment_proof_url,
-                    payment_proof_public_id=payment_proof_public_id
+                    payment_method=form.payment_method.data
                 )
                 
                 db.session.add(order)
                 db.session.flush()  # Flush untuk mendapatkan order.id
                 
+                # Bukti pembayaran diupload ke Cloudinary oleh media worker
+                if form.proof_image.data:
+                    enqueue_upload(form.proof_image.data, 'payment_proof', 'game_store/payment_proofs', 'order', order.id)
+                
                 # Add order item
                 order_item = OrderItem(
                     order_id=order.id,
@@ -273,9 +292,6 @@ def buy_now(game_id):
                 )
                 db.session.add(order_item)
                 
-                # Kurangi stok
-                game.stock -= 1
-                
                 db.session.commit()
                 
                 flash('Order created successfully! Please wait for payment verification.', 'success')
@@ -294,17 +310,15 @@ def buy_now(game_id):
     return render_template('buy_now.html', form=form, game=game)
 
 @main.route('/cart')
-@login_required
 def cart():
     cart_items = get_cart()
+    games = get_cart_games(cart_items)
     games_in_cart = []
     total = 0
     
     for item in cart_items:
-        game = Game.query.get(item['game_id'])
+        game = games.get(item['game_id'])
         if game:
-            # Update stock info in cart
-            item['stock'] = game.stock
             item_total = game.price * item['quantity']
             total += item_total
             games_in_cart.append({
@@ -314,18 +328,15 @@ def cart():
                 'max_quantity': min(item['quantity'], game.stock)  # Batasi quantity berdasarkan stok
             })
     
-    save_cart(cart_items)  # Update cart dengan info stok terbaru
-    
     return render_template('cart.html', cart_items=games_in_cart, total=total)
 
 @main.route('/update-cart', methods=['POST'])
-@login_required
 def update_cart():
     cart = get_cart()
     game_id = int(request.form.get('game_id'))
     action = request.form.get('action')
     
-    game = Game.query.get(game_id)
+    game = get_cart_games(cart).get(game_id)
     if not game:
         flash('Game not found!', 'error')
         return redirect(url_for('main.cart'))
@@ -348,7 +359,6 @@ def update_cart():
     return redirect(url_for('main.cart'))
 
 @main.route('/clear-cart', methods=['POST'])
-@login_required
 def clear_cart():
     """Clear entire cart"""
     save_cart([])
@@ -363,10 +373,13 @@ def checkout():
         flash('Your cart is empty!', 'warning')
         return redirect(url_for('main.cart'))
     
+    # Satu query untuk semua game di cart, dipakai ulang sampai order dibuat
+    games = get_cart_games(cart_items)
+    
     # Check stock availability for all items in cart
     out_of_stock_items = []
     for item in cart_items:
-        game = Game.query.get(item['game_id'])
+        game = games.get(item['game_id'])
         if game and game.stock < item['quantity']:
             out_of_stock_items.append(f"{game.title} (Available: {game.stock})")
     
@@ -375,10 +388,8 @@ def checkout():
         return redirect(url_for('main.cart'))
     
     # Check if any games in cart are already owned
-    owned_games = []
-    for item in cart_items:
-        if UserLibrary.query.filter_by(user_id=current_user.id, game_id=item['game_id']).first():
-            owned_games.append(Game.query.get(item['game_id']).title)
+    owned_ids = get_owned_game_ids(current_user.id, cart_items)
+    owned_games = [games[game_id].title for game_id in owned_ids if game_id in games]
     
     if owned_games:
         flash(f'You already own: {", ".join(owned_games)}. Please remove them from cart.', 'warning')
@@ -391,46 +402,35 @@ def checkout():
     total = calculate_cart_total(cart_items)
     
     if form.validate_on_submit():
-        payment_proof_url = None
-        payment_proof_public_id = None
-        
-        # Upload payment proof to Cloudinary
-        if form.proof_image.data:
-            upload_result = upload_payment_proof(form.proof_image.data, folder="game_store/payment_proofs")
-            if upload_result['success']:
-                payment_proof_url = upload_result['url']
-                payment_proof_public_id = upload_result['public_id']
-            else:
-                flash('Failed to upload payment proof. Please try again.', 'error')
-                return render_template('checkout.html', form=form, total=total, cart_count=len(cart_items))
-        
         try:
+            # Ambil stok seluruh cart dalam satu transaksi
+            reservation = reserve_stock([(item['game_id'], item['quantity']) for item in cart_items])
+            if not reservation['success']:
+                db.session.rollback()
+                flash(f'Some items are out of stock: {format_stock_failures(reservation["failed"])}', 'error')
+                return redirect(url_for('main.cart'))
+            
             # Create order
             order = Order(
                 user_id=current_user.id,
                 total_amount=total,
-                payment_method=form.payment_method.data,
-                payment_proof_url=payment_proof_url,
-                payment_proof_public_id=payment_proof_public_id
+                payment_method=form.payment_method.data
             )
             
             db.session.add(order)
             db.session.flush()  # Flush untuk mendapatkan order.id
             
-            # Add order items dan kurangi stok
-            for item in cart_items:
-                game = Game.query.get(item['game_id'])
-                if game:
-                    order_item = OrderItem(
-                        order_id=order.id,
-                        game_id=game.id,
-                        quantity=item['quantity'],
-                        price=game.price
-                    )
-                    db.session.add(order_item)
-                    
-                    # Kurangi stok
-                    game.stock -= item['quantity']
+            # Bukti pembayaran diupload ke Cloudinary oleh media worker
+            if form.proof_image.data:
+                enqueue_upload(form.proof_image.data, 'payment_proof', 'game_store/payment_proofs', 'order', order.id)
+            
+            # Add order items (satu executemany untuk seluruh cart)
+            db.session.execute(OrderItem.__table__.insert(), [{
+                'order_id': order.id,
+                'game_id': item['game_id'],
+                'quantity': item['quantity'],
+                'price': games[item['game_id']].price
+            } for item in cart_items if item['game_id'] in games])
             
             db.session.commit()
             
@@ -448,10 +448,28 @@ def checkout():
     
     return render_template('checkout.html', form=form, total=total, cart_count=len(cart_items))
 
+@main.route('/media/<path:key>')
+def media_file(key):
+    """Serve blobs of the local media storage; content-addressed, so cacheable forever"""
+    store = current_app.extensions['media_store']
+    if store.name != 'local':
+        abort(404)
+    try:
+        path = store.path(key)
+    except ValueError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+    with open(path, 'rb') as f:
+        content_type = sniff_content_type(f.read(16))
+    response = send_file(path, mimetype=content_type, conditional=True, etag=key.rsplit('/', 1)[-1])
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
 @main.route('/order/success/<order_id>')
 @login_required
 def order_success(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = with_profile(Order.query, 'order_detail').get_or_404(order_id)
     if order.user_id != current_user.id and not current_user.is_admin:
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
@@ -461,7 +479,7 @@ def order_success(order_id):
 @main.route('/library')
 @login_required
 def library():
-    user_library = UserLibrary.query.filter_by(user_id=current_user.id).all()
+    user_library = with_profile(UserLibrary.query, 'library').filter_by(user_id=current_user.id).all()
     return render_template('library.html', library=user_library)
 
 @main.route('/download/<int:game_id>')
@@ -510,10 +528,27 @@ def search_games():
     if len(query) < 2:
         return jsonify([])
     
-    games = Game.query.filter(
-        Game.title.ilike(f'%{query}%'),
-        Game.is_active == True
-    ).limit(10).all()
+    def render(games):
+        # url_for sekali saja, bukan per hasil
+        detail_url = url_for('main.game_detail', game_id=0)[:-1]
+        return [{
+            'id': game.id,
+            'title': game.title,
+            'category': game.category,
+            'price': game.price,
+            'image_url': game.image_url,
+            'stock': game.stock,
+            'url': f'{detail_url}{game.id}'
+        } for game in games]
+    
+    # Index typeahead di memori, tanpa query database
+    results = typeahead_search(query, 10, render)
+    if results is not None:
+        return jsonify(results)
+    
+    hits = search_game_index(query, limit=10, columns=('title', 'category'))
+    games = get_game_records([hit['id'] for hit in hits])
+    snippets = {hit['id']: hit for hit in hits}
     
     results = []
     for game in games:
@@ -524,6 +559,8 @@ def search_games():
             'price': game.price,
             'image_url': game.image_url,
             'stock': game.stock,
+            'snippet': str(snippets[game.id]['snippet']),
+            'rank': snippets[game.id]['rank'],
             'url': url_for('main.game_detail', game_id=game.id)
         })
     
@@ -540,7 +577,15 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user and check_password_hash(user.password_hash, form.password.data):
+            anonymous_key = get_anonymous_cart_key(create=False)
             login_user(user, remember=form.remember_me.data)
+            
+            # Gabungkan cart anonim ke cart user
+            if anonymous_key:
+                lines = merge_carts(get_cart_store(), anonymous_key, get_cart_key())
+                db.session.commit()
+                session.pop('cart_sid', None)
+                session['cart_count'] = len(lines)
             next_page = request.args.get('next')
             flash('Login successful!', 'success')
             return redirect(next_page or url_for('main.index'))
@@ -586,9 +631,10 @@ def register():
 @login_required
 def logout():
     logout_user()
-    # Clear cart session on logout
+    # Cart tetap tersimpan server-side, cookie cukup dibersihkan
     session.pop('cart', None)
     session.pop('cart_count', None)
+    session.pop('cart_sid', None)
     flash('You have been logged out.', 'info')
     return redirect(url_for('main.index'))
 
@@ -607,24 +653,13 @@ def admin_dashboard():
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    # Get all games for stock calculation
-    all_games = Game.query.all()
-    low_stock_games = len([g for g in all_games if 0 < g.stock <= 5])
-    out_of_stock_games = len([g for g in all_games if g.stock <= 0])
-    
-    stats = {
-        'total_orders': Order.query.count(),
-        'pending_orders': Order.query.filter_by(status='pending').count(),
-        'total_games': len(all_games),
-        'total_users': User.query.count(),
-        'total_revenue': db.session.query(db.func.sum(Order.total_amount)).filter_by(status='paid').scalar() or 0,
-        'low_stock_games': low_stock_games,
-        'out_of_stock_games': out_of_stock_games
-    }
+    stats = get_dashboard_stats()
+    out_of_stock_games, low_stock_games = get_stock_alerts(limit=3)
     
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = with_profile(Order.query, 'recent_orders').order_by(Order.created_at.desc()).limit(5).all()
     
-    return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders, games=all_games)
+    return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders,
+                           out_of_stock_games=out_of_stock_games, low_stock_games=low_stock_games)
 
 @admin.route('/settings', methods=['GET', 'POST'])
 @login_required
@@ -690,13 +725,36 @@ def admin_orders():
         return redirect(url_for('main.index'))
     
     status_filter = request.args.get('status', 'all')
-    query = Order.query
+    query = with_profile(Order.query, 'admin_order_list')
     
     if status_filter != 'all':
         query = query.filter_by(status=status_filter)
     
-    orders = query.order_by(Order.created_at.desc()).all()
-    return render_template('admin/orders.html', orders=orders, status_filter=status_filter)
+    cursor, direction, per_page = get_page_args('ADMIN_PAGE_SIZE', ORDER_KEY_TYPES)
+    page = paginate_query(query, (Order.created_at, Order.id), cursor, direction, per_page)
+    attach_item_counts(page.items)
+    return render_template('admin/orders.html',
+                         orders=page.items,
+                         page=page,
+                         order_stats=_order_stats(),
+                         status_filter=status_filter)
+
+def _order_stats():
+    """Jumlah pesanan per status + total pendapatan, dari cache estimasi"""
+    def load():
+        rows = db.session.query(
+            Order.status,
+            db.func.count(Order.id),
+            db.func.sum(Order.total_amount)
+        ).group_by(Order.status).all()
+        stats = {'all': 0, 'pending': 0, 'paid': 0, 'cancelled': 0, 'revenue': 0.0}
+        for status, count, amount in rows:
+            stats[status] = count
+            stats['all'] += count
+            if status == 'paid':
+                stats['revenue'] = float(amount or 0)
+        return stats
+    return cached_count('orders:stats', load)
 
 @admin.route('/order/<order_id>')
 @login_required
@@ -705,7 +763,7 @@ def admin_order_detail(order_id):
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    order = Order.query.get_or_404(order_id)
+    order = with_profile(Order.query, 'order_detail').get_or_404(order_id)
     return render_template('admin/order_detail.html', order=order)
 
 @admin.route('/verify-payment/<order_id>', methods=['POST'])
@@ -715,65 +773,92 @@ def verify_payment(order_id):
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    order = Order.query.get_or_404(order_id)
     action = request.form.get('action')
+    if action not in ('approve', 'reject'):
+        flash('Invalid action.', 'error')
+        return redirect(url_for('admin.admin_orders'))
     
     try:
-        if action == 'approve':
-            order.status = 'paid'
-            # Add games to user's library
-            for item in order.items:
-                # Check if user already has this game
-                existing = UserLibrary.query.filter_by(user_id=order.user_id, game_id=item.game_id).first()
-                if not existing:
-                    # Get the game details
-                    game = Game.query.get(item.game_id)
-                    if not game:
-                        continue  # Skip if game not found
-                    
-                    # Generate unique access info berdasarkan share method
-                    access_code = None
-                    account_email = None
-                    account_password = None
-                    
-                    if game.share_method == 'cloud_code':
-                        access_code = generate_access_code()
-                    elif game.share_method == 'account':
-                        account_email = game.account_email
-                        account_password = game.account_password
-                    
-                    library_item = UserLibrary(
-                        user_id=order.user_id, 
-                        game_id=item.game_id,
-                        access_code=access_code,
-                        account_email=account_email,
-                        account_password=account_password
-                    )
-                    db.session.add(library_item)
-            
-            flash('Payment approved! Games added to user library.', 'success')
-            
-        elif action == 'reject':
-            order.status = 'cancelled'
-            # Kembalikan stok jika order ditolak
-            for item in order.items:
-                game = Game.query.get(item.game_id)
-                if game:
-                    game.stock += item.quantity
-            flash('Payment rejected! Stock has been restored.', 'warning')
-        
-        db.session.commit()
-        
+        # Klaim yang sama dengan bulk verify: hanya order yang masih pending
+        # (halaman lama tidak bisa menghidupkan order yang sudah disapu sweeper)
+        result = verify_orders([order_id], action)['results'][0]
+        clear_count_cache('orders:')
+        invalidate_dashboard()
     except Exception as e:
-        db.session.rollback()
         flash('Error processing payment verification.', 'error')
         print(f"Error in verify_payment: {e}")
         # Debug lebih detail
         import traceback
         print(traceback.format_exc())
+        return redirect(url_for('admin.admin_orders'))
+    
+    if result['result'] == 'not_found':
+        abort(404)
+    if result['result'] == 'skipped':
+        flash(f"Order is no longer pending (status: {result['status']}).", 'warning')
+    elif action == 'approve':
+        flash('Payment approved! Games added to user library.', 'success')
+    else:
+        flash('Payment rejected! Stock has been restored.', 'warning')
     
     return redirect(url_for('admin.admin_orders'))
 
+@admin.route('/orders/bulk-verify', methods=['POST'])
+@login_required
+def bulk_verify_payments():
+    """Approve/reject many pending orders in one transaction"""
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    wants_json = request.args.get('format') == 'json' or request.is_json
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        action, order_ids = data.get('action'), data.get('order_ids') or []
+    else:
+        action, order_ids = request.form.get('action'), request.form.getlist('order_ids')
+    order_ids = [str(order_id) for order_id in order_ids if order_id]
+    limit = current_app.config.get('BULK_VERIFY_MAX_ORDERS', 500)
+    
+    error = None
+    if action not in ('approve', 'reject'):
+        error = 'Invalid action.'
+    elif not order_ids:
+        error = 'No orders selected.'
+    elif len(order_ids) > limit:
+        error = f'Too many orders selected (max {limit}).'
+    if error:
+        if wants_json:
+            return jsonify({'error': error}), 400
+        flash(error, 'error')
+        return redirect(request.referrer or url_for('admin.admin_orders'))
+    
+    try:
+        summary = verify_orders(order_ids, action)
+        clear_count_cache('orders:')
+        invalidate_dashboard()
+    except Exception as e:
+        print(f"❌ Error in bulk_verify_payments: {e}")
+        if wants_json:
+            return jsonify({'error': 'Error processing payment verification.'}), 500
+        flash('Error processing payment verification.', 'error')
+        return redirect(request.referrer or url_for('admin.admin_orders'))
+    
+    if wants_json:
+        return jsonify(summary)
+    
+    done = 'approved' if action == 'approve' else 'rejected'
+    message = f"{summary['processed']} order(s) {done}"
+    if action == 'approve':
+        message += f", {summary['library_rows']} game(s) added to libraries"
+    flash(message + '.', 'success' if action == 'approve' else 'warning')
+    skipped = [r for r in summary['results'] if r['result'] != done]
+    if skipped:
+        details = ', '.join(f"{r['order_id'][:8]} ({r['status'] or 'not found'})" for r in skipped[:10])
+        more = f' and {len(skipped) - 10} more' if len(skipped) > 10 else ''
+        flash(f'{len(skipped)} order(s) skipped because they are no longer pending: {details}{more}.', 'info')
+    return redirect(request.referrer or url_for('admin.admin_orders'))
+
 @admin.route('/games')
 @login_required
 def admin_games():
@@ -781,8 +866,24 @@ def admin_games():
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    games = Game.query.order_by(Game.created_at.desc()).all()
-    return render_template('admin/games.html', games=games)
+    cursor, direction, per_page = get_page_args('ADMIN_PAGE_SIZE')
+    page = paginate_query(Game.query, (Game.created_at, Game.id), cursor, direction, per_page)
+    return render_template('admin/games.html', games=page.items, page=page, game_stats=_game_stats())
+
+def _game_stats():
+    """Ringkasan stok semua game dalam satu query, dari cache estimasi"""
+    def load():
+        row = db.session.query(
+            db.func.count(Game.id),
+            db.func.sum(db.case((Game.stock > 10, 1), else_=0)),
+            db.func.sum(db.case(((Game.stock > 0) & (Game.stock <= 10), 1), else_=0)),
+            db.func.sum(db.case((Game.stock <= 0, 1), else_=0)),
+            db.func.sum(db.case((Game.is_active == True, 1), else_=0))
+        ).one()
+        total, in_stock, low_stock, out_of_stock, active = [int(value or 0) for value in row]
+        return {'total': total, 'in_stock': in_stock, 'low_stock': low_stock,
+                'out_of_stock': out_of_stock, 'active': active, 'inactive': total - active}
+    return cached_count('games:stats', load)
 
 @admin.route('/game/new', methods=['GET', 'POST'])
 @login_required
@@ -793,22 +894,8 @@ def admin_add_game():
     
     form = GameForm()
     if form.validate_on_submit():
-        image_url = None
-        image_public_id = None
-        
-        # Handle image upload to Cloudinary
-        if form.image_file.data:
-            upload_result = upload_image(form.image_file.data, folder="game_store/games")
-            if upload_result['success']:
-                image_url = upload_result['url']
-                image_public_id = upload_result['public_id']
-            else:
-                flash('Failed to upload image. Please try again.', 'error')
-                return render_template('admin/game_form.html', form=form, title='Add New Game')
-        
-        # Use default image if no image uploaded
-        if not image_url:
-            image_url = 'https://res.cloudinary.com/dzfkklsza/image/upload/v1700000000/default-game.jpg'
+        # Gambar default sampai media worker selesai mengupload gambar baru
+        image_url = 'https://res.cloudinary.com/dzfkklsza/image/upload/v1700000000/default-game.jpg'
         
         game = Game(
             title=form.title.data,
@@ -816,7 +903,6 @@ def admin_add_game():
             short_description=form.short_description.data,
             price=form.price.data,
             image_url=image_url,
-            image_public_id=image_public_id,
             
             # Fitur baru
             stock=form.stock.data,
@@ -831,13 +917,64 @@ def admin_add_game():
         )
         
         db.session.add(game)
+        db.session.flush()  # Flush untuk mendapatkan game.id
+        if form.image_file.data:
+            enqueue_upload(form.image_file.data, 'image', 'game_store/games', 'game', game.id)
         db.session.commit()
+        invalidate_category_facets()
+        clear_count_cache('games:')
+        invalidate_dashboard()
         
         flash('Game added successfully!', 'success')
         return redirect(url_for('admin.admin_games'))
     
     return render_template('admin/game_form.html', form=form, title='Add New Game')
 
+@admin.route('/games/import', methods=['GET', 'POST'])
+@login_required
+def admin_import_games():
+    """Bulk create/update/restock games from CSV or JSON, with a dry-run diff"""
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    if request.method == 'GET':
+        return render_template('admin/game_import.html', plan=None)
+    
+    upload = request.files.get('catalog_file')
+    if not upload or not upload.filename:
+        flash('Choose a CSV or JSON file to import.', 'error')
+        return redirect(url_for('admin.admin_import_games'))
+    
+    dry_run = request.form.get('dry_run') == '1'
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    try:
+        plan = plan_import(read_catalog(upload.read(), fmt))
+    except ValueError as e:
+        flash(f'Could not read {upload.filename}: {e}', 'error')
+        return redirect(url_for('admin.admin_import_games'))
+    
+    if dry_run or not plan.ok:
+        if not plan.ok and not dry_run:
+            flash('Nothing was imported: fix the errors below and upload again.', 'error')
+        return render_template('admin/game_import.html', plan=plan, filename=upload.filename, dry_run=dry_run)
+    
+    try:
+        result = apply_import(plan)
+    except Exception as e:
+        print(f"❌ Catalog import error: {e}")
+        flash('Error importing catalog. Nothing was changed.', 'error')
+        return redirect(url_for('admin.admin_import_games'))
+    invalidate_category_facets()
+    clear_count_cache('games:')
+    invalidate_dashboard()
+    
+    if request.form.get('rehost_images') == '1':
+        rehost_images(current_app._get_current_object(), result['images'])
+    flash(f"Catalog imported: {result['created']} created, {result['updated']} updated, "
+          f"{result['restocked']} restocked.", 'success')
+    return redirect(url_for('admin.admin_games'))
+
 @admin.route('/game/<int:game_id>/edit', methods=['GET', 'POST'])
 @login_required
 def admin_edit_game(game_id):
@@ -849,21 +986,6 @@ def admin_edit_game(game_id):
     form = GameForm(obj=game)
     
     if form.validate_on_submit():
-        # Handle new image upload
-        if form.image_file.data:
-            # Delete old image from Cloudinary if exists
-            if game.image_public_id:
-                delete_image(game.image_public_id)
-            
-            # Upload new image
-            upload_result = upload_image(form.image_file.data, folder="game_store/games")
-            if upload_result['success']:
-                game.image_url = upload_result['url']
-                game.image_public_id = upload_result['public_id']
-            else:
-                flash('Failed to upload image. Please try again.', 'error')
-                return render_template('admin/game_form.html', form=form, title='Edit Game', game=game)
-        
         game.title = form.title.data
         game.description = form.description.data
         game.short_description = form.short_description.data
@@ -891,7 +1013,14 @@ def admin_edit_game(game_id):
         game.category = form.category.data
         game.is_active = form.is_active.data
         
+        # Gambar baru diupload worker; gambar lama dihapus setelah yang baru terpasang
+        if form.image_file.data:
+            enqueue_upload(form.image_file.data, 'image', 'game_store/games', 'game', game.id)
+        
         db.session.commit()
+        invalidate_category_facets()
+        clear_count_cache('games:')
+        invalidate_dashboard()
         flash('Game updated successfully!', 'success')
         return redirect(url_for('admin.admin_games'))
     
@@ -910,6 +1039,9 @@ def admin_restock_game(game_id):
     if new_stock is not None and new_stock >= 0:
         game.stock = new_stock
         db.session.commit()
+        invalidate_category_facets()
+        clear_count_cache('games:')
+        invalidate_dashboard()
         flash(f'Stock updated to {new_stock} for {game.title}', 'success')
     else:
         flash('Invalid stock quantity', 'error')
@@ -931,12 +1063,15 @@ def admin_delete_game(game_id):
         flash('Cannot delete game with existing orders!', 'error')
         return redirect(url_for('admin.admin_games'))
     
-    # Delete image from Cloudinary
-    if game.image_public_id:
-        delete_image(game.image_public_id)
+    # Hapus gambar di Cloudinary lewat antrian media
+    enqueue_delete(game.image_public_id)
     
+    GameExternalId.query.filter_by(game_id=game_id).delete()
     db.session.delete(game)
     db.session.commit()
+    invalidate_category_facets()
+    clear_count_cache('games:')
+    invalidate_dashboard()
     
     flash('Game deleted successfully!', 'success')
     return redirect(url_for('admin.admin_games'))
@@ -960,28 +1095,19 @@ def admin_add_payment_method():
     
     form = PaymentMethodForm()
     if form.validate_on_submit():
-        qr_code_url = None
-        qr_code_public_id = None
-        
-        # Handle QR code upload
-        if form.qr_code_file.data:
-            upload_result = upload_image(form.qr_code_file.data, folder="game_store/qr_codes")
-            if upload_result['success']:
-                qr_code_url = upload_result['url']
-                qr_code_public_id = upload_result['public_id']
-        
         payment_method = PaymentMethod(
             name=form.name.data,
             type=form.type.data,
             account_number=form.account_number.data,
             account_name=form.account_name.data,
-            qr_code_url=qr_code_url,
-            qr_code_public_id=qr_code_public_id,
             instructions=form.instructions.data,
             is_active=form.is_active.data
         )
         
         db.session.add(payment_method)
+        db.session.flush()  # Flush untuk mendapatkan payment_method.id
+        if form.qr_code_file.data:
+            enqueue_upload(form.qr_code_file.data, 'image', 'game_store/qr_codes', 'payment_method', payment_method.id)
         db.session.commit()
         
         flash('Payment method added successfully!', 'success')
@@ -1000,17 +1126,9 @@ def admin_edit_payment_method(method_id):
     form = PaymentMethodForm(obj=payment_method)
     
     if form.validate_on_submit():
-        # Handle new QR code upload
+        # QR code baru diupload worker; yang lama dihapus setelah yang baru terpasang
         if form.qr_code_file.data:
-            # Delete old QR code if exists
-            if payment_method.qr_code_public_id:
-                delete_image(payment_method.qr_code_public_id)
-            
-            # Upload new QR code
-            upload_result = upload_image(form.qr_code_file.data, folder="game_store/qr_codes")
-            if upload_result['success']:
-                payment_method.qr_code_url = upload_result['url']
-                payment_method.qr_code_public_id = upload_result['public_id']
+            enqueue_upload(form.qr_code_file.data, 'image', 'game_store/qr_codes', 'payment_method', payment_method.id)
         
         payment_method.name = form.name.data
         payment_method.type = form.type.data
@@ -1034,9 +1152,8 @@ def admin_delete_payment_method(method_id):
     
     payment_method = PaymentMethod.query.get_or_404(method_id)
     
-    # Delete QR code from Cloudinary
-    if payment_method.qr_code_public_id:
-        delete_image(payment_method.qr_code_public_id)
+    # Hapus QR code di Cloudinary lewat antrian media
+    enqueue_delete(payment_method.qr_code_public_id)
     
     db.session.delete(payment_method)
     db.session.commit()
@@ -1051,8 +1168,10 @@ def admin_users():
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/users.html', users=users)
+    cursor, direction, per_page = get_page_args('ADMIN_PAGE_SIZE')
+    page = paginate_query(User.query, (User.created_at, User.id), cursor, direction, per_page,
+                          total=cached_count('users:total', lambda: User.query.count()))
+    return render_template('admin/users.html', users=page.items, page=page)
 
 @admin.route('/user/<int:user_id>/toggle-admin', methods=['POST'])
 @login_required
@@ -1108,39 +1227,105 @@ def admin_sales_report():
         flash('Access denied!', 'error')
         return redirect(url_for('main.index'))
     
-    # Get sales data
-    total_sales = db.session.query(db.func.sum(Order.total_amount)).filter_by(status='paid').scalar() or 0
-    total_orders = Order.query.filter_by(status='paid').count()
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        granularity = 'month'
+    start = request.args.get('start', type=date.fromisoformat)
+    end = request.args.get('end', type=date.fromisoformat)
     
-    # Get popular games
-    popular_games_data = db.session.query(
-        Game.title, 
-        db.func.sum(OrderItem.quantity).label('total_sold')
-    ).select_from(OrderItem).join(Game, OrderItem.game_id == Game.id).join(Order, OrderItem.order_id == Order.id).filter(Order.status == 'paid').group_by(Game.id).order_by(db.desc('total_sold')).limit(5).all()
-    
-    popular_games = []
-    for game_title, total_sold in popular_games_data:
-        game = Game.query.filter_by(title=game_title).first()
-        if game:
-            popular_games.append({
-                'title': game_title,
-                'total_sold': total_sold,
-                'revenue': total_sold * game.price
-            })
+    # Dibaca dari tabel rollup harian, bukan dari semua order
+    report = sales_report(start, end, granularity)
     
     return render_template('admin/sales_report.html',
-                         total_sales=total_sales,
-                         total_orders=total_orders,
-                         popular_games=popular_games)
+                         total_sales=report['total_sales'],
+                         total_orders=report['total_orders'],
+                         total_units=report['total_units'],
+                         series=report['series'],
+                         popular_games=report['top_games'],
+                         payment_methods=report['payment_methods'],
+                         granularity=granularity,
+                         start=start,
+                         end=end)
+
+@admin.route('/export/<kind>')
+@login_required
+def admin_export(kind):
+    """Streaming CSV/JSON Lines export of orders, order items, library grants or the catalog"""
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    if kind not in EXPORTS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    status = request.args.get('status')
+    if status not in ORDER_STATUSES:
+        status = None
+    start = request.args.get('start', type=date.fromisoformat)
+    end = request.args.get('end', type=date.fromisoformat)
+    compress = request.args.get('gzip') == '1'
+    
+    # Generator + stream_with_context: baris dikirim sambil dibaca dari database
+    response = Response(
+        stream_with_context(export_stream(kind, fmt, start, end, status, compress)),
+        mimetype='application/gzip' if compress else FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt, start, end, status, compress)}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@admin.route('/performance')
+@login_required
+def admin_performance():
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    monitor = current_app.extensions.get('performance')
+    endpoints = monitor.summary() if monitor else []
+    if request.args.get('format') == 'json':
+        return jsonify({'pid': os.getpid(), 'endpoints': endpoints})
+    return render_template('admin/performance.html',
+                         endpoints=endpoints,
+                         monitor=monitor,
+                         pid=os.getpid())
+
+@admin.route('/performance/reset', methods=['POST'])
+@login_required
+def admin_performance_reset():
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    monitor = current_app.extensions.get('performance')
+    if monitor:
+        monitor.reset()
+    flash('Performance statistics cleared.', 'success')
+    return redirect(url_for('admin.admin_performance'))
+
+@admin.route('/slow-queries')
+@login_required
+def admin_slow_queries():
+    if not current_user.is_admin:
+        flash('Access denied!', 'error')
+        return redirect(url_for('main.index'))
+    
+    offenders = load_offenders(slow_query_log_path(current_app), limit=request.args.get('limit', 20, type=int))
+    return render_template('admin/slow_queries.html',
+                         offenders=offenders,
+                         threshold=current_app.config.get('SLOW_QUERY_MS'))
 
 # ==================== API ROUTES ====================
 
 @main.route('/api/games')
 def api_games():
-    """API endpoint for games data"""
-    games = Game.query.filter_by(is_active=True).all()
+    """API endpoint for games data, paginated with ?cursor= and ?per_page="""
+    cursor, direction, per_page = get_page_args()
+    page = paginate_list(list_active_games(), _game_key, cursor, direction, per_page)
     result = []
-    for game in games:
+    for game in page.items:
         result.append({
             'id': game.id,
             'title': game.title,
@@ -1150,7 +1335,7 @@ def api_games():
             'image_url': game.image_url,
             'share_method': game.share_method
         })
-    return jsonify(result)
+    return jsonify({'games': result, **page.to_dict()})
 
 @main.route('/api/order/<order_id>')
 @login_required
@@ -1177,8 +1362,8 @@ def admin_search_orders():
     search_query = request.args.get('q', '')
     status_filter = request.args.get('status', 'all')
     
-    # Build query
-    query = Order.query.join(User)
+    # Build query (user sudah di-join, dipakai juga untuk mengisi order.user)
+    query = with_profile(Order.query.join(User), 'admin_order_search')
     
     # Apply status filter
     if status_filter != 'all':
@@ -1195,10 +1380,14 @@ def admin_search_orders():
             )
         )
     
-    orders = query.order_by(Order.created_at.desc()).all()
+    cursor, direction, per_page = get_page_args('ADMIN_PAGE_SIZE', ORDER_KEY_TYPES)
+    page = paginate_query(query, (Order.created_at, Order.id), cursor, direction, per_page)
+    attach_item_counts(page.items)
     
     return render_template('admin/orders.html', 
-                         orders=orders, 
+                         orders=page.items, 
+                         page=page,
+                         order_stats=_order_stats(),
                          status_filter=status_filter,
                          search_query=search_query)
 
@@ -0,0 +1,239 @@
+from collections import deque
+from sqlalchemy import text
+import itertools
+import json
+import os
+import select
+import threading
+import time
+import uuid
+
+CHANNEL = 'gamestore_cache'
+
+# ==================== TRANSPORTS ====================
+
+class FileTransport:
+    """
+    Stand-in for SQLite / single node: every message is one JSON line
+    appended to a shared file, each process tails the file.
+    """
+
+    def __init__(self, path, poll_interval=0.05, max_bytes=5 * 1024 * 1024):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def send(self, payload):
+        data = (payload + '\n').encode('utf-8')
+        try:
+            if os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except FileNotFoundError:
+            pass
+        # O_APPEND + satu write kecil = atomik antar proses
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def listen(self, on_payload, stop_event):
+        try:
+            offset = os.path.getsize(self.path)
+        except FileNotFoundError:
+            offset = 0
+        buffer = b''
+        while not stop_event.is_set():
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size < offset:
+                # File di-rotate, mulai lagi dari awal
+                offset, buffer = 0, b''
+            if size > offset:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read(size - offset)
+                offset += len(chunk)
+                buffer += chunk
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    if line:
+                        on_payload(line.decode('utf-8'))
+            stop_event.wait(self.poll_interval)
+
+class PostgresTransport:
+    """LISTEN/NOTIFY on one dedicated connection"""
+
+    def __init__(self, engine, channel=CHANNEL):
+        self.engine = engine
+        self.channel = channel
+
+    def send(self, payload):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {'channel': self.channel, 'payload': payload})
+            connection.commit()
+
+    def listen(self, on_payload, stop_event):
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while not stop_event.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    on_payload(conn.notifies.pop(0).payload)
+        finally:
+            raw.close()
+
+# ==================== BUS ====================
+
+class CacheBus:
+    """
+    Versioned invalidation messages between workers and nodes.
+    Messages from this process are skipped on receipt (already applied
+    locally) and older versions from the same origin are dropped.
+    """
+
+    def __init__(self, transport, latency_samples=1000):
+        self.transport = transport
+        self.origin = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count(1)
+        self._handlers = {}
+        self._last_version = {}
+        self._latencies = deque(maxlen=latency_samples)
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'published': 0, 'received': 0, 'applied': 0, 'dropped': 0, 'errors': 0}
+
+    def subscribe(self, topic, handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic, **data):
+        message = {
+            'topic': topic,
+            'origin': self.origin,
+            'version': next(self._sequence),
+            'sent_at': time.time(),
+            'data': data
+        }
+        try:
+            self.transport.send(json.dumps(message, separators=(',', ':')))
+            self.stats['published'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ Cache bus publish error: {e}")
+        return message
+
+    def _on_payload(self, payload):
+        self.stats['received'] += 1
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            self.stats['dropped'] += 1
+            return
+        origin = message.get('origin')
+        if origin == self.origin:
+            return
+        version = message.get('version', 0)
+        if version <= self._last_version.get(origin, 0):
+            self.stats['dropped'] += 1
+            return
+        self._last_version[origin] = version
+        self._latencies.append(max(time.time() - message.get('sent_at', time.time()), 0.0))
+
+        for handler in self._handlers.get(message.get('topic'), []):
+            try:
+                handler(message.get('data') or {})
+                self.stats['applied'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Cache bus handler error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='cache-bus', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.transport.listen(self._on_payload, self._stop)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Cache bus listener error: {e}")
+                self._stop.wait(1.0)
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self):
+        """Counters plus propagation latency percentiles in milliseconds"""
+        samples = sorted(self._latencies)
+        result = dict(self.stats)
+        result['latency_samples'] = len(samples)
+        for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            result[f'latency_{name}_ms'] = samples[min(int(q * len(samples)), len(samples) - 1)] * 1000 if samples else None
+        result['latency_max_ms'] = samples[-1] * 1000 if samples else None
+        return result
+
+# ==================== APP WIRING ====================
+
+def create_transport(app, engine):
+    backend = app.config.get('CACHE_BUS', 'auto')
+    if backend == 'auto':
+        backend = 'postgres' if engine.dialect.name == 'postgresql' else 'file'
+    if backend == 'postgres':
+        return PostgresTransport(engine)
+    if backend == 'file':
+        return FileTransport(
+            app.config.get('CACHE_BUS_PATH') or os.path.join(app.instance_path, 'cache_bus.log'),
+            poll_interval=app.config.get('CACHE_BUS_POLL_INTERVAL', 0.05)
+        )
+    return None
+
+def publish(topic, **data):
+    """Publish from request code; no-op when the bus is disabled"""
+    from flask import current_app, has_app_context
+    if not has_app_context():
+        return None
+    bus = current_app.extensions.get('cache_bus')
+    return bus.publish(topic, **data) if bus else None
+
+def init_cache_bus(app):
+    """Wire catalog and category invalidation to the bus and start listening"""
+    from app import db
+    from app.utils.category_utils import clear_category_cache
+
+    if app.config.get('CACHE_BUS', 'auto') == 'none':
+        return None
+    with app.app_context():
+        transport = create_transport(app, db.engine)
+    if transport is None:
+        return None
+
+    bus = CacheBus(transport)
+
+    def on_catalog(data):
+        with app.app_context():
+            catalog = app.extensions.get('catalog')
+            if catalog is None:
+                return
+            if data.get('ids'):
+                catalog.apply_changes(db.engine, set(data['ids']))
+            else:
+                catalog.invalidate()
+
+    bus.subscribe('catalog', on_catalog)
+    bus.subscribe('categories', lambda data: clear_category_cache())
+    app.extensions['cache_bus'] = bus
+    bus.start()
+    return bus
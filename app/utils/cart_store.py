@@ -0,0 +1,150 @@
+from app import db
+from sqlalchemy import delete, select
+from datetime import datetime
+import os
+import re
+import tempfile
+import threading
+
+def encode_cart(lines):
+    """[(game_id, quantity), ...] -> "12:1,15:2\""""
+    return ",".join(f"{int(game_id)}:{int(quantity)}" for game_id, quantity in lines if int(quantity) > 0)
+
+def decode_cart(data):
+    """"12:1,15:2" -> [(12, 1), (15, 2)]"""
+    lines = []
+    for part in (data or '').split(','):
+        if ':' not in part:
+            continue
+        game_id, quantity = part.split(':', 1)
+        try:
+            lines.append((int(game_id), int(quantity)))
+        except ValueError:
+            continue
+    return lines
+
+class DatabaseCartStore:
+    """
+    Cart disimpan di tabel saved_cart, aman untuk banyak worker/node.
+    Tidak commit sendiri: perubahan ikut transaksi request pemanggil.
+    """
+
+    def load(self, key):
+        from app.models import SavedCart
+        data = db.session.execute(select(SavedCart.items).where(SavedCart.key == key)).scalar()
+        return decode_cart(data)
+
+    def save(self, key, lines):
+        """
+        Upsert the cart row (INSERT .. ON CONFLICT DO UPDATE on SQLite and
+        Postgres), so two tabs saving a new cart at once never collide on
+        the primary key. An empty cart deletes the row.
+        """
+        from app.models import SavedCart
+        data = encode_cart(lines)
+        session = db.session
+        if not data:
+            session.execute(delete(SavedCart).where(SavedCart.key == key))
+            return
+
+        values = {'key': key, 'items': data, 'updated_at': datetime.utcnow()}
+        dialect = session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(SavedCart.__table__).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['key'],
+                set_={'items': stmt.excluded['items'], 'updated_at': stmt.excluded['updated_at']}
+            )
+            session.execute(stmt)
+            return
+
+        saved = session.get(SavedCart, key, with_for_update=True)
+        if saved is None:
+            session.add(SavedCart(**values))
+        else:
+            saved.items, saved.updated_at = data, values['updated_at']
+
+    def delete(self, key):
+        self.save(key, [])
+
+class MemoryCartStore:
+    """Cart di memori proses, hanya untuk single worker / development"""
+
+    def __init__(self):
+        self._carts = {}
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            return decode_cart(self._carts.get(key))
+
+    def save(self, key, lines):
+        data = encode_cart(lines)
+        with self._lock:
+            if data:
+                self._carts[key] = data
+            else:
+                self._carts.pop(key, None)
+
+    def delete(self, key):
+        self.save(key, [])
+
+class FileCartStore:
+    """Satu file kecil per cart di disk lokal, dipakai bersama oleh worker di satu node"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_-]', '_', key) + '.cart')
+
+    def load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return decode_cart(f.read())
+        except FileNotFoundError:
+            return []
+
+    def save(self, key, lines):
+        data = encode_cart(lines)
+        path = self._path(key)
+        if not data:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        self.save(key, [])
+
+def create_cart_store(app):
+    """Pilih backend berdasarkan CART_STORE: 'database', 'memory' atau 'file'"""
+    backend = app.config.get('CART_STORE', 'database')
+    if backend == 'memory':
+        return MemoryCartStore()
+    if backend == 'file':
+        return FileCartStore(app.config.get('CART_STORE_PATH') or os.path.join(app.instance_path, 'carts'))
+    return DatabaseCartStore()
+
+def merge_carts(store, from_key, to_key):
+    """Gabungkan cart anonim ke cart user saat login (pemanggil yang commit)"""
+    incoming = store.load(from_key)
+    if not incoming:
+        return store.load(to_key)
+    merged = dict(store.load(to_key))
+    for game_id, quantity in incoming:
+        merged[game_id] = merged.get(game_id, 0) + quantity
+    lines = list(merged.items())
+    store.save(to_key, lines)
+    store.delete(from_key)
+    return lines
@@ -0,0 +1,65 @@
+from flask import g, session, current_app
+from flask_login import current_user
+from app.models import Game, UserLibrary
+import secrets
+
+def get_cart_store():
+    return current_app.extensions['cart_store']
+
+def get_anonymous_cart_key(create=True):
+    """Key cart untuk pengunjung yang belum login, cookie hanya menyimpan id pendek"""
+    sid = session.get('cart_sid')
+    if not sid and create:
+        sid = secrets.token_urlsafe(12)
+        session['cart_sid'] = sid
+    return f"anon:{sid}" if sid else None
+
+def get_cart_key(create=True):
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return get_anonymous_cart_key(create)
+
+def _cart_game_ids(cart):
+    return {int(item['game_id']) for item in cart}
+
+def get_cart_games(cart):
+    """
+    Get {game_id: Game} for every line in the cart.
+    Games are loaded with one IN query and kept on flask.g, so every
+    helper and route in the same request shares the same snapshot.
+    """
+    games = g.setdefault('cart_games', {})
+    missing = _cart_game_ids(cart) - games.keys()
+    if missing:
+        for game in Game.query.filter(Game.id.in_(missing)).all():
+            games[game.id] = game
+        # Simpan juga id yang tidak ditemukan agar tidak di-query ulang
+        for game_id in missing:
+            games.setdefault(game_id, None)
+    return {game_id: games[game_id] for game_id in _cart_game_ids(cart) if games.get(game_id)}
+
+def get_owned_game_ids(user_id, cart):
+    """
+    Get the set of cart game ids the user already owns, with one IN query
+    per request
+    """
+    checked = g.setdefault('owned_checked', set())
+    owned = g.setdefault('owned_game_ids', set())
+    missing = _cart_game_ids(cart) - checked
+    if missing:
+        rows = UserLibrary.query.with_entities(UserLibrary.game_id).filter(
+            UserLibrary.user_id == user_id,
+            UserLibrary.game_id.in_(missing)
+        ).all()
+        owned.update(row[0] for row in rows)
+        checked.update(missing)
+    return owned & _cart_game_ids(cart)
+
+def calculate_cart_total(cart):
+    games = get_cart_games(cart)
+    total = 0
+    for item in cart:
+        game = games.get(int(item['game_id']))
+        if game:
+            total += game.price * item['quantity']
+    return total
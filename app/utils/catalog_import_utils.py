@@ -0,0 +1,399 @@
+from app import db
+from app.models import Game, GameExternalId
+from app.utils.catalog_utils import mark_games_changed
+from app.utils.search_utils import sync_search_index
+from sqlalchemy import bindparam, insert, select, update
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email_validator import validate_email, EmailNotValidError
+import csv
+import io
+import json
+import math
+import threading
+
+DEFAULT_IMAGE_URL = 'https://res.cloudinary.com/dzfkklsza/image/upload/v1700000000/default-game.jpg'
+SHARE_METHODS = ('cloud_code', 'account')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'ya')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'tidak')
+
+# Wajib saat membuat game baru, seperti di GameForm
+REQUIRED_ON_CREATE = ('title', 'description', 'short_description', 'price', 'stock', 'category')
+# Kolom game yang dibandingkan untuk diff (stock lewat restock, bukan overwrite)
+GAME_COLUMNS = ('title', 'category', 'price', 'short_description', 'description', 'share_method',
+                'cloud_code', 'account_email', 'account_password', 'is_active', 'image_url')
+
+# ==================== PARSING ====================
+
+def read_catalog(data, fmt):
+    """
+    Rows of a CSV, JSON array or JSON Lines upload as dicts.
+    Raises ValueError for unreadable files.
+    Returns: list of (line number, dict)
+    """
+    text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        try:
+            return [(reader.line_num, row) for row in reader]
+        except csv.Error as e:
+            raise ValueError(f'line {reader.line_num}: {e}')
+    if fmt == 'json':
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError('JSON catalog must be an array of objects')
+        return list(enumerate(rows, 1))
+    return [(n, json.loads(line)) for n, line in enumerate(text.splitlines(), 1) if line.strip()]
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+# ==================== VALIDATION ====================
+
+def _text(max_length):
+    def convert(value):
+        value = str(value).strip()
+        if len(value) > max_length:
+            raise ValueError(f'must be at most {max_length} characters')
+        return value
+    return convert
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('must be a number')
+    # float() menerima 'nan', 'inf' dan '1e400'; GameForm tidak
+    if not math.isfinite(number):
+        raise ValueError('must be a finite number')
+    if number < 0:
+        raise ValueError('must be 0 or more')
+    return number
+
+def _count(minimum):
+    def convert(value):
+        try:
+            number = int(str(value).strip())
+        except (TypeError, ValueError):
+            raise ValueError('must be a whole number')
+        if number < minimum:
+            raise ValueError(f'must be {minimum} or more')
+        return number
+    return convert
+
+def _share_method(value):
+    value = str(value).strip()
+    if value not in SHARE_METHODS:
+        raise ValueError(f"must be one of {', '.join(SHARE_METHODS)}")
+    return value
+
+def _email(value):
+    try:
+        return validate_email(str(value).strip(), check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(str(e))
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('must be true or false')
+
+def _url(value):
+    value = _text(500)(value)
+    if not value.startswith(('http://', 'https://')):
+        raise ValueError('must be an http(s) URL')
+    return value
+
+CONVERTERS = {
+    'external_id': _text(64),
+    'title': _text(100),
+    'category': _text(50),
+    'price': _number,
+    'stock': _count(0),
+    'restock': _count(1),
+    'short_description': _text(200),
+    'description': _text(100000),
+    'share_method': _share_method,
+    'cloud_code': _text(100),
+    'account_email': _email,
+    'account_password': _text(200),
+    'is_active': _boolean,
+    'image_url': _url,
+}
+
+def clean_row(raw):
+    """
+    Convert one raw row; empty cells count as "not given".
+    Returns: (values, errors, ignored column names)
+    """
+    values, errors = {}, []
+    for name, value in raw.items():
+        if name not in CONVERTERS or value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        try:
+            values[name] = CONVERTERS[name](value)
+        except ValueError as e:
+            errors.append((name, str(e)))
+    if 'stock' in values and 'restock' in values:
+        errors.append(('restock', 'use either stock or restock, not both'))
+    ignored = sorted(str(name) for name in raw if name not in CONVERTERS)
+    return values, errors, ignored
+
+# ==================== PLAN ====================
+
+class ImportPlan:
+    """Result of validating an upload against the current catalog"""
+
+    def __init__(self):
+        self.creates = []    # (line, values)
+        self.updates = []    # (line, game_id, changes {field: (old, new)})
+        self.restocks = []   # (line, game_id, delta)
+        self.new_refs = []   # (game_id, external_id) untuk game lama
+        self.unchanged = 0
+        self.errors = []     # (line, field, message)
+        self.ignored_columns = []
+        self.images = []     # (key, url) untuk di-rehost setelah commit
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        return {
+            'create': len(self.creates),
+            'update': len(self.updates),
+            'restock': len(self.restocks),
+            'unchanged': self.unchanged,
+            'errors': len(self.errors),
+        }
+
+def _load_catalog():
+    """Every game with its external id, in one query"""
+    rows = db.session.execute(
+        select(Game.id, GameExternalId.external_id, Game.stock, *[getattr(Game, c) for c in GAME_COLUMNS])
+        .outerjoin(GameExternalId, GameExternalId.game_id == Game.id)
+    ).all()
+    by_external, by_title = {}, {}
+    for row in rows:
+        if row.external_id:
+            by_external[row.external_id] = row
+        by_title.setdefault(row.title.strip().lower(), []).append(row)
+    return by_external, by_title
+
+def plan_import(rows):
+    """
+    Validate every row in one pass and work out what would change.
+    Rows match an existing game by external_id first, then by title;
+    unmatched rows create a new game and must carry every GameForm field.
+    Nothing is written.
+    Returns: ImportPlan
+    """
+    plan = ImportPlan()
+    by_external, by_title = _load_catalog()
+    seen = set()
+    ignored = set()
+
+    for line, raw in rows:
+        if not isinstance(raw, dict):
+            plan.errors.append((line, None, 'row must be an object'))
+            continue
+        values, errors, extra = clean_row(raw)
+        ignored.update(extra)
+        plan.errors.extend((line, field, message) for field, message in errors)
+        if errors:
+            continue
+
+        external_id = values.get('external_id')
+        title_key = values['title'].lower() if 'title' in values else None
+        key = ('external_id', external_id) if external_id else ('title', title_key)
+        if key[1] is None:
+            plan.errors.append((line, 'title', 'external_id or title is required'))
+            continue
+        if key in seen:
+            plan.errors.append((line, key[0], f'duplicate row for {key[1]}'))
+            continue
+        seen.add(key)
+
+        game = by_external.get(external_id) if external_id else None
+        if game is None and title_key:
+            matches = [row for row in by_title.get(title_key, [])
+                       if not external_id or row.external_id is None]
+            if len(matches) > 1:
+                plan.errors.append((line, 'title', f'{len(matches)} games share this title, add an external_id'))
+                continue
+            game = matches[0] if matches else None
+
+        if game is None:
+            missing = [name for name in REQUIRED_ON_CREATE if name not in values]
+            if 'restock' in values and 'stock' in missing:
+                missing.remove('stock')
+                values['stock'] = values.pop('restock')
+            if missing:
+                plan.errors.append((line, missing[0], f"required for a new game: {', '.join(missing)}"))
+                continue
+            values.pop('restock', None)
+            plan.creates.append((line, values))
+            if 'image_url' in values:
+                plan.images.append((key, values['image_url']))
+            continue
+
+        if external_id and game.external_id is None:
+            plan.new_refs.append((game.id, external_id))
+        if title_key == game.title.strip().lower():
+            # Cocok lewat judul: beda huruf besar/kecil tidak dianggap rename
+            values.pop('title', None)
+
+        changes = {name: (getattr(game, name), values[name])
+                   for name in GAME_COLUMNS if name in values and values[name] != getattr(game, name)}
+        delta = values.get('restock', 0)
+        if 'stock' in values:
+            # Sama seperti form edit: stok hanya boleh ditambah
+            if values['stock'] < (game.stock or 0):
+                plan.errors.append((line, 'stock', f'cannot lower stock from {game.stock} to {values["stock"]}, use restock for deliveries'))
+                continue
+            delta = values['stock'] - (game.stock or 0)
+
+        if changes:
+            plan.updates.append((line, game.id, changes))
+            if 'image_url' in changes:
+                plan.images.append((('id', game.id), values['image_url']))
+        if delta:
+            plan.restocks.append((line, game.id, delta))
+        if not changes and not delta and not (external_id and game.external_id is None):
+            plan.unchanged += 1
+
+    plan.ignored_columns = sorted(ignored)
+    return plan
+
+# ==================== APPLY ====================
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def apply_import(plan, chunk_size=500):
+    """
+    Write a validated plan in one transaction: executemany INSERTs for new
+    games, ORM bulk UPDATEs by primary key, and restocks as
+    stock = stock + :delta so concurrent sales are never overwritten.
+    Returns: dict with counts and the ids of every game written
+    """
+    if not plan.ok:
+        raise ValueError('import plan has errors')
+
+    now = datetime.utcnow()
+    changed = set()
+    created = {}
+    try:
+        for chunk in _chunks(plan.creates, chunk_size):
+            rows = [{
+                'title': values['title'],
+                'description': values['description'],
+                'short_description': values['short_description'],
+                'price': values['price'],
+                'image_url': values.get('image_url', DEFAULT_IMAGE_URL),
+                'stock': values['stock'],
+                'initial_stock': values['stock'],
+                'share_method': values.get('share_method', 'cloud_code'),
+                'cloud_code': values.get('cloud_code') if values.get('share_method', 'cloud_code') == 'cloud_code' else None,
+                'account_email': values.get('account_email') if values.get('share_method') == 'account' else None,
+                'account_password': values.get('account_password') if values.get('share_method') == 'account' else None,
+                'category': values['category'],
+                'is_active': values.get('is_active', True),
+                'created_at': now,
+            } for _, values in chunk]
+            ids = db.session.execute(
+                insert(Game).returning(Game.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            for (_, values), game_id in zip(chunk, ids):
+                created[('external_id', values['external_id']) if 'external_id' in values
+                        else ('title', values['title'].lower())] = game_id
+            changed.update(ids)
+
+        refs = [{'game_id': created[key], 'external_id': key[1]} for key in created if key[0] == 'external_id']
+        refs += [{'game_id': game_id, 'external_id': external_id} for game_id, external_id in plan.new_refs]
+        for chunk in _chunks(refs, chunk_size):
+            db.session.execute(insert(GameExternalId), chunk)
+
+        updates = [{'id': game_id, **{name: new for name, (old, new) in changes.items()}}
+                   for _, game_id, changes in plan.updates]
+        for chunk in _chunks(updates, chunk_size):
+            db.session.execute(update(Game), chunk)
+        changed.update(row['id'] for row in updates)
+
+        restock = update(Game.__table__).where(Game.__table__.c.id == bindparam('game_id')).values(
+            stock=Game.__table__.c.stock + bindparam('delta'),
+            initial_stock=Game.__table__.c.initial_stock + bindparam('delta')
+        )
+        restocks = [{'game_id': game_id, 'delta': delta} for _, game_id, delta in plan.restocks]
+        for chunk in _chunks(restocks, chunk_size):
+            db.session.execute(restock, chunk)
+        changed.update(row['game_id'] for row in restocks)
+
+        # Tulisan Core tidak lewat after_flush: sinkronkan index & read model manual
+        sync_search_index(changed)
+        mark_games_changed(db.session, changed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    images = [(created[key] if key in created else key[1], url) for key, url in plan.images
+              if key in created or key[0] == 'id']
+    return {'created': len(plan.creates), 'updated': len(plan.updates), 'restocked': len(plan.restocks),
+            'game_ids': sorted(changed), 'images': images}
+
+# ==================== IMAGES ====================
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+def _rehost_image(app, game_id, url):
+    from app.utils.cloudinary_utils import upload_image
+
+    with app.app_context():
+        result = upload_image(url, folder="game_store/games")
+        if not result['success']:
+            return False
+        try:
+            game = db.session.get(Game, game_id)
+            # Jangan timpa gambar yang sudah diganti admin sementara itu
+            if game is not None and game.image_url == url:
+                game.image_url = result['url']
+                game.image_public_id = result['public_id']
+                db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Image rehost error for game {game_id}: {e}")
+            return False
+        finally:
+            db.session.remove()
+
+def rehost_images(app, images):
+    """
+    Copy imported image URLs to the media storage in background threads
+    (CATALOG_IMAGE_WORKERS); the import itself never waits on uploads.
+    Returns: list of futures
+    """
+    global _image_pool
+    if not images:
+        return []
+    if _image_pool is None:
+        with _image_pool_lock:
+            if _image_pool is None:
+                _image_pool = ThreadPoolExecutor(max_workers=app.config.get('CATALOG_IMAGE_WORKERS', 4),
+                                                 thread_name_prefix='catalog-images')
+    return [_image_pool.submit(_rehost_image, app, game_id, url)
+            for game_id, url in images
+            if url.startswith(('http://', 'https://')) and 'res.cloudinary.com' not in url]
@@ -0,0 +1,228 @@
+from flask import current_app, has_app_context
+from app import db
+from app.models import Game
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from typing import NamedTuple, Optional
+from datetime import datetime
+import sys
+import threading
+import time
+
+class GameRecord(NamedTuple):
+    """Data game read-only untuk storefront (tanpa kode cloud / akun)"""
+    id: int
+    title: str
+    short_description: Optional[str]
+    description: Optional[str]
+    price: float
+    image_url: Optional[str]
+    share_method: Optional[str]
+    category: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    stock: int
+
+RECORD_COLUMNS = [getattr(Game, field) for field in GameRecord._fields]
+
+def _to_record(row):
+    # Kolom terakhir adalah stock
+    return GameRecord(*row[:-1], row[-1] or 0)
+
+def _record_size(record):
+    return sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record)
+
+def _sort_key(record):
+    # id sebagai pemecah seri, sama dengan urutan keyset pagination
+    return (record.created_at or datetime.min, record.id)
+
+class CatalogSnapshot:
+    """Satu versi katalog yang tidak pernah diubah setelah dibuat"""
+    __slots__ = ('version', 'by_id', 'active_ids', 'by_category', 'size_bytes', 'built_at')
+
+    def __init__(self, version, records):
+        self.version = version
+        self.by_id = {record.id: record for record in records}
+        active = sorted((r for r in records if r.is_active), key=_sort_key, reverse=True)
+        self.active_ids = tuple(r.id for r in active)
+        by_category = {}
+        for record in active:
+            by_category.setdefault(record.category, []).append(record.id)
+        self.by_category = {category: tuple(ids) for category, ids in by_category.items()}
+        self.size_bytes = sum(_record_size(r) for r in records)
+        self.built_at = time.monotonic()
+
+class Catalog:
+    """
+    In-process catalog read model.
+    Built once from the database, then patched after every commit that
+    touched a Game. Stock is always overlaid from the database when a
+    page is served, so sold-out state is never stale.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.snapshot = None
+        self.over_capacity = False
+        self.over_capacity_at = 0.0  # build terakhir yang melewati max_bytes
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _load_rows(self, connection, game_ids=None):
+        stmt = select(*RECORD_COLUMNS)
+        if game_ids is not None:
+            stmt = stmt.where(Game.id.in_(game_ids))
+        return [_to_record(row) for row in connection.execute(stmt)]
+
+    def _publish(self, records):
+        self._version += 1
+        snapshot = CatalogSnapshot(self._version, records)
+        if snapshot.size_bytes > self.max_bytes:
+            # Terlalu besar: layani langsung dari database
+            self.snapshot = None
+            self.over_capacity = True
+            self.over_capacity_at = snapshot.built_at
+            return None
+        self.over_capacity = False
+        self.snapshot = snapshot
+        return snapshot
+
+    def _fresh(self):
+        """Current snapshot, or None without building; False when a build is due"""
+        now = time.monotonic()
+        snapshot = self.snapshot
+        if snapshot is not None and now - snapshot.built_at < self.ttl:
+            return snapshot
+        # Build terakhir terlalu besar: jangan ulangi tiap request, coba lagi setelah ttl
+        if self.over_capacity and now - self.over_capacity_at < self.ttl:
+            return None
+        return False
+
+    def get(self):
+        """
+        Get the current snapshot, building it if needed. Returns None when
+        over the memory cap; an oversized build is only retried after ttl.
+        """
+        snapshot = self._fresh()
+        if snapshot is not False:
+            return snapshot
+        with self._lock:
+            snapshot = self._fresh()
+            if snapshot is not False:
+                return snapshot
+            with db.engine.connect() as connection:
+                return self._publish(self._load_rows(connection))
+
+    def apply_changes(self, bind, game_ids):
+        """Reload only the given games and publish a new version"""
+        with self._lock:
+            if self.snapshot is None:
+                return
+            with bind.connect() as connection:
+                fresh = {r.id: r for r in self._load_rows(connection, list(game_ids))}
+            records = dict(self.snapshot.by_id)
+            for game_id in game_ids:
+                if game_id in fresh:
+                    records[game_id] = fresh[game_id]
+                else:
+                    records.pop(game_id, None)
+            self._publish(list(records.values()))
+
+    def invalidate(self):
+        with self._lock:
+            self.snapshot = None
+
+def get_catalog():
+    return current_app.extensions['catalog']
+
+# ==================== QUERY HELPERS ====================
+
+def overlay_stock(records):
+    """Replace the cached stock of each record with the live value (one narrow query)"""
+    if not records:
+        return []
+    ids = [r.id for r in records]
+    stmt = select(Game.id, Game.stock)
+    # Untuk daftar besar lebih murah ambil semua stok game aktif
+    stmt = stmt.where(Game.is_active == True) if len(ids) > 500 else stmt.where(Game.id.in_(ids))
+    stock = dict(db.session.execute(stmt).all())
+    return [r._replace(stock=stock.get(r.id, r.stock) or 0) for r in records]
+
+def _db_records(stmt):
+    return [_to_record(row) for row in db.session.execute(stmt)]
+
+def list_active_games(category=None):
+    """Active games newest first, optionally limited to one category, with live stock"""
+    snapshot = get_catalog().get()
+    if snapshot is None:
+        stmt = select(*RECORD_COLUMNS).where(Game.is_active == True)
+        if category:
+            stmt = stmt.where(Game.category == category)
+        return _db_records(stmt.order_by(Game.created_at.desc(), Game.id.desc()))
+
+    ids = snapshot.by_category.get(category, ()) if category else snapshot.active_ids
+    return overlay_stock([snapshot.by_id[game_id] for game_id in ids])
+
+def get_game_record(game_id):
+    """Single game with live stock, or None"""
+    snapshot = get_catalog().get()
+    if snapshot is None:
+        records = _db_records(select(*RECORD_COLUMNS).where(Game.id == game_id))
+        return records[0] if records else None
+    record = snapshot.by_id.get(game_id)
+    if record is None:
+        return None
+    stock = db.session.execute(select(Game.stock).where(Game.id == game_id)).scalar()
+    return record._replace(stock=stock or 0)
+
+def get_game_records(game_ids):
+    """Games in the given id order with live stock, unknown ids are skipped"""
+    snapshot = get_catalog().get()
+    if snapshot is None:
+        by_id = {r.id: r for r in _db_records(select(*RECORD_COLUMNS).where(Game.id.in_(list(game_ids))))}
+        return [by_id[game_id] for game_id in game_ids if game_id in by_id]
+    return overlay_stock([snapshot.by_id[game_id] for game_id in game_ids if game_id in snapshot.by_id])
+
+# ==================== WRITE TRACKING ====================
+
+def _track_game_changes(session, flush_context):
+    # after_flush: id game baru sudah terisi, new/dirty/deleted belum direset
+    changed = session.info.setdefault('catalog_changed', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Game) and obj.id is not None:
+            changed.add(obj.id)
+
+def mark_games_changed(session, game_ids):
+    """For bulk Core writes: refresh these games in the read model after commit"""
+    session.info.setdefault('catalog_changed', set()).update(game_ids)
+
+def _apply_after_commit(session):
+    changed = session.info.pop('catalog_changed', None)
+    if not changed or not has_app_context():
+        return
+    catalog = current_app.extensions.get('catalog')
+    if catalog is None:
+        return
+    try:
+        catalog.apply_changes(session.get_bind(mapper=Game.__mapper__), changed)
+    except Exception as e:
+        print(f"❌ Catalog refresh error: {e}")
+        catalog.invalidate()
+
+    # Beritahu worker / node lain
+    from app.utils.cache_bus import publish
+    publish('catalog', ids=sorted(changed))
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('catalog_changed', None)
+
+def init_catalog(app):
+    app.extensions['catalog'] = Catalog(
+        max_bytes=app.config.get('CATALOG_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+        ttl=app.config.get('CATALOG_CACHE_TTL', 300)
+    )
+    if not event.contains(Session, 'after_flush', _track_game_changes):
+        event.listen(Session, 'after_flush', _track_game_changes)
+        event.listen(Session, 'after_commit', _apply_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
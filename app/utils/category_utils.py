@@ -0,0 +1,67 @@
+from flask import g, current_app
+from app import db
+from app.models import Game
+from sqlalchemy import func, case, and_
+import threading
+import time
+
+_cache = {'facets': None, 'expires': 0.0}
+_cache_lock = threading.Lock()
+
+def _load_category_facets():
+    """Satu GROUP BY untuk nama, jumlah aktif, created_at terbaru dan jumlah in-stock"""
+    active = Game.is_active == True
+    rows = db.session.query(
+        Game.category,
+        func.sum(case((active, 1), else_=0)),
+        func.max(case((active, Game.created_at), else_=None)),
+        func.sum(case((and_(active, Game.stock > 0), 1), else_=0))
+    ).filter(
+        Game.category.isnot(None),
+        Game.category != ''
+    ).group_by(Game.category).order_by(Game.category).all()
+
+    return tuple({
+        'name': name,
+        'count': int(count or 0),
+        'latest_date': latest_date,
+        'in_stock_count': int(in_stock or 0)
+    } for name, count, latest_date, in_stock in rows)
+
+def get_category_facets():
+    """
+    Get facet data for every category.
+    Memoized per request on flask.g and shared inside the worker for
+    CATEGORY_CACHE_TTL seconds; admin game writes invalidate it.
+    Returns: list of dicts (copies, safe to modify)
+    """
+    if 'category_facets' not in g:
+        now = time.monotonic()
+        facets = _cache['facets']
+        if facets is None or now >= _cache['expires']:
+            facets = _load_category_facets()
+            with _cache_lock:
+                _cache['facets'] = facets
+                _cache['expires'] = now + current_app.config.get('CATEGORY_CACHE_TTL', 60)
+        g.category_facets = facets
+    return [dict(facet) for facet in g.category_facets]
+
+def get_category_count(category):
+    """Jumlah game aktif di satu kategori, diambil dari facet"""
+    for facet in get_category_facets():
+        if facet['name'] == category:
+            return facet['count']
+    return 0
+
+def clear_category_cache():
+    """Kosongkan cache worker ini saja (dipanggil juga oleh cache bus)"""
+    with _cache_lock:
+        _cache['facets'] = None
+        _cache['expires'] = 0.0
+
+def invalidate_category_facets():
+    """Dipanggil setelah game ditambah, diubah, di-restock atau dihapus"""
+    from app.utils.cache_bus import publish
+    clear_category_cache()
+    g.pop('category_facets', None)
+    publish('categories')
@@ -1,44 +1,44 @@
 import cloudinary.uploader
 import cloudinary.api
-from flask import current_app
+import cloudinary.exceptions
+from app.utils.media_store import release_media, store_media
 import os
+import threading
+import time
+import uuid
+
+# Upload/hapus lewat media storage yang dikonfigurasi (MEDIA_STORAGE); nama modul
+# tetap untuk pemanggil lama
 
 def upload_image(file, folder="game_store"):
     """
-    Upload image to Cloudinary
+    Upload image to the configured media storage
     Returns: dict with 'url' and 'public_id'
     """
     try:
-        result = cloudinary.uploader.upload(
-            file,
-            folder=folder,
-            transformation=[
-                {'width': 800, 'height': 600, 'crop': 'limit'},
-                {'quality': 'auto'},
-                {'format': 'webp'}
-            ]
-        )
+        result = store_media(file, folder, 'image')
         return {
-            'url': result['secure_url'],
+            'url': result['url'],
             'public_id': result['public_id'],
+            'deduped': result['deduped'],
             'success': True
         }
     except Exception as e:
-        print(f"❌ Cloudinary upload error: {e}")
+        print(f"❌ Media upload error: {e}")
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'rejected': isinstance(e, ValueError)  # file ditolak, upload ulang tidak akan berhasil
         }
 
 def delete_image(public_id):
     """
-    Delete image from Cloudinary
+    Delete image from the media storage (kept while other rows still use it)
     """
     try:
-        result = cloudinary.uploader.destroy(public_id)
-        return result
+        return {'result': 'ok' if release_media(public_id) else 'kept'}
     except Exception as e:
-        print(f"❌ Cloudinary delete error: {e}")
+        print(f"❌ Media delete error: {e}")
         return None
 
 def upload_payment_proof(file, folder="payment_proofs"):
@@ -46,22 +46,90 @@ def upload_payment_proof(file, folder="payment_proofs"):
     Upload payment proof image
     """
     try:
-        result = cloudinary.uploader.upload(
-            file,
-            folder=f"game_store/{folder}",
-            transformation=[
-                {'width': 1200, 'height': 800, 'crop': 'limit'},
-                {'quality': 'auto'}
-            ]
-        )
+        result = store_media(file, f"game_store/{folder}", 'payment_proof')
         return {
-            'url': result['secure_url'],
+            'url': result['url'],
             'public_id': result['public_id'],
+            'deduped': result['deduped'],
             'success': True
         }
     except Exception as e:
-        print(f"❌ Cloudinary upload error: {e}")
+        print(f"❌ Media upload error: {e}")
         return {
             'success': False,
-            'error': str(e)
-        }
\ No newline at end of file
+            'error': str(e),
+            'rejected': isinstance(e, ValueError)  # file ditolak, upload ulang tidak akan berhasil
+        }
+
+# ==================== FAKE BACKEND ====================
+
+class FakeCloudinary:
+    """
+    In-process stand-in for cloudinary.uploader (upload/destroy) and
+    cloudinary.api.resource, so MEDIA_STORAGE=cloudinary runs without
+    network access. Use as a context manager, or install() for the life of the process
+    (CLOUDINARY_FAKE=1). fail_next makes the next N calls raise, and
+    latency adds a fixed delay per call, to exercise retries and timing.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.uploads = {}  # public_id -> jumlah byte
+        self.deleted = []
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._original = None
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            fail = self.fail_next > 0
+            if fail:
+                self.fail_next -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError('fake cloudinary: injected failure')
+
+    def upload(self, file, folder='', public_id=None, **options):
+        self._call()
+        if isinstance(file, str):
+            size = os.path.getsize(file) if os.path.exists(file) else 0
+        else:
+            size = len(file.read())
+        public_id = public_id or f"{folder}/{uuid.uuid4().hex[:20]}".lstrip('/')
+        with self._lock:
+            self.uploads[public_id] = size
+        return {'public_id': public_id, 'secure_url': f'https://res.cloudinary.invalid/{public_id}.webp', 'bytes': size}
+
+    def destroy(self, public_id, **options):
+        self._call()
+        with self._lock:
+            found = self.uploads.pop(public_id, None) is not None
+            self.deleted.append(public_id)
+        return {'result': 'ok' if found else 'not found'}
+
+    def resource(self, public_id, **options):
+        self._call()
+        with self._lock:
+            if public_id not in self.uploads:
+                raise cloudinary.exceptions.NotFound(f'Resource not found - {public_id}')
+        return {'public_id': public_id, 'bytes': self.uploads[public_id]}
+
+    def install(self):
+        self._original = cloudinary.uploader.upload, cloudinary.uploader.destroy, cloudinary.api.resource
+        cloudinary.uploader.upload, cloudinary.uploader.destroy, cloudinary.api.resource = \
+            self.upload, self.destroy, self.resource
+        return self
+
+    def uninstall(self):
+        if self._original:
+            cloudinary.uploader.upload, cloudinary.uploader.destroy, cloudinary.api.resource = self._original
+            self._original = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
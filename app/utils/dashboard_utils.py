@@ -0,0 +1,52 @@
+from app import db
+from app.models import Game, Order, User
+from app.utils.pagination_utils import cached_count, clear_count_cache
+from flask import current_app
+from sqlalchemy import func, select
+
+LOW_STOCK_THRESHOLD = 5     # kartu "Stok Menipis"
+STOCK_ALERT_THRESHOLD = 10  # daftar "Peringatan Stok"
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def _load_dashboard_stats():
+    """All dashboard counters as scalar subqueries of a single SELECT"""
+    row = db.session.execute(select(
+        _count(Order).label('total_orders'),
+        _count(Order, Order.status == 'pending').label('pending_orders'),
+        select(func.coalesce(func.sum(Order.total_amount), 0))
+        .where(Order.status == 'paid').scalar_subquery().label('total_revenue'),
+        _count(User).label('total_users'),
+        _count(Game).label('total_games'),
+        _count(Game, Game.stock > 0, Game.stock <= LOW_STOCK_THRESHOLD).label('low_stock_games'),
+        _count(Game, Game.stock <= 0).label('out_of_stock_games'),
+        _count(Game, Game.stock > 0, Game.stock <= STOCK_ALERT_THRESHOLD).label('stock_alert_games'),
+    )).one()
+    stats = dict(row._mapping)
+    stats['total_revenue'] = float(stats['total_revenue'] or 0)
+    return stats
+
+def get_dashboard_stats():
+    """
+    Admin dashboard counters, shared inside the worker for
+    DASHBOARD_CACHE_TTL seconds so a busy dashboard costs one round-trip
+    per TTL instead of one per page view.
+    """
+    return cached_count('dashboard:stats', _load_dashboard_stats,
+                        ttl=current_app.config.get('DASHBOARD_CACHE_TTL', 15))
+
+def invalidate_dashboard():
+    clear_count_cache('dashboard:')
+
+def get_stock_alerts(limit=3):
+    """
+    The few games shown under "Peringatan Stok", lowest stock first.
+    Both lists are range scans on ix_game_stock with a LIMIT, the totals
+    for "... dan N lainnya" come from get_dashboard_stats().
+    Returns: (out_of_stock, low_stock) lists of Game
+    """
+    out_of_stock = Game.query.filter(Game.stock <= 0).order_by(Game.stock, Game.id).limit(limit).all()
+    low_stock = Game.query.filter(Game.stock > 0, Game.stock <= STOCK_ALERT_THRESHOLD) \
+        .order_by(Game.stock, Game.id).limit(limit).all()
+    return out_of_stock, low_stock
@@ -0,0 +1,106 @@
+from app import db
+from app.models import Order, OrderItem
+from app.utils.stock_utils import release_stock
+from sqlalchemy import select, update, func
+from datetime import datetime, timedelta
+import threading
+import time
+
+def _claim_orders(order_ids, now):
+    """
+    Flip candidate orders from pending to cancelled.
+    Only rows still pending are touched, so when several nodes sweep at
+    once each order is claimed (and its stock released) exactly once.
+    Returns: list of order ids claimed by this transaction
+    """
+    stmt = update(Order).where(
+        Order.id.in_(order_ids),
+        Order.status == 'pending'
+    ).values(status='cancelled', updated_at=now).execution_options(synchronize_session=False)
+
+    if db.engine.dialect.update_returning:
+        return [row[0] for row in db.session.execute(stmt.returning(Order.id))]
+
+    # Fallback tanpa RETURNING: klaim satu per satu
+    claimed = []
+    for order_id in order_ids:
+        single = update(Order).where(
+            Order.id == order_id,
+            Order.status == 'pending'
+        ).values(status='cancelled', updated_at=now).execution_options(synchronize_session=False)
+        if db.session.execute(single).rowcount == 1:
+            claimed.append(order_id)
+    return claimed
+
+def sweep_expired_orders(ttl_minutes, batch_size=500, max_batches=None):
+    """
+    Cancel pending orders older than ttl_minutes and give their stock back.
+    Works in batches of batch_size orders, one transaction per batch.
+    Returns: dict with orders/units released, batches and throughput
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=ttl_minutes)
+    stats = {'orders': 0, 'units': 0, 'batches': 0}
+
+    while max_batches is None or stats['batches'] < max_batches:
+        candidate_ids = db.session.execute(
+            select(Order.id)
+            .where(Order.status == 'pending', Order.created_at < cutoff)
+            .order_by(Order.created_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not candidate_ids:
+            break
+
+        try:
+            claimed = _claim_orders(candidate_ids, now)
+            if claimed:
+                lines = db.session.execute(
+                    select(OrderItem.game_id, func.sum(OrderItem.quantity))
+                    .where(OrderItem.order_id.in_(claimed))
+                    .group_by(OrderItem.game_id)
+                ).all()
+                release_stock(lines)
+                stats['units'] += sum(quantity or 0 for _, quantity in lines)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        stats['orders'] += len(claimed)
+        stats['batches'] += 1
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed'] = elapsed
+    stats['orders_per_sec'] = stats['orders'] / elapsed if elapsed else 0.0
+    return stats
+
+def start_expiry_sweeper(app):
+    """
+    Run sweep_expired_orders every ORDER_SWEEP_INTERVAL seconds in a
+    daemon thread. Safe to enable on every worker and node.
+    """
+    interval = app.config.get('ORDER_SWEEP_INTERVAL', 0)
+    if not interval or interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    stats = sweep_expired_orders(
+                        app.config['PENDING_ORDER_TTL_MINUTES'],
+                        app.config['ORDER_SWEEP_BATCH_SIZE']
+                    )
+                    if stats['orders']:
+                        print(f"✅ Expired {stats['orders']} pending orders ({stats['units']} units restocked)")
+                except Exception as e:
+                    print(f"❌ Order sweeper error: {e}")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='order-expiry-sweeper', daemon=True)
+    thread.start()
+    return thread
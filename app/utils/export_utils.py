@@ -0,0 +1,128 @@
+from app import db
+from app.models import Game, GameExternalId, Order, OrderItem, User, UserLibrary
+from sqlalchemy import select
+from datetime import date, datetime, timedelta
+import csv
+import io
+import json
+import zlib
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+ORDER_STATUSES = ('pending', 'paid', 'cancelled')
+
+def _day_range(column, start, end):
+    criteria = []
+    if start:
+        criteria.append(column >= datetime.combine(start, datetime.min.time()))
+    if end:
+        criteria.append(column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return criteria
+
+def _orders(start, end, status):
+    criteria = _day_range(Order.created_at, start, end)
+    if status:
+        criteria.append(Order.status == status)
+    return select(
+        Order.id, Order.user_id, User.username, User.email, Order.total_amount,
+        Order.status, Order.payment_method, Order.created_at, Order.updated_at
+    ).join(User, User.id == Order.user_id).where(*criteria).order_by(Order.created_at, Order.id)
+
+def _order_items(start, end, status):
+    criteria = _day_range(Order.created_at, start, end)
+    if status:
+        criteria.append(Order.status == status)
+    return select(
+        OrderItem.id, OrderItem.order_id, Order.status.label('order_status'), Order.created_at.label('order_created_at'),
+        OrderItem.game_id, Game.title, OrderItem.quantity, OrderItem.price
+    ).join(Order, Order.id == OrderItem.order_id).outerjoin(Game, Game.id == OrderItem.game_id) \
+        .where(*criteria).order_by(Order.created_at, Order.id)
+
+def _library(start, end, status):
+    # Kode akses dan password akun tidak ikut diekspor
+    return select(
+        UserLibrary.id, UserLibrary.user_id, User.email, UserLibrary.game_id, Game.title,
+        UserLibrary.purchased_at, UserLibrary.download_count
+    ).join(User, User.id == UserLibrary.user_id).outerjoin(Game, Game.id == UserLibrary.game_id) \
+        .where(*_day_range(UserLibrary.purchased_at, start, end)).order_by(UserLibrary.id)
+
+def _games(start, end, status):
+    # Kolom sama dengan import katalog, jadi file bisa diedit lalu diimport lagi
+    return select(
+        Game.id, GameExternalId.external_id, Game.title, Game.category, Game.price, Game.stock,
+        Game.initial_stock, Game.is_active, Game.share_method, Game.short_description,
+        Game.description, Game.image_url, Game.created_at
+    ).outerjoin(GameExternalId, GameExternalId.game_id == Game.id) \
+        .where(*_day_range(Game.created_at, start, end)).order_by(Game.id)
+
+# nama export -> builder statement (start, end, status); status hanya untuk order
+EXPORTS = {
+    'orders': _orders,
+    'order_items': _order_items,
+    'library': _library,
+    'games': _games,
+}
+
+def export_rows(kind, start=None, end=None, status=None, batch_size=1000):
+    """
+    Stream one export as (column names, row iterator).
+    Rows are fetched batch_size at a time (yield_per, server-side cursor
+    on Postgres), so memory does not grow with the number of rows.
+    """
+    stmt = EXPORTS[kind](start, end, status)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size, stream_results=True))
+    return list(result.keys()), result
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _encode_csv(columns, rows, chunk_rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([_plain(value) for value in row])
+        if n % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def _encode_jsonl(columns, rows, chunk_rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_plain, row))), separators=(',', ':')))
+        if len(lines) >= chunk_rows:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+def export_stream(kind, fmt='csv', start=None, end=None, status=None, compress=False, chunk_rows=500):
+    """
+    Generator of encoded chunks for a Flask Response or a file.
+    compress=True gzips on the fly (one compressor, output flushed per chunk).
+    """
+    columns, rows = export_rows(kind, start, end, status)
+    encode = _encode_csv if fmt == 'csv' else _encode_jsonl
+    try:
+        if not compress:
+            yield from encode(columns, rows, chunk_rows)
+            return
+        gzip = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in encode(columns, rows, chunk_rows):
+            data = gzip.compress(chunk)
+            if data:
+                yield data
+        yield gzip.flush()
+    finally:
+        rows.close()
+
+def export_filename(kind, fmt, start=None, end=None, status=None, compress=False):
+    parts = [kind]
+    if status:
+        parts.append(status)
+    if start or end:
+        parts.append(f"{start or 'awal'}_{end or 'sekarang'}")
+    return '-'.join(parts) + f'.{fmt}' + ('.gz' if compress else '')
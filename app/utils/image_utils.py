@@ -0,0 +1,246 @@
+from flask import current_app
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+try:
+    from PIL import Image, UnidentifiedImageError, features
+except ImportError:  # Pillow opsional: tanpa Pillow file diupload apa adanya
+    Image = None
+
+# preset -> ukuran maksimum (lebar, tinggi), sama dengan transformasi Cloudinary
+SIZES = {'image': (800, 600), 'payment_proof': (1200, 800)}
+# Hanya format ini yang didecode; lainnya (bukti PDF) diteruskan apa adanya
+DECODABLE = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif'}
+# Grafis (QR code, screenshot) dikodekan lossless supaya tetap tajam; PNG berisi foto tetap lossy
+LOSSLESS_SOURCES = {'PNG', 'GIF'}
+GRAPHIC_MAX_COLORS = 4096
+# Grafis datar (QR, logo) dikembalikan ke paletnya setelah resize: tepi tetap tajam, file kecil
+FLAT_MAX_COLORS = 16
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+# Original yang lebih kecil dari hasil encode ulang boleh dipakai apa adanya,
+# asal sudah muat di batas preset dan info-nya hanya berisi kunci struktural ini
+KEEPABLE = {'PNG', 'JPEG', 'GIF', 'WEBP'}
+STRUCTURAL_INFO = {
+    'dpi', 'jfif', 'jfif_density', 'jfif_unit', 'jfif_version', 'progressive', 'progression', 'adobe',
+    'adobe_transform', 'transparency', 'gamma', 'srgb', 'chromaticity', 'aspect', 'interlace',
+    'background', 'duration', 'loop', 'timestamp', 'version',
+}
+
+if Image is not None:
+    # Tag EXIF Orientation -> transpose yang menegakkan gambar
+    TRANSPOSES = {
+        2: Image.Transpose.FLIP_LEFT_RIGHT, 3: Image.Transpose.ROTATE_180, 4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE, 6: Image.Transpose.ROTATE_270, 7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90,
+    }
+    ROTATIONS = {Image.Transpose.TRANSPOSE, Image.Transpose.ROTATE_270, Image.Transpose.TRANSVERSE,
+                 Image.Transpose.ROTATE_90}
+
+class ImageRejected(ValueError):
+    """Not a usable image: corrupt, unsupported, or a decompression bomb"""
+
+def preprocess_image(data, max_size, fmt='webp', quality=80, max_pixels=40000000):
+    """
+    Decode, downscale to fit max_size, apply the EXIF orientation and
+    re-encode as fmt without EXIF/XMP/ICC/text metadata. Images over
+    max_pixels are rejected from the header, before any pixel data is
+    decoded; JPEGs are decoded straight at the smallest DCT scale that
+    still covers the output (draft mode), so memory follows the output
+    size rather than the camera resolution. When the re-encode is not
+    smaller, the original is kept only if it is a web format that already
+    fits max_size and carries no metadata at all.
+    Free of app state, so it can run in a process pool.
+    Returns: (bytes, content_type)
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            image = source
+            width, height = image.size
+            if width * height > max_pixels:
+                raise ImageRejected(f'Image too large: {width}x{height} pixels')
+            source_format = image.format
+            exif = image.getexif()
+            transpose = TRANSPOSES.get(exif.get(0x0112, 1))
+            # Batas diukur sebelum rotasi: foto portrait tersimpan landscape + tag orientasi
+            bounds = (max_size[1], max_size[0]) if transpose in ROTATIONS else max_size
+            scale = min(1.0, bounds[0] / width, bounds[1] / height)
+            image.draft('RGB', (max(1, int(width * scale)), max(1, int(height * scale))))
+
+            colors = image.getcolors(GRAPHIC_MAX_COLORS) if source_format in LOSSLESS_SOURCES else None
+            lossless = colors is not None
+            transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if transparent else 'RGB')
+            image.thumbnail(bounds, Image.LANCZOS, reducing_gap=3.0)
+            if transpose is not None:
+                image = image.transpose(transpose)
+            if lossless and len(colors) <= FLAT_MAX_COLORS:
+                image = image.quantize(colors=len(colors))
+            image.info = {}  # metadata tidak ikut disimpan
+
+            if lossless or fmt not in CONTENT_TYPES or (fmt == 'avif' and not features.check('avif')):
+                fmt = 'webp'
+            output = io.BytesIO()
+            if lossless:
+                image.save(output, 'WEBP', lossless=True)
+            else:
+                image.save(output, fmt.upper(), quality=quality)
+            # Chunk teks PNG setelah IDAT baru terbaca saat decode, jadi dicek sesudahnya
+            bare = not exif and set(source.info) <= STRUCTURAL_INFO
+    except (Image.DecompressionBombError, UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise ImageRejected(f'Rejected image: {e}')
+
+    fits = width <= max_size[0] and height <= max_size[1]
+    if len(output.getvalue()) >= len(data) and source_format in KEEPABLE and fits and bare:
+        return data, Image.MIME[source_format]
+    return output.getvalue(), CONTENT_TYPES[fmt]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _preprocess_pool(app):
+    """
+    Shared pool for preprocessing (MEDIA_PREPROCESS_POOL 'thread' or
+    'process', MEDIA_PREPROCESS_WORKERS wide); it caps how many images are
+    decoded at once no matter how many media workers call in.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = app.config['MEDIA_PREPROCESS_WORKERS'] or min(4, os.cpu_count() or 1)
+                if app.config['MEDIA_PREPROCESS_POOL'] == 'process':
+                    # spawn: fork dari proses yang sudah punya thread tidak aman
+                    _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-preprocess')
+    return _pool
+
+def optimize_image(data, content_type, preset='image'):
+    """
+    Shrink an upload before it leaves the machine, in the preprocessing
+    pool. Files that are not decodable images (PDF proofs) pass through
+    unchanged, as does everything when MEDIA_PREPROCESS is off or Pillow
+    is not installed. Raises ImageRejected for corrupt images and
+    decompression bombs.
+    Returns: (bytes, content_type)
+    """
+    config = current_app.config
+    if Image is None or not config['MEDIA_PREPROCESS'] or content_type not in DECODABLE:
+        return data, content_type
+    future = _preprocess_pool(current_app).submit(
+        preprocess_image, data, SIZES.get(preset, SIZES['image']),
+        config['MEDIA_IMAGE_FORMAT'], config['MEDIA_IMAGE_QUALITY'], config['MEDIA_MAX_PIXELS']
+    )
+    return future.result()
+
+# ==================== BENCHMARK ====================
+
+def sample_corpus(seed=42):
+    """
+    Synthetic upload corpus, built with Pillow: phone photos with EXIF,
+    a payment screenshot, a QR code and game art. Deterministic per seed.
+    Returns: list of (name, bytes, preset)
+    """
+    import random
+    from PIL import ImageDraw
+
+    rng = random.Random(seed)
+
+    def encode(image, fmt, **options):
+        output = io.BytesIO()
+        image.save(output, fmt, **options)
+        return output.getvalue()
+
+    def photo(size):
+        gradient = Image.linear_gradient('L').resize(size)
+        image = Image.merge('RGB', (gradient, gradient.rotate(90, expand=False), Image.new('L', size, 90)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(60):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            radius = rng.randrange(20, size[0] // 6)
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                         fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        # Noise sensor kamera membuat JPEG sebesar foto sungguhan
+        noise = Image.effect_noise(size, 18).convert('RGB')
+        return Image.blend(image, noise, 0.15)
+
+    exif = Image.Exif()
+    exif[0x010F] = 'Phone'
+    exif[0x0112] = 6  # orientasi: diputar 90 derajat
+    corpus = [
+        ('phone_photo.jpg', encode(photo((4032, 3024)), 'JPEG', quality=92, exif=exif.tobytes()), 'payment_proof'),
+        ('phone_photo_art.jpg', encode(photo((3000, 4000)), 'JPEG', quality=90, exif=exif.tobytes()), 'image'),
+    ]
+
+    screenshot = Image.new('RGB', (1080, 2400), 'white')
+    draw = ImageDraw.Draw(screenshot)
+    for row in range(40, 2400, 60):
+        draw.rectangle((60, row, 60 + rng.randrange(300, 960), row + 24), fill=(40, 40, 40))
+    corpus.append(('transfer_screenshot.png', encode(screenshot, 'PNG'), 'payment_proof'))
+
+    qr = Image.new('1', (41, 41), 1)
+    for x in range(41):
+        for y in range(41):
+            if rng.random() < 0.5:
+                qr.putpixel((x, y), 0)
+    corpus.append(('qris.png', encode(qr.resize((1230, 1230), Image.NEAREST), 'PNG'), 'image'))
+    corpus.append(('cover_art.png', encode(photo((1920, 1080)), 'PNG'), 'image'))
+    corpus.append(('banner.webp', encode(photo((1600, 900)), 'WEBP', quality=90), 'image'))
+    return corpus
+
+def benchmark_corpus(corpus, bandwidth_mbps=10.0, rtt_ms=80.0, repeat=3):
+    """
+    Preprocess every corpus file in the app's preprocessing pool and
+    compare bytes and modelled upload time (rtt + size / uplink bandwidth)
+    of the raw and the optimized file. Then run the whole corpus through
+    the pool at once for throughput.
+    Returns: dict with 'files' rows, 'totals' and 'pool'
+    """
+    from app.utils.media_store import sniff_content_type
+
+    def upload_ms(size):
+        return rtt_ms + size * 8 / (bandwidth_mbps * 1000)
+
+    rows = []
+    for name, data, preset in corpus:
+        content_type = sniff_content_type(data[:16])
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output, output_type = optimize_image(data, content_type, preset)
+            timings.append(time.perf_counter() - started)
+        preprocess_ms = sorted(timings)[len(timings) // 2] * 1000
+        rows.append({
+            'name': name, 'preset': preset, 'type': output_type,
+            'raw_bytes': len(data), 'optimized_bytes': len(output),
+            'saved': 1 - len(output) / len(data),
+            'preprocess_ms': preprocess_ms,
+            'raw_upload_ms': upload_ms(len(data)),
+            'optimized_upload_ms': preprocess_ms + upload_ms(len(output)),
+        })
+
+    batch = [item for item in corpus for _ in range(repeat)]
+    pool = _preprocess_pool(current_app)
+    started = time.perf_counter()
+    futures = [pool.submit(preprocess_image, data, SIZES[preset], current_app.config['MEDIA_IMAGE_FORMAT'],
+                           current_app.config['MEDIA_IMAGE_QUALITY'], current_app.config['MEDIA_MAX_PIXELS'])
+               for _, data, preset in batch]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - started
+
+    raw = sum(row['raw_bytes'] for row in rows)
+    optimized = sum(row['optimized_bytes'] for row in rows)
+    return {
+        'files': rows,
+        'totals': {
+            'raw_bytes': raw, 'optimized_bytes': optimized, 'saved': 1 - optimized / raw,
+            'raw_upload_ms': sum(row['raw_upload_ms'] for row in rows),
+            'optimized_upload_ms': sum(row['optimized_upload_ms'] for row in rows),
+        },
+        'pool': {'images': len(batch), 'seconds': elapsed, 'images_per_s': len(batch) / elapsed},
+    }
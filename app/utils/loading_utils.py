@@ -0,0 +1,78 @@
+from flask import current_app, g, has_request_context, request
+from app import db
+from app.models import Order, OrderItem, UserLibrary
+from sqlalchemy import event
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+
+# ==================== LOAD PROFILES ====================
+
+# Strategi loading per view. Many-to-one pakai joinedload (satu JOIN),
+# koleksi pakai selectinload (satu query IN untuk semua parent)
+LOAD_PROFILES = {
+    # admin/orders.html: user per baris; jumlah item lewat attach_item_counts
+    'admin_order_list': lambda: [joinedload(Order.user)],
+    # admin_search_orders sudah JOIN user untuk filter, isi relasi dari JOIN itu
+    'admin_order_search': lambda: [contains_eager(Order.user)],
+    # admin/dashboard.html: 5 pesanan terbaru dengan nama pelanggan
+    'recent_orders': lambda: [joinedload(Order.user)],
+    # admin/order_detail.html dan order_success.html
+    'order_detail': lambda: [
+        joinedload(Order.user),
+        selectinload(Order.items).joinedload(OrderItem.game),
+    ],
+    # library.html: game per item
+    'library': lambda: [joinedload(UserLibrary.game)],
+}
+
+def with_profile(query, profile):
+    """Apply a named loading profile to a query"""
+    return query.options(*LOAD_PROFILES[profile]())
+
+def attach_item_counts(orders):
+    """
+    Precompute order.item_count for a page of orders with one GROUP BY,
+    so the list never loads order.items just to count them.
+    """
+    if not orders:
+        return orders
+    counts = dict(db.session.query(OrderItem.order_id, db.func.count(OrderItem.id)).filter(
+        OrderItem.order_id.in_([order.id for order in orders])
+    ).group_by(OrderItem.order_id).all())
+    for order in orders:
+        order._item_count = counts.get(order.id, 0)
+    return orders
+
+# ==================== N+1 DETECTOR ====================
+
+class NPlusOneError(RuntimeError):
+    pass
+
+def _count_lazy_load(orm_execute_state):
+    # Hanya lazy load (selectinload/joinedload tidak punya lazy_loaded_from)
+    if not orm_execute_state.is_select or not has_request_context():
+        return
+    if orm_execute_state.lazy_loaded_from is None:
+        return
+    action = current_app.config.get('NPLUSONE_ACTION', 'off')
+    if action == 'off':
+        return
+
+    relationship = str(orm_execute_state.loader_strategy_path[-1])
+    counts = g.setdefault('lazy_loads', {})
+    counts[relationship] = counts.get(relationship, 0) + 1
+
+    # Laporkan sekali per relasi per request, tepat saat melewati ambang
+    if counts[relationship] != current_app.config.get('NPLUSONE_THRESHOLD', 5) + 1:
+        return
+    message = (f"N+1 query: {relationship} lazy-loaded more than "
+               f"{counts[relationship] - 1} times in {request.method} {request.path}")
+    if action == 'raise':
+        raise NPlusOneError(message)
+    print(f"❌ {message}")
+
+def init_nplusone(app):
+    """Dev-mode detector for relationships lazy-loaded again and again in one request"""
+    if app.config.get('NPLUSONE_ACTION', 'off') == 'off':
+        return
+    if not event.contains(Session, 'do_orm_execute', _count_lazy_load):
+        event.listen(Session, 'do_orm_execute', _count_lazy_load)
@@ -0,0 +1,331 @@
+from app import db
+from app.models import Game, MediaBlob, Order, OrderItem, PaymentMethod, User
+from app.utils.cloudinary_utils import FakeCloudinary
+from app.utils.media_queue_utils import MediaWorker, media_job_counts
+from sqlalchemy import func, select
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+import io
+import json
+import random
+import threading
+import time
+
+# scenario -> bobot default; bisa diganti lewat --mix
+DEFAULT_MIX = {'browse': 60, 'search': 25, 'buy': 10, 'admin': 5}
+PERCENTILES = (50, 90, 95, 99)
+LOADTEST_ADMIN = ('loadtest-admin@example.com', 'loadtest')
+# PNG 1x1, cukup untuk melewati validasi form bukti pembayaran
+PROOF_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d4944415478da63606060600000000500017aa857500000000049454e44ae426082'
+)
+
+def parse_mix(text):
+    """'browse=60,search=25' -> {'browse': 60, 'search': 25}; raises ValueError"""
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f'Unknown scenario: {name}')
+        mix[name] = int(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError('Scenario mix has no weight')
+    return mix
+
+def prepare_fixtures(seed, max_users=2000):
+    """
+    Read what the scenarios need from a database seeded by seed-scale and
+    make sure the load-test admin exists.
+    Returns: dict with users, games, buyable games, search words, seeded pending orders
+    """
+    from werkzeug.security import generate_password_hash
+    from app.utils.seed_utils import SEED_PASSWORD
+
+    users = db.session.execute(
+        select(User.email).where(User.email.like(f's{seed}\\_user%', escape='\\'), User.is_admin.is_(False))
+        .order_by(User.id).limit(max_users)
+    ).scalars().all()
+    if not users:
+        raise ValueError(f'No users from seed {seed}; run flask seed-scale --seed {seed} first')
+
+    email, password = LOADTEST_ADMIN
+    if not User.query.filter_by(email=email).first():
+        db.session.add(User(username='loadtest-admin', email=email,
+                            password_hash=generate_password_hash(password), is_admin=True))
+        db.session.commit()
+
+    games = db.session.execute(
+        select(Game.id, Game.title, Game.stock).where(Game.is_active.is_(True)).order_by(Game.id)
+    ).all()
+    words = sorted({word.lower() for _, title, _ in games for word in title.split() if len(word) >= 3})
+    payment_method = db.session.execute(
+        select(PaymentMethod.id).where(PaymentMethod.is_active.is_(True)).order_by(PaymentMethod.id)
+    ).scalars().first()
+    if payment_method is None:
+        raise ValueError('No active payment method')
+    pending = db.session.execute(
+        select(Order.id).where(Order.status == 'pending').order_by(Order.created_at).limit(5000)
+    ).scalars().all()
+    return {
+        'users': [(user, SEED_PASSWORD) for user in users],
+        'games': [game_id for game_id, _, _ in games],
+        # Game dengan stok kecil di depan: rebutan stok adalah yang mau diuji
+        'buyable': [game_id for game_id, _, stock in sorted(games, key=lambda game: (game[2], game[0])) if stock > 0],
+        'words': words,
+        'pending': pending,
+        'payment_method': str(payment_method),
+    }
+
+class VirtualUser:
+    """One simulated client: its own test client, RNG and latency samples"""
+
+    def __init__(self, app, fixtures, shared, seed):
+        self.app = app
+        self.fixtures = fixtures
+        self.shared = shared
+        self.rng = random.Random(seed)
+        self.client = app.test_client()
+        self.admin_client = None
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+        self.outcomes = defaultdict(Counter)
+
+    def request(self, endpoint, method, url, expect=(200,), client=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = (client or self.client).open(url, method=method, **kwargs)
+        except Exception:
+            self.samples[endpoint].append(time.perf_counter() - started)
+            self.errors[endpoint] += 1
+            return None
+        self.samples[endpoint].append(time.perf_counter() - started)
+        if response.status_code not in expect:
+            self.errors[endpoint] += 1
+        return response
+
+    def login(self, email, password):
+        """Returns: a fresh test client logged in as email, or None"""
+        client = self.app.test_client()
+        response = self.request('login', 'POST', '/login', expect=(302,), client=client,
+                                data={'email': email, 'password': password})
+        return client if response is not None and response.status_code == 302 else None
+
+def _browse(user):
+    user.request('index', 'GET', '/')
+    user.request('games', 'GET', f'/games?page={user.rng.randint(1, 5)}')
+    for _ in range(user.rng.randint(1, 3)):
+        user.request('game_detail', 'GET', f"/game/{user.rng.choice(user.fixtures['games'])}")
+    return 'ok'
+
+def _search(user):
+    # Ketikan bertahap seperti typeahead di navbar
+    word = user.rng.choice(user.fixtures['words'])
+    for length in range(2, min(len(word), 5) + 1):
+        user.request('search', 'GET', f'/search?q={word[:length]}')
+    return 'ok'
+
+def _buy(user):
+    user.client = user.login(*user.rng.choice(user.fixtures['users']))
+    if user.client is None:
+        user.client = user.app.test_client()
+        return 'login_failed'
+    buyable = user.fixtures['buyable']
+    hot = buyable[:max(1, len(buyable) // 10)]
+    for _ in range(user.rng.choice((1, 1, 2, 3))):
+        game_id = user.rng.choice(hot if user.rng.random() < 0.5 else buyable)
+        user.request('add_to_cart', 'GET', f'/add-to-cart/{game_id}', expect=(302,))
+    page = user.request('checkout', 'GET', '/checkout', expect=(200, 302))
+    if page is None or page.status_code != 200:
+        return 'not_checkable'
+    response = user.request('checkout', 'POST', '/checkout', expect=(302,), content_type='multipart/form-data', data={
+        'payment_method': user.fixtures['payment_method'],
+        'proof_image': (io.BytesIO(PROOF_PNG), 'proof.png'),
+    })
+    if response is None:
+        return 'error'
+    location = response.headers.get('Location', '')
+    if '/order/success/' in location:
+        user.shared['created'].append(location.rsplit('/', 1)[-1])
+        return 'ordered'
+    return 'out_of_stock' if response.status_code == 302 else 'rejected'
+
+def _admin(user):
+    if user.admin_client is None:
+        user.admin_client = user.login(*LOADTEST_ADMIN)
+        if user.admin_client is None:
+            return 'login_failed'
+    try:
+        order_id = user.shared['created'].popleft()
+        # Order hasil load test boleh ditolak: stok kembali dan ikut dicek di akhir
+        action = 'reject' if user.rng.random() < 0.2 else 'approve'
+    except IndexError:
+        try:
+            order_id = user.shared['pending'].popleft()
+        except IndexError:
+            return 'idle'
+        # Order seed hanya di-approve, supaya stok awal tidak berubah
+        action = 'approve'
+    user.request('verify_payment', 'POST', f'/admin/verify-payment/{order_id}', expect=(302,),
+                 client=user.admin_client, data={'action': action})
+    return 'approved' if action == 'approve' else 'rejected'
+
+SCENARIOS = {
+    'browse': _browse,
+    'search': _search,
+    'buy': _buy,
+    'admin': _admin,
+}
+
+def _percentile(ordered, percent):
+    # nearest-rank
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+def _stock_checks(before, started):
+    """
+    No game may go below zero, and every game's stock must drop by exactly
+    the quantity of the orders created during the run that are still
+    holding stock (not cancelled).
+    """
+    after = dict(db.session.execute(select(Game.id, Game.stock)).tuples().all())
+    held = dict(db.session.execute(
+        select(OrderItem.game_id, func.sum(OrderItem.quantity))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.created_at >= started, Order.status != 'cancelled')
+        .group_by(OrderItem.game_id)
+    ).tuples().all())
+    created = Counter(dict(db.session.execute(
+        select(Order.status, func.count()).where(Order.created_at >= started).group_by(Order.status)
+    ).tuples().all()))
+
+    negative = sorted(game_id for game_id, stock in after.items() if stock < 0)
+    mismatched = [
+        {'game_id': game_id, 'before': before.get(game_id), 'after': after.get(game_id), 'held': held.get(game_id, 0)}
+        for game_id in sorted(set(before) | set(after))
+        if before.get(game_id, 0) - held.get(game_id, 0) != after.get(game_id, 0)
+    ]
+    return {
+        'orders_created': sum(created.values()),
+        'orders_by_status': dict(sorted(created.items())),
+        'units_held': sum(held.values()),
+        'negative_stock': negative,
+        'stock_mismatches': mismatched,
+        'passed': not negative and not mismatched,
+    }
+
+def run_load_test(app, users=8, duration=30.0, mix=None, seed=42, think_time=0.0):
+    """
+    Drive the weighted scenarios with `users` concurrent virtual users
+    (threads, each with its own test client) for `duration` seconds, then
+    check stock for overselling. Cloudinary is replaced by FakeCloudinary
+    for the whole run; queued media jobs are drained before the checks.
+    Returns: report dict (stable keys and rounding, meant to be diffed)
+    """
+    mix = mix or DEFAULT_MIX
+    names, weights = zip(*mix.items())
+
+    with app.app_context():
+        fixtures = prepare_fixtures(seed)
+        before = dict(db.session.execute(select(Game.id, Game.stock)).tuples().all())
+        dialect = db.engine.dialect.name
+    shared = {'created': deque(), 'pending': deque(fixtures['pending'])}
+    runs = [VirtualUser(app, fixtures, shared, seed * 1000 + n) for n in range(users)]
+
+    def work(user, deadline):
+        while time.perf_counter() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            try:
+                outcome = SCENARIOS[name](user)
+            except Exception as e:
+                print(f"❌ Load test scenario {name} failed: {e}")
+                outcome = 'exception'
+            user.outcomes[name][outcome] += 1
+            if think_time:
+                time.sleep(user.rng.uniform(0, 2 * think_time))
+
+    started_at = datetime.utcnow()
+    with FakeCloudinary():
+        started = time.perf_counter()
+        threads = [threading.Thread(target=work, args=(user, started + duration), daemon=True) for user in runs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        # Bukti pembayaran diupload media worker, di luar waktu request
+        worker = MediaWorker(app, threads=4)
+        worker.drain()
+        worker.pool.shutdown()
+
+    endpoints = {}
+    all_samples = defaultdict(list)
+    errors = Counter()
+    outcomes = defaultdict(Counter)
+    for user in runs:
+        for endpoint, samples in user.samples.items():
+            all_samples[endpoint] += samples
+        errors.update(user.errors)
+        for name, counter in user.outcomes.items():
+            outcomes[name].update(counter)
+
+    for endpoint in sorted(all_samples):
+        ordered = sorted(all_samples[endpoint])
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'errors': errors[endpoint],
+            'error_rate': round(errors[endpoint] / len(ordered), 4),
+            'throughput_rps': round(len(ordered) / elapsed, 1),
+            'latency_ms': {
+                'mean': round(sum(ordered) / len(ordered) * 1000, 1),
+                **{f'p{percent}': round(_percentile(ordered, percent) * 1000, 1) for percent in PERCENTILES},
+                'max': round(ordered[-1] * 1000, 1),
+            },
+        }
+    total = sum(item['requests'] for item in endpoints.values())
+    total_errors = sum(errors.values())
+
+    with app.app_context():
+        checks = _stock_checks(before, started_at)
+        checks['media_jobs'] = dict(sorted(media_job_counts().items()))
+        checks['media_blobs'] = db.session.query(MediaBlob).count()
+
+    return {
+        'config': {'users': users, 'duration_s': duration, 'mix': dict(mix), 'seed': seed,
+                   'think_time_s': think_time, 'dialect': dialect},
+        'totals': {
+            'requests': total,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total, 4) if total else 0.0,
+            'throughput_rps': round(total / elapsed, 1),
+            'elapsed_s': round(elapsed, 1),
+        },
+        'endpoints': endpoints,
+        'scenarios': {name: {'runs': sum(counter.values()), 'outcomes': dict(sorted(counter.items()))}
+                      for name, counter in sorted(outcomes.items())},
+        'checks': checks,
+    }
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare_reports(baseline, current):
+    """
+    Per-endpoint p95 latency and throughput of two reports.
+    Returns: list of (endpoint, old p95, new p95, old rps, new rps); None where missing
+    """
+    rows = []
+    for endpoint in sorted(set(baseline.get('endpoints', {})) | set(current.get('endpoints', {}))):
+        old = baseline.get('endpoints', {}).get(endpoint)
+        new = current.get('endpoints', {}).get(endpoint)
+        rows.append((
+            endpoint,
+            old and old['latency_ms']['p95'], new and new['latency_ms']['p95'],
+            old and old['throughput_rps'], new and new['throughput_rps'],
+        ))
+    return rows
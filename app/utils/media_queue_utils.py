@@ -0,0 +1,358 @@
+from app import db
+from app.models import Game, MediaJob, Order, PaymentMethod
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from werkzeug.utils import secure_filename
+import os
+import random
+import socket
+import threading
+import uuid
+
+# target_type -> (model, kolom url, kolom public_id) yang diisi setelah upload selesai
+TARGETS = {
+    'game': (Game, 'image_url', 'image_public_id'),
+    'order': (Order, 'payment_proof_url', 'payment_proof_public_id'),
+    'payment_method': (PaymentMethod, 'qr_code_url', 'qr_code_public_id'),
+}
+HOST = socket.gethostname()
+
+class PermanentJobError(Exception):
+    """Retrying cannot help (the scratch file is gone, or the image was rejected)"""
+
+# ==================== ENQUEUE ====================
+
+def scratch_dir(app):
+    path = app.config.get('MEDIA_SCRATCH_DIR') or os.path.join(app.instance_path, 'media_scratch')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def save_scratch(file):
+    """
+    Write an uploaded FileStorage to local scratch under a random name.
+    Returns: the file path
+    """
+    extension = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    path = os.path.join(scratch_dir(current_app), f'{uuid.uuid4().hex}{extension}')
+    file.save(path)
+    return path
+
+def enqueue_upload(file, preset, folder, target_type, target_id):
+    """
+    Keep the raw upload on local disk and add an upload job to the current
+    session, so it is committed together with the row it belongs to.
+    The worker is woken after that commit and fills the target's
+    url/public_id columns when it is done.
+    Returns: the MediaJob
+    """
+    job = MediaJob(action='upload', preset=preset, folder=folder, scratch_path=save_scratch(file), host=HOST,
+                   target_type=target_type, target_id=str(target_id),
+                   max_attempts=current_app.config['MEDIA_JOB_MAX_ATTEMPTS'])
+    db.session.add(job)
+    db.session.info['media_enqueued'] = True
+    return job
+
+def enqueue_delete(public_id):
+    """Queue a Cloudinary delete in the current session. Returns: the MediaJob, or None without public_id"""
+    if not public_id:
+        return None
+    job = MediaJob(action='delete', public_id=public_id, max_attempts=current_app.config['MEDIA_JOB_MAX_ATTEMPTS'])
+    db.session.add(job)
+    db.session.info['media_enqueued'] = True
+    return job
+
+def _wake_after_commit(session):
+    # Baru dibangunkan setelah commit, supaya poll pertama sudah melihat job-nya
+    if session.info.pop('media_enqueued', None) and has_app_context():
+        wake_media_worker(current_app._get_current_object())
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('media_enqueued', None)
+
+# ==================== WORKER ====================
+
+def retry_delay(attempts, base, cap):
+    """Exponential backoff base * 2^(attempts-1), capped, with jitter in the upper half"""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return random.uniform(delay / 2, delay)
+
+def _claim_jobs(limit, now):
+    """
+    Move due pending jobs to running. Only rows still pending are taken, so
+    threads, processes and nodes working the same table never run a job
+    twice. Upload jobs are only taken on the node holding the scratch file,
+    unless MEDIA_SCRATCH_SHARED is set.
+    Returns: list of claimed job ids
+    """
+    criteria = [MediaJob.status == 'pending', MediaJob.run_after <= now]
+    if not current_app.config['MEDIA_SCRATCH_SHARED']:
+        criteria.append(or_(MediaJob.scratch_path.is_(None), MediaJob.host == HOST))
+    candidate_ids = db.session.execute(
+        select(MediaJob.id).where(*criteria).order_by(MediaJob.run_after, MediaJob.id).limit(limit)
+    ).scalars().all()
+    if not candidate_ids:
+        return []
+
+    stmt = update(MediaJob).where(
+        MediaJob.id.in_(candidate_ids),
+        MediaJob.status == 'pending'
+    ).values(status='running', locked_at=now, updated_at=now).execution_options(synchronize_session=False)
+
+    if db.engine.dialect.update_returning:
+        return [row[0] for row in db.session.execute(stmt.returning(MediaJob.id))]
+
+    # Fallback tanpa RETURNING: klaim satu per satu
+    claimed = []
+    for job_id in candidate_ids:
+        single = update(MediaJob).where(
+            MediaJob.id == job_id,
+            MediaJob.status == 'pending'
+        ).values(status='running', locked_at=now, updated_at=now).execution_options(synchronize_session=False)
+        if db.session.execute(single).rowcount == 1:
+            claimed.append(job_id)
+    return claimed
+
+def _requeue_stale(now):
+    """Jobs left running by a worker that died go back to pending"""
+    cutoff = now - timedelta(seconds=current_app.config['MEDIA_JOB_TIMEOUT'])
+    db.session.execute(update(MediaJob).where(
+        MediaJob.status == 'running',
+        MediaJob.locked_at < cutoff
+    ).values(status='pending', locked_at=None, updated_at=now).execution_options(synchronize_session=False))
+
+def _perform(job):
+    """
+    The remote call, made outside any database transaction.
+    Returns: (url, public_id); raises on failure
+    """
+    from app.utils.cloudinary_utils import delete_image, upload_image, upload_payment_proof
+
+    if job.action == 'delete':
+        if delete_image(job.public_id) is None:
+            raise RuntimeError(f'Delete of {job.public_id} failed')
+        return None, job.public_id
+
+    if not job.scratch_path or not os.path.exists(job.scratch_path):
+        raise PermanentJobError(f'Scratch file missing: {job.scratch_path}')
+    upload = upload_payment_proof if job.preset == 'payment_proof' else upload_image
+    result = upload(job.scratch_path, folder=job.folder)
+    if not result['success']:
+        raise (PermanentJobError if result.get('rejected') else RuntimeError)(result['error'])
+    return result['url'], result['public_id']
+
+def _apply_upload(job, url, public_id):
+    """
+    Point the target row at the uploaded image and queue the image it
+    replaces for deletion. An upload whose target is gone, or that a newer
+    upload for the same target already replaced, is deleted again.
+    Returns: True if the target row was updated
+    """
+    model, url_column, id_column = TARGETS[job.target_type]
+    row = db.session.get(model, job.target_id if model is Order else int(job.target_id))
+    newer = db.session.execute(select(MediaJob.id).where(
+        MediaJob.target_type == job.target_type,
+        MediaJob.target_id == job.target_id,
+        MediaJob.action == 'upload',
+        MediaJob.status == 'done',
+        MediaJob.id > job.id
+    ).limit(1)).first()
+    if row is None or newer is not None:
+        enqueue_delete(public_id)
+        return False
+    replaced = getattr(row, id_column)
+    setattr(row, url_column, url)
+    setattr(row, id_column, public_id)
+    if replaced and replaced != public_id:
+        enqueue_delete(replaced)
+    return True
+
+def _remove_scratch(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"❌ Could not remove scratch file {path}: {e}")
+
+def process_job(app, job_id):
+    """
+    Run one claimed job in its own app context.
+    Success: the target row is updated and the job marked done. Failure:
+    the job goes back to pending with exponential backoff, or to failed
+    after MEDIA_JOB_MAX_ATTEMPTS (scratch file kept for a manual retry).
+    Returns: 'done', 'retry', 'failed', or None if the job was not running
+    """
+    with app.app_context():
+        try:
+            job = db.session.get(MediaJob, job_id)
+            if job is None or job.status != 'running':
+                return None
+            # Lepas transaksi sebelum panggilan jaringan; job tetap terbaca (detached)
+            db.session.expunge(job)
+            db.session.commit()
+
+            try:
+                url, public_id = _perform(job)
+                error = None
+            except Exception as e:
+                error = e
+
+            job = db.session.get(MediaJob, job_id)
+            now = datetime.utcnow()
+            job.attempts += 1
+            job.locked_at = None
+            if error is None:
+                if job.action == 'upload':
+                    _apply_upload(job, url, public_id)
+                job.url, job.public_id = url, public_id
+                job.status = 'done'
+                job.last_error = None
+            elif isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.last_error = str(error)[:2000]
+            else:
+                job.status = 'pending'
+                job.last_error = str(error)[:2000]
+                job.run_after = now + timedelta(seconds=retry_delay(
+                    job.attempts, app.config['MEDIA_RETRY_BASE'], app.config['MEDIA_RETRY_MAX']))
+            db.session.commit()
+
+            if job.status == 'done':
+                _remove_scratch(job.scratch_path)
+                return 'done'
+            if job.status == 'failed':
+                print(f"❌ Media job {job_id} failed after {job.attempts} attempts: {job.last_error}")
+            return 'failed' if job.status == 'failed' else 'retry'
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Media job {job_id} error: {e}")
+            return None
+        finally:
+            db.session.remove()
+
+def _claim_batch(app, limit):
+    with app.app_context():
+        try:
+            now = datetime.utcnow()
+            _requeue_stale(now)
+            claimed = _claim_jobs(limit, now)
+            db.session.commit()
+            return claimed
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+class MediaWorker:
+    """
+    Thread pool working the media_job table: claims up to `threads` due jobs
+    at a time, sleeps poll_interval when idle and wakes early on enqueue.
+    """
+
+    def __init__(self, app, threads=2, poll_interval=1.0):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='media-worker')
+        self.stats = {'done': 0, 'retry': 0, 'failed': 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Claim and run one batch. Returns: number of jobs claimed"""
+        claimed = _claim_batch(self.app, self.threads)
+        for outcome in self.pool.map(lambda job_id: process_job(self.app, job_id), claimed):
+            if outcome:
+                self.stats[outcome] += 1
+        return len(claimed)
+
+    def drain(self, max_jobs=None):
+        """Run due jobs until none are left (or max_jobs). Returns: jobs claimed"""
+        total = 0
+        while max_jobs is None or total < max_jobs:
+            claimed = self.run_once()
+            if not claimed:
+                break
+            total += claimed
+        return total
+
+    def loop(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                print(f"❌ Media worker error: {e}")
+                claimed = 0
+            if not claimed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.loop, name='media-worker-poller', daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        self.pool.shutdown()
+
+_worker_lock = threading.Lock()
+
+def start_media_workers(app):
+    """
+    In-process worker pool (MEDIA_WORKER_THREADS, 0 = only `flask
+    media-worker`). Started by create_app, so jobs left pending or in
+    backoff by a restart run again without waiting for a new upload, and
+    otherwise on the first enqueue of the process. Not started under
+    TESTING: tests and benchmarks drive MediaWorker directly.
+    Returns: the MediaWorker or None
+    """
+    threads = app.config.get('MEDIA_WORKER_THREADS', 0)
+    if threads <= 0 or app.config.get('TESTING'):
+        return None
+    worker = app.extensions.get('media_worker')
+    if worker is None:
+        with _worker_lock:
+            worker = app.extensions.get('media_worker')
+            if worker is None:
+                worker = MediaWorker(app, threads, app.config['MEDIA_POLL_INTERVAL']).start()
+                app.extensions['media_worker'] = worker
+    return worker
+
+def wake_media_worker(app):
+    worker = start_media_workers(app)
+    if worker is not None:
+        worker.wake()
+
+def init_media_queue(app):
+    """Wake the worker after every commit that enqueued a media job"""
+    if not event.contains(Session, 'after_commit', _wake_after_commit):
+        event.listen(Session, 'after_commit', _wake_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
+
+# ==================== ADMIN ====================
+
+def media_job_counts():
+    """Returns: dict status -> number of jobs"""
+    return dict(db.session.execute(
+        select(MediaJob.status, func.count()).group_by(MediaJob.status)
+    ).tuples().all())
+
+def retry_failed_jobs():
+    """Put failed jobs back in the queue with a fresh attempt budget. Returns: count"""
+    now = datetime.utcnow()
+    result = db.session.execute(update(MediaJob).where(MediaJob.status == 'failed').values(
+        status='pending', attempts=0, run_after=now, updated_at=now
+    ).execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,280 @@
+from app import db
+from app.models import MediaBlob
+from app.utils.image_utils import optimize_image
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import safe_join
+from datetime import datetime, timedelta
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import urllib.request
+
+# Transformasi Cloudinary per preset upload
+PRESETS = {
+    'image': [{'width': 800, 'height': 600, 'crop': 'limit'}, {'quality': 'auto'}, {'format': 'webp'}],
+    'payment_proof': [{'width': 1200, 'height': 800, 'crop': 'limit'}, {'quality': 'auto'}],
+}
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+]
+# Blob content-addressed tidak pernah berubah isinya
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Upload dengan key sama di proses ini antre di lock yang sama, jadi hanya satu yang benar-benar upload
+_key_locks = [threading.Lock() for _ in range(64)]
+
+def sniff_content_type(head):
+    """File type from the first bytes of a file. Returns: MIME type"""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:12] in (b'ftypavif', b'ftypavis'):
+        return 'image/avif'
+    return 'application/octet-stream'
+
+# ==================== BACKENDS ====================
+
+class CloudinaryMediaStore:
+    """Cloudinary; transformasi preset dijalankan Cloudinary saat upload"""
+    name = 'cloudinary'
+
+    def put(self, key, data, content_type, preset='image'):
+        import cloudinary.uploader
+        result = cloudinary.uploader.upload(io.BytesIO(data), public_id=key, overwrite=False, unique_filename=False,
+                                            transformation=PRESETS.get(preset, PRESETS['image']))
+        return result['secure_url']
+
+    def delete(self, key):
+        import cloudinary.uploader
+        return cloudinary.uploader.destroy(key).get('result') == 'ok'
+
+    def exists(self, key):
+        import cloudinary.api
+        import cloudinary.exceptions
+        try:
+            cloudinary.api.resource(key)
+            return True
+        except cloudinary.exceptions.NotFound:
+            return False
+
+    def url_for(self, key):
+        import cloudinary
+        return cloudinary.CloudinaryImage(key).build_url(secure=True)
+
+class LocalMediaStore:
+    """File di disk lokal, disajikan lewat /media/<key> (atau MEDIA_BASE_URL); tanpa jaringan"""
+    name = 'local'
+
+    def __init__(self, root, base_url='/media'):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f'Invalid media key: {key}')
+        return path
+
+    def put(self, key, data, content_type, preset='image'):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self.url_for(key)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def url_for(self, key):
+        return f'{self.base_url}/{key}'
+
+class S3MediaStore:
+    """Bucket S3 atau yang kompatibel (MinIO, R2, ...); butuh boto3"""
+    name = 's3'
+
+    def __init__(self, bucket, endpoint_url=None, public_url=None, region=None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError('MEDIA_STORAGE=s3 needs boto3: pip install boto3')
+        self.bucket = bucket
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        if public_url:
+            self.public_url = public_url.rstrip('/')
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f'https://{bucket}.s3.{region or "us-east-1"}.amazonaws.com'
+
+    def put(self, key, data, content_type, preset='image'):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type,
+                               CacheControl=IMMUTABLE_CACHE)
+        return self.url_for(key)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return True
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def url_for(self, key):
+        return f'{self.public_url}/{key}'
+
+def create_media_store(app):
+    """Pilih backend berdasarkan MEDIA_STORAGE: 'cloudinary', 'local' atau 's3'"""
+    backend = app.config.get('MEDIA_STORAGE', 'local')
+    if backend == 'cloudinary':
+        return CloudinaryMediaStore()
+    if backend == 's3':
+        return S3MediaStore(app.config['MEDIA_S3_BUCKET'], app.config.get('MEDIA_S3_ENDPOINT_URL'),
+                            app.config.get('MEDIA_S3_PUBLIC_URL'), app.config.get('MEDIA_S3_REGION'))
+    return LocalMediaStore(app.config.get('MEDIA_STORAGE_PATH') or os.path.join(app.instance_path, 'media'),
+                           app.config.get('MEDIA_BASE_URL') or '/media')
+
+def get_media_store():
+    return current_app.extensions['media_store']
+
+# ==================== CONTENT-ADDRESSED STORAGE ====================
+
+def read_source(source, max_bytes):
+    """
+    Uploaded file / file object, local path or http(s) URL -> bytes.
+    Raises ValueError above max_bytes.
+    """
+    if isinstance(source, str) and source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=30) as response:
+            data = response.read(max_bytes + 1)
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            data = f.read(max_bytes + 1)
+    else:
+        data = source.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f'File larger than {max_bytes} bytes')
+    return data
+
+def content_key(data, folder=''):
+    """folder/sha256 of the content: the same file always gets the same key"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{folder.strip('/')}/{digest}" if folder.strip('/') else digest
+
+def _record_blob(key, backend, url, content_type, size, now):
+    values = {'backend': backend, 'url': url, 'content_type': content_type, 'size': size, 'last_used_at': now}
+    try:
+        with db.engine.begin() as connection:
+            if not connection.execute(update(MediaBlob).where(MediaBlob.key == key).values(**values)).rowcount:
+                connection.execute(insert(MediaBlob).values(key=key, created_at=now, **values))
+    except IntegrityError:
+        # Upload paralel dengan isi yang sama sudah mencatat blob ini
+        with db.engine.begin() as connection:
+            connection.execute(update(MediaBlob).where(MediaBlob.key == key).values(**values))
+
+def store_media(source, folder, preset='image'):
+    """
+    Store a file under the hash of its content. When the same file is
+    already in this backend, the upload is skipped and the indexed URL is
+    returned (dedupe hit); otherwise images are downscaled and re-encoded
+    locally first (optimize_image), so only the optimized bytes go out.
+    The media_blob index is written on its own connection: do not call
+    this while holding a write transaction.
+    Returns: dict with 'url', 'public_id' and 'deduped'
+    """
+    store = get_media_store()
+    data = read_source(source, current_app.config['MEDIA_MAX_BYTES'])
+    key = content_key(data, folder)
+
+    with _key_locks[hash(key) % len(_key_locks)]:
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            url = connection.execute(select(MediaBlob.url).where(
+                MediaBlob.key == key, MediaBlob.backend == store.name
+            )).scalar()
+            if url is not None:
+                connection.execute(update(MediaBlob).where(MediaBlob.key == key).values(last_used_at=now))
+        if url is not None:
+            return {'url': url, 'public_id': key, 'deduped': True}
+
+        # Key dari isi asli: dedupe hit tidak perlu decode ulang
+        data, content_type = optimize_image(data, sniff_content_type(data[:16]), preset)
+        url = store.put(key, data, content_type, preset)
+        _record_blob(key, store.name, url, content_type, len(data), now)
+        return {'url': url, 'public_id': key, 'deduped': False}
+
+def _referenced(connection, keys):
+    """Keys still used by a game, order or payment method"""
+    from app.utils.media_queue_utils import TARGETS
+    used = set()
+    for model, url_column, id_column in TARGETS.values():
+        column = getattr(model, id_column)
+        used.update(connection.execute(select(column).where(column.in_(keys))).scalars())
+    return used
+
+def release_media(public_id):
+    """
+    Delete a stored blob, unless a row still points at it (identical
+    uploads share one blob) or a dedupe hit handed it out less than
+    MEDIA_BLOB_GRACE seconds ago; `flask media-jobs --gc` collects those
+    later. Public ids from before the index (no media_blob row) are
+    deleted directly.
+    Returns: True if the blob was deleted
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['MEDIA_BLOB_GRACE'])
+    with db.engine.begin() as connection:
+        if _referenced(connection, [public_id]):
+            return False
+        last_used = connection.execute(select(MediaBlob.last_used_at).where(MediaBlob.key == public_id)).first()
+        if last_used is not None and last_used[0] and last_used[0] > cutoff:
+            return False
+        connection.execute(delete(MediaBlob).where(MediaBlob.key == public_id))
+    return get_media_store().delete(public_id)
+
+def collect_garbage(batch_size=500, dry_run=False):
+    """
+    Delete indexed blobs that no row references and that were not used for
+    MEDIA_BLOB_GRACE seconds. Reference checks run per batch of keys.
+    Returns: list of deleted (or, with dry_run, deletable) keys
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['MEDIA_BLOB_GRACE'])
+    store = get_media_store()
+    collected = []
+    after = ''
+    while True:
+        with db.engine.connect() as connection:
+            keys = connection.execute(select(MediaBlob.key).where(
+                MediaBlob.backend == store.name, MediaBlob.last_used_at < cutoff, MediaBlob.key > after
+            ).order_by(MediaBlob.key).limit(batch_size)).scalars().all()
+            if not keys:
+                return collected
+            after = keys[-1]
+            used = _referenced(connection, keys)
+        unused = [key for key in keys if key not in used]
+        for key in unused:
+            if dry_run or release_media(key):
+                collected.append(key)
@@ -0,0 +1,175 @@
+from flask import current_app, request
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import json
+import threading
+import time
+
+# ==================== CURSORS ====================
+
+# Bentuk key daftar: (created_at, id); id order berupa UUID string
+KEY_TYPES = (datetime, int)
+ORDER_KEY_TYPES = (datetime, str)
+
+def encode_cursor(values, direction='next'):
+    """Opaque URL-safe token for a keyset position (e.g. created_at, id)"""
+    key = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({'d': direction, 'k': key}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(token, key_types=KEY_TYPES):
+    """
+    Reverse of encode_cursor. The key must match key_types in length and
+    element types, so a forged cursor can never reach a comparison.
+    Returns: (values tuple, direction)
+    Raises: ValueError when the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        values = tuple(datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in data['k'])
+        direction = data.get('d', 'next')
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if direction not in ('next', 'prev'):
+        raise ValueError('Invalid cursor direction')
+    if len(values) != len(key_types) or not all(
+        isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, key_types)
+    ):
+        raise ValueError('Invalid cursor key')
+    return values, direction
+
+class Page:
+    """Satu halaman hasil keyset pagination"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def to_dict(self):
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page,
+            'total': self.total
+        }
+
+def get_page_args(size_setting='PAGE_SIZE', key_types=KEY_TYPES):
+    """
+    Read ?cursor= and ?per_page= from the request; the default page size
+    comes from the given config key (PAGE_SIZE or ADMIN_PAGE_SIZE).
+    A malformed cursor, or one whose key does not match key_types, falls
+    back to the first page.
+    Returns: (cursor values or None, direction, per_page)
+    """
+    max_size = current_app.config.get('MAX_PAGE_SIZE', 100)
+    per_page = request.args.get('per_page', type=int) or current_app.config.get(size_setting, 24)
+    per_page = max(1, min(per_page, max_size))
+
+    token = request.args.get('cursor')
+    if not token:
+        return None, 'next', per_page
+    try:
+        values, direction = decode_cursor(token, key_types)
+    except ValueError:
+        return None, 'next', per_page
+    return values, direction, per_page
+
+def _build_page(rows, key, cursor, direction, per_page, total):
+    """rows sudah dalam urutan tampil, panjangnya paling banyak per_page + 1"""
+    has_more = len(rows) > per_page
+    if direction == 'prev':
+        # Baris lebih dari per_page ada di depan (halaman sebelumnya masih ada)
+        items = rows[-per_page:] if has_more else rows
+        more_before, more_after = has_more, True
+    else:
+        items = rows[:per_page]
+        more_before, more_after = cursor is not None, has_more
+
+    next_cursor = encode_cursor(key(items[-1]), 'next') if items and more_after else None
+    prev_cursor = encode_cursor(key(items[0]), 'prev') if items and more_before else None
+    return Page(items, per_page, next_cursor, prev_cursor, total)
+
+# ==================== QUERY PAGINATION ====================
+
+def paginate_query(query, columns, cursor=None, direction='next', per_page=24, total=None):
+    """
+    Keyset pagination, newest first, over a unique column tuple such as
+    (Order.created_at, Order.id). Each page is one index range scan with
+    LIMIT per_page + 1, so page N costs the same as page 1.
+    Returns: Page
+    """
+    key_columns = tuple_(*columns)
+    if direction == 'prev':
+        if cursor is not None:
+            query = query.filter(key_columns > tuple_(*cursor))
+        rows = query.order_by(*[c.asc() for c in columns]).limit(per_page + 1).all()
+        rows.reverse()
+    else:
+        if cursor is not None:
+            query = query.filter(key_columns < tuple_(*cursor))
+        rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+
+    names = [c.key for c in columns]
+    key = lambda row: [getattr(row, name) for name in names]
+    return _build_page(rows, key, cursor, direction, per_page, total)
+
+def paginate_list(items, key, cursor=None, direction='next', per_page=24):
+    """
+    Same cursor semantics for an in-memory list already sorted by key
+    descending (catalog records). Total is always known here.
+    Returns: Page
+    """
+    if cursor is None:
+        start = 0
+    else:
+        cursor = list(cursor)
+        start = next((i for i, item in enumerate(items) if list(key(item)) < cursor), len(items))
+        if direction == 'prev':
+            # Posisi pertama yang masih lebih baru dari cursor
+            start = next((i for i, item in enumerate(items) if list(key(item)) <= cursor), len(items))
+
+    if direction == 'prev' and cursor is not None:
+        rows = items[max(start - per_page - 1, 0):start]
+    else:
+        rows = items[start:start + per_page + 1]
+    return _build_page(rows, lambda item: list(key(item)), cursor, direction, per_page, len(items))
+
+# ==================== COUNT ESTIMATES ====================
+
+_counts = {}
+_counts_lock = threading.Lock()
+
+def cached_count(key, loader, ttl=None):
+    """
+    Totals shown next to paginated lists. Exact counts over big tables
+    are not worth running on every page view, so the loader result is
+    shared inside the worker for COUNT_CACHE_TTL seconds.
+    """
+    if ttl is None:
+        ttl = current_app.config.get('COUNT_CACHE_TTL', 60)
+    now = time.monotonic()
+    entry = _counts.get(key)
+    if entry is not None and now < entry[1]:
+        return entry[0]
+    value = loader()
+    with _counts_lock:
+        _counts[key] = (value, now + ttl)
+    return value
+
+def clear_count_cache(prefix=''):
+    with _counts_lock:
+        for key in [k for k in _counts if k.startswith(prefix)]:
+            del _counts[key]
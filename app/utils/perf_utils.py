@@ -0,0 +1,164 @@
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+import itertools
+import time
+
+# ==================== RING BUFFER ====================
+
+class RingBuffer:
+    """
+    Fixed-size sample buffer without locks.
+    next() on itertools.count and a single list item assignment are both
+    atomic under the GIL, so concurrent writers never block each other;
+    a reader may see a sample being overwritten, which is fine for stats.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._slots = [None] * size
+        self._counter = itertools.count()
+
+    def append(self, sample):
+        self._slots[next(self._counter) % self.size] = sample
+
+    def samples(self):
+        return [sample for sample in list(self._slots) if sample is not None]
+
+def _percentile(values, q):
+    return values[min(int(q * len(values)), len(values) - 1)] if values else None
+
+class PerformanceMonitor:
+    """Rolling per-endpoint request timings (one ring buffer per endpoint)"""
+
+    def __init__(self, ring_size=512):
+        self.ring_size = ring_size
+        self._buffers = {}
+        self.started_at = time.time()
+
+    def record(self, endpoint, sample):
+        buffer = self._buffers.get(endpoint)
+        if buffer is None:
+            # setdefault atomik: dua request pertama tidak saling menimpa buffer
+            buffer = self._buffers.setdefault(endpoint, RingBuffer(self.ring_size))
+        buffer.append(sample)
+
+    def reset(self):
+        self._buffers = {}
+        self.started_at = time.time()
+
+    def summary(self):
+        """
+        Aggregate the samples of every endpoint.
+        Returns: list of dicts sorted by total p95, slowest first
+        """
+        rows = []
+        for endpoint, buffer in list(self._buffers.items()):
+            samples = buffer.samples()
+            if not samples:
+                continue
+            totals = sorted(s['total_ms'] for s in samples)
+            db_times = sorted(s['db_ms'] for s in samples)
+            slowest = max(samples, key=lambda s: s['slowest_ms'])
+            rows.append({
+                'endpoint': endpoint,
+                'count': len(samples),
+                'p50_ms': _percentile(totals, 0.50),
+                'p95_ms': _percentile(totals, 0.95),
+                'p99_ms': _percentile(totals, 0.99),
+                'db_p95_ms': _percentile(db_times, 0.95),
+                'avg_queries': sum(s['queries'] for s in samples) / len(samples),
+                'max_queries': max(s['queries'] for s in samples),
+                'avg_template_ms': sum(s['template_ms'] for s in samples) / len(samples),
+                'slowest_ms': slowest['slowest_ms'],
+                'slowest_sql': slowest['slowest_sql'],
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+
+# ==================== HOOKS ====================
+
+def _new_stats():
+    return {'queries': 0, 'db': 0.0, 'template': 0.0, 'slowest': 0.0, 'slowest_sql': None}
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('perf_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_request_context():
+        return
+    stats = g.get('perf')
+    if stats is None:
+        return
+    stats['queries'] += 1
+    stats['db'] += elapsed
+    if elapsed > stats['slowest']:
+        stats['slowest'] = elapsed
+        stats['slowest_sql'] = statement
+
+def _before_render(app, template, context, **extra):
+    if 'perf' in g:
+        g.perf_render_start = time.perf_counter()
+
+def _after_render(app, template, context, **extra):
+    start = g.pop('perf_render_start', None)
+    if start is not None:
+        g.perf['template'] += time.perf_counter() - start
+
+def _send_server_timing(mode):
+    """Jumlah query dan durasi DB tidak untuk sembarang klien: default mati"""
+    if mode == 'admin':
+        from flask_login import current_user
+        return current_user.is_authenticated and current_user.is_admin
+    return mode == '1'
+
+def init_performance(app):
+    """Per-request SQL/template timing, Server-Timing headers and rolling aggregates"""
+    if not app.config.get('PERF_MONITOR', True):
+        return None
+
+    monitor = PerformanceMonitor(app.config.get('PERF_RING_SIZE', 512))
+    app.extensions['performance'] = monitor
+
+    # Hook dipasang di engine app ini saja, bukan class Engine global
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_timer():
+        g.perf = _new_stats()
+        g.perf_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_timing(response):
+        stats = g.pop('perf', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - g.pop('perf_start')
+        if request.endpoint and request.endpoint != 'static':
+            monitor.record(request.endpoint, {
+                'total_ms': total * 1000,
+                'db_ms': stats['db'] * 1000,
+                'queries': stats['queries'],
+                'template_ms': stats['template'] * 1000,
+                'slowest_ms': stats['slowest'] * 1000,
+                'slowest_sql': stats['slowest_sql'],
+            })
+        if _send_server_timing(app.config.get('PERF_SERVER_TIMING', '0')):
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats["db"] * 1000:.2f};desc="{stats["queries"]} queries", '
+                f'tpl;dur={stats["template"] * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}'
+            )
+        return response
+
+    return monitor
@@ -0,0 +1,65 @@
+from app.models import Game, Order, OrderItem, UserLibrary
+from app.utils.slow_query_utils import explain_on
+from sqlalchemy import select, text, tuple_
+from datetime import datetime
+
+# (nama, index yang wajib dipakai, statement) untuk bentuk query yang paling sering jalan
+HOT_QUERIES = [
+    ('library ownership check (game_detail, add_to_cart, buy_now, download, verify_payment)',
+     'uq_user_library_user_game',
+     lambda: select(UserLibrary.id).where(UserLibrary.user_id == 1, UserLibrary.game_id == 1).limit(1)),
+    ('user library list',
+     'uq_user_library_user_game',
+     lambda: select(UserLibrary.id, UserLibrary.game_id).where(UserLibrary.user_id == 1)),
+    ('admin orders, first page',
+     'ix_order_created_at_id',
+     lambda: select(Order.id).order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+    ('admin orders, keyset page',
+     'ix_order_created_at_id',
+     lambda: select(Order.id).where(tuple_(Order.created_at, Order.id) < tuple_(datetime(2024, 1, 1), 'x'))
+     .order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+    ('admin orders by status',
+     'ix_order_status_created_at_id',
+     lambda: select(Order.id).where(Order.status == 'pending')
+     .order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+    ('profile recent orders',
+     'ix_order_user_created_at',
+     lambda: select(Order.id).where(Order.user_id == 1).order_by(Order.created_at.desc()).limit(5)),
+    ('order items of a page of orders',
+     'ix_order_item_order_id',
+     lambda: select(OrderItem.order_id, OrderItem.game_id).where(OrderItem.order_id.in_(['a', 'b', 'c']))),
+    ('paid quantity per game',
+     'ix_order_item_game_id',
+     lambda: select(OrderItem.quantity).where(OrderItem.game_id == 1)),
+    ('storefront category listing',
+     'ix_game_active_category_created_at',
+     lambda: select(Game.id).where(Game.is_active == True, Game.category == 'RPG')
+     .order_by(Game.created_at.desc())),
+    ('dashboard stock alerts',
+     'ix_game_stock',
+     lambda: select(Game.id).where(Game.stock > 0, Game.stock <= 10).order_by(Game.stock, Game.id).limit(3)),
+]
+
+def _driver_sql(connection, stmt):
+    compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return str(compiled), params
+
+def check_query_plans(connection):
+    """
+    EXPLAIN every hot query and check that its plan names the expected
+    index. On Postgres sequential scans are disabled for the check, so a
+    tiny table does not hide a missing index behind a cheap seq scan.
+    Returns: list of (name, index, passed, plan lines)
+    """
+    postgres = connection.dialect.name == 'postgresql'
+    if postgres:
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+    results = []
+    for name, index, build in HOT_QUERIES:
+        statement, params = _driver_sql(connection, build())
+        plan = explain_on(connection, statement, params)
+        results.append((name, index, any(index in line for line in plan), plan))
+    return results
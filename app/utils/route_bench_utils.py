@@ -0,0 +1,359 @@
+from app import db
+from app.models import Game, Order, OrderItem, PaymentMethod, User, UserLibrary
+from sqlalchemy import event, select, update
+from datetime import datetime
+import io
+import time
+import tracemalloc
+import uuid
+
+# Dua dataset sintetis tetap; route dengan constant=True harus memakai
+# jumlah query yang sama di keduanya (kategori, isi cart, library, batch bulk)
+TIERS = {
+    'small': {'users': 50, 'games': 40, 'orders': 200, 'categories': 3,
+              'cart_size': 1, 'library_size': 2, 'bulk_size': 2},
+    'large': {'users': 500, 'games': 400, 'orders': 5000, 'categories': 24,
+              'cart_size': 10, 'library_size': 30, 'bulk_size': 50},
+}
+BENCH_USER = ('route-bench@example.com', 'bench')
+BENCH_ADMIN = ('route-bench-admin@example.com', 'bench')
+PROOF_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d4944415478da63606060600000000500017aa857500000000049454e44ae426082'
+)
+
+class RouteCase:
+    """
+    One benchmarked request. url is formatted with the dataset fields
+    (plus whatever setup returns); setup runs before every call and is
+    not measured. max_queries is the budget for every warm call,
+    cold_queries the budget for a call with all in-process caches empty
+    (defaults to max_queries); constant=True means neither count may
+    change between the small and large dataset.
+    """
+
+    def __init__(self, name, url, method='GET', login=None, data=None, setup=None,
+                 expect=(200,), max_queries=None, cold_queries=None, constant=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.login = login
+        self.data = data
+        self.setup = setup
+        self.expect = expect
+        self.max_queries = max_queries
+        self.cold_queries = cold_queries if cold_queries is not None else max_queries
+        self.constant = constant
+
+# ==================== SETUP HELPERS ====================
+
+def _fill_cart(client, fields):
+    client.post('/clear-cart')
+    for game_id in fields['cart_games'][:fields['cart_size']]:
+        client.get(f'/add-to-cart/{game_id}')
+
+def _empty_cart(client, fields):
+    client.post('/clear-cart')
+
+def _pending_orders(count, fields):
+    """Insert count pending orders with cart_size items each; returns their ids"""
+    order_ids = [str(uuid.uuid4()) for _ in range(count)]
+    games = fields['cart_games'][:fields['cart_size']]
+    now = datetime.utcnow()
+    db.session.execute(Order.__table__.insert(), [{
+        'id': order_id, 'user_id': fields['buyer_id'], 'total_amount': 1000.0 * len(games),
+        'status': 'pending', 'payment_method': fields['payment_method'], 'created_at': now, 'updated_at': now,
+    } for order_id in order_ids])
+    db.session.execute(OrderItem.__table__.insert(), [{
+        'order_id': order_id, 'game_id': game_id, 'quantity': 1, 'price': 1000.0
+    } for order_id in order_ids for game_id in games])
+    db.session.commit()
+    return order_ids
+
+def _one_pending(client, fields):
+    return {'pending_order': _pending_orders(1, fields)[0]}
+
+def _bulk_pending(client, fields):
+    return {'pending_orders': _pending_orders(fields['bulk_size'], fields)}
+
+def _stored_blob(client, fields):
+    from app.utils.media_store import store_media
+    return {'media_key': store_media(io.BytesIO(PROOF_PNG), 'bench')['public_id']}
+
+# Budget = jumlah query per call dengan cache hangat / dengan semua cache kosong, pada kondisi repo saat ini
+ROUTE_CASES = [
+    # --- storefront
+    RouteCase('index', '/', max_queries=1, cold_queries=3, constant=True),
+    RouteCase('games', '/games', max_queries=1, cold_queries=3, constant=True),
+    RouteCase('category_games', '/category/{category}', max_queries=1, cold_queries=3, constant=True),
+    RouteCase('game_detail', '/game/{game_id}', login='user', max_queries=3, cold_queries=5, constant=True),
+    RouteCase('search_games', '/search?q={search}', max_queries=0, cold_queries=2, constant=True),
+    RouteCase('api_games', '/api/games', max_queries=1, cold_queries=2, constant=True),
+    RouteCase('payment_instructions', '/payment-instructions', max_queries=1, cold_queries=2, constant=True),
+    RouteCase('media_file', '/media/{media_key}', setup=_stored_blob, max_queries=0, constant=True),
+    # --- cart & checkout
+    RouteCase('add_to_cart', '/add-to-cart/{game_id}', login='user', setup=_empty_cart, expect=(302,),
+              max_queries=6, constant=True),
+    RouteCase('cart', '/cart', login='user', setup=_fill_cart, max_queries=3, cold_queries=4, constant=True),
+    RouteCase('update_cart', '/update-cart', method='POST', login='user', setup=_fill_cart, expect=(302,),
+              data=lambda fields: {'game_id': fields['cart_games'][0], 'action': 'decrease'},
+              max_queries=4, constant=True),
+    RouteCase('clear_cart', '/clear-cart', method='POST', login='user', expect=(302,), max_queries=2, constant=True),
+    RouteCase('api_cart_count', '/api/cart-count', login='user', max_queries=0, constant=True),
+    RouteCase('buy_now', '/buy-now/{game_id}', login='user', max_queries=4, cold_queries=5, constant=True),
+    RouteCase('checkout (form)', '/checkout', login='user', setup=_fill_cart,
+              max_queries=5, cold_queries=6, constant=True),
+    RouteCase('checkout (place order)', '/checkout', method='POST', login='user', setup=_fill_cart, expect=(302,),
+              data=lambda fields: {'payment_method': fields['payment_method'],
+                                   'proof_image': (io.BytesIO(PROOF_PNG), 'proof.png')},
+              max_queries=12, constant=True),
+    RouteCase('order_success', '/order/success/{order_id}', login='user', max_queries=3, cold_queries=4, constant=True),
+    RouteCase('api_order_status', '/api/order/{order_id}', login='user', max_queries=2, constant=True),
+    RouteCase('library', '/library', login='user', max_queries=2, cold_queries=3, constant=True),
+    RouteCase('download_game', '/download/{owned_game_id}', login='user', max_queries=7, cold_queries=8, constant=True),
+    # --- auth
+    RouteCase('login', '/login', max_queries=0, cold_queries=1),
+    RouteCase('register', '/register', max_queries=0, cold_queries=1),
+    RouteCase('profile', '/profile', login='user', max_queries=2, cold_queries=3, constant=True),
+    # --- admin
+    RouteCase('admin_dashboard', '/admin/', login='admin', max_queries=4, cold_queries=6, constant=True),
+    RouteCase('admin_orders', '/admin/orders', login='admin', max_queries=3, cold_queries=5, constant=True),
+    RouteCase('admin_orders (pending)', '/admin/orders?status=pending', login='admin',
+              max_queries=3, cold_queries=5, constant=True),
+    RouteCase('admin_search_orders', '/admin/orders/search?q=bench', login='admin',
+              max_queries=3, cold_queries=5, constant=True),
+    RouteCase('admin_order_detail', '/admin/order/{order_id}', login='admin',
+              max_queries=3, cold_queries=4, constant=True),
+    RouteCase('verify_payment', '/admin/verify-payment/{pending_order}', method='POST', login='admin',
+              setup=_one_pending, expect=(302,), data={'action': 'approve'},
+              max_queries=8, cold_queries=9, constant=True),
+    RouteCase('bulk_verify_payments', '/admin/orders/bulk-verify?format=json', method='POST', login='admin',
+              setup=_bulk_pending, data=lambda fields: {'action': 'approve', 'order_ids': fields['pending_orders']},
+              max_queries=8, constant=True),
+    RouteCase('admin_games', '/admin/games', login='admin', max_queries=2, cold_queries=4, constant=True),
+    RouteCase('admin_add_game', '/admin/game/new', login='admin', max_queries=1, cold_queries=2),
+    RouteCase('admin_edit_game', '/admin/game/{game_id}/edit', login='admin',
+              max_queries=2, cold_queries=3, constant=True),
+    RouteCase('admin_restock_game', '/admin/game/{game_id}/restock', method='POST', login='admin', expect=(302,),
+              data={'new_stock': 100000}, max_queries=5, cold_queries=6, constant=True),
+    RouteCase('admin_import_games', '/admin/games/import', login='admin', max_queries=1, cold_queries=2),
+    RouteCase('admin_payment_methods', '/admin/payment-methods', login='admin', max_queries=2, cold_queries=3),
+    RouteCase('admin_add_payment_method', '/admin/payment-method/new', login='admin', max_queries=1, cold_queries=2),
+    RouteCase('admin_edit_payment_method', '/admin/payment-method/{payment_method}/edit', login='admin',
+              max_queries=2, cold_queries=3),
+    RouteCase('admin_sales_report', '/admin/reports/sales', login='admin',
+              max_queries=6, cold_queries=7, constant=True),
+    RouteCase('admin_export', '/admin/export/orders?format=csv&start={today}', login='admin',
+              max_queries=2, constant=True),
+    RouteCase('admin_settings', '/admin/settings', login='admin', max_queries=1, cold_queries=2),
+    RouteCase('admin_performance', '/admin/performance', login='admin', max_queries=1, cold_queries=2),
+    RouteCase('admin_slow_queries', '/admin/slow-queries', login='admin', max_queries=1, cold_queries=2),
+]
+
+# Endpoint yang sengaja tidak diukur: mengubah sesi bench atau menghapus data dataset.
+# admin_users: template admin/users.html belum ada, view-nya selalu error
+SKIPPED_ENDPOINTS = {
+    'auth.logout', 'admin.admin_delete_game', 'admin.admin_delete_payment_method', 'admin.admin_delete_user',
+    'admin.admin_toggle_admin', 'admin.admin_performance_reset', 'admin.admin_users', 'static',
+}
+
+# ==================== DATASET ====================
+
+def build_dataset(tier, seed=42):
+    """
+    Seed the current app's database for one tier and add the bench
+    user/admin, a library for the user, and cart games with ample stock.
+    Returns: dict of the fields used to format the RouteCase urls
+    """
+    from werkzeug.security import generate_password_hash
+    from app.utils.category_utils import clear_category_cache
+    from app.utils.pagination_utils import clear_count_cache
+    from app.utils.seed_utils import seed_scale
+
+    config = TIERS[tier]
+    seed_scale(users=config['users'], games=config['games'], orders=config['orders'],
+               categories=config['categories'], seed=seed, echo=lambda *args: None)
+
+    users = []
+    for (email, password), is_admin in ((BENCH_USER, False), (BENCH_ADMIN, True)):
+        user = User(username=email.split('@')[0], email=email,
+                    password_hash=generate_password_hash(password), is_admin=is_admin)
+        db.session.add(user)
+        users.append(user)
+    db.session.flush()
+    buyer = users[0]
+
+    games = db.session.execute(
+        select(Game.id, Game.category).where(Game.is_active.is_(True)).order_by(Game.id)
+    ).all()
+    owned = [game_id for game_id, _ in games[:config['library_size']]]
+    cart_games = [game_id for game_id, _ in games[config['library_size']:config['library_size'] + config['cart_size']]]
+    db.session.execute(update(Game).where(Game.id.in_(cart_games)).values(stock=100000))
+    db.session.execute(UserLibrary.__table__.insert(), [{
+        'user_id': buyer.id, 'game_id': game_id, 'access_code': f'BENCH-{game_id}',
+        'purchased_at': datetime.utcnow(), 'download_count': 0,
+    } for game_id in owned])
+    payment_method = db.session.execute(select(PaymentMethod.id).order_by(PaymentMethod.id)).scalars().first()
+    db.session.commit()
+
+    fields = {
+        **config,
+        'buyer_id': buyer.id,
+        'game_id': cart_games[0],
+        'owned_game_id': owned[0],
+        'cart_games': cart_games,
+        'category': games[0][1],
+        'search': 'shadow',
+        'payment_method': str(payment_method),
+        'today': datetime.utcnow().date().isoformat(),
+    }
+    fields['order_id'] = _pending_orders(1, fields)[0]
+
+    # Cache modul dipakai bersama semua app di proses ini
+    clear_category_cache()
+    clear_count_cache()
+    return fields
+
+# ==================== MEASUREMENT ====================
+
+def clear_caches(app):
+    """Empty every in-process cache (facets, counts, catalog, typeahead) so the next call is a cache miss"""
+    from app.utils.category_utils import clear_category_cache
+    from app.utils.pagination_utils import clear_count_cache
+    clear_category_cache()
+    clear_count_cache()
+    app.extensions['catalog'].invalidate()
+    app.extensions['typeahead'].invalidate()
+
+def _login(app, credentials):
+    client = app.test_client()
+    if credentials:
+        email, password = credentials
+        response = client.post('/login', data={'email': email, 'password': password})
+        if response.status_code != 302:
+            raise RuntimeError(f'Bench login failed for {email}')
+    return client
+
+def _call(client, case, fields):
+    extra = case.setup(client, fields) if case.setup else None
+    values = {**fields, **(extra or {})}
+    data = case.data(values) if callable(case.data) else case.data
+    kwargs = {}
+    if data is not None:
+        if 'order_ids' in data:
+            kwargs['json'] = data
+        else:
+            kwargs['data'] = data
+    return case.url.format(**values), kwargs
+
+def _open(client, case, url, kwargs):
+    """Returns: the status code, or the exception name when the view raised"""
+    try:
+        response = client.open(url, method=case.method, **kwargs)
+        response.get_data()
+        return response.status_code
+    except Exception as e:
+        return type(e).__name__
+
+def run_route_benchmarks(app, fields, iterations=20, cases=None):
+    """
+    Run every case on the app's (already seeded) database: one cold call
+    with every cache emptied first, `iterations` warm calls for time and
+    SQL count, and one call under tracemalloc for allocated memory.
+    Cloudinary is faked for the run. 'queries' is the median of the warm
+    calls, 'max_queries' the worst one.
+    Returns: list of result dicts, one per case
+    """
+    from app.utils.cloudinary_utils import FakeCloudinary
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    clients = {None: _login(app, None), 'user': _login(app, BENCH_USER), 'admin': _login(app, BENCH_ADMIN)}
+
+    results = []
+    try:
+        with FakeCloudinary():
+            for case in cases or ROUTE_CASES:
+                client = clients[case.login]
+                times, queries, statuses = [], [], set()
+                cold = None
+                for n in range(iterations + 1):
+                    with app.app_context():
+                        url, kwargs = _call(client, case, fields)
+                    if n == 0:
+                        clear_caches(app)
+                    statements[0] = 0
+                    started = time.perf_counter()
+                    status = _open(client, case, url, kwargs)
+                    elapsed = time.perf_counter() - started
+                    statuses.add(status)
+                    if n == 0:
+                        cold = statements[0]
+                        continue
+                    times.append(elapsed)
+                    queries.append(statements[0])
+
+                with app.app_context():
+                    url, kwargs = _call(client, case, fields)
+                tracemalloc.start()
+                try:
+                    _open(client, case, url, kwargs)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+
+                times.sort()
+                queries.sort()
+                results.append({
+                    'name': case.name,
+                    'mean_ms': sum(times) / len(times) * 1000,
+                    'p50_ms': times[len(times) // 2] * 1000,
+                    'max_ms': times[-1] * 1000,
+                    'cold_queries': cold,
+                    'queries': queries[len(queries) // 2],
+                    'max_queries': max(queries),
+                    'alloc_kib': peak / 1024,
+                    'bad_status': sorted(str(status) for status in statuses if status not in case.expect),
+                })
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+def check_budgets(results_by_tier, cases=None):
+    """
+    Compare results with the declared budgets: the worst warm call
+    against max_queries, the cold call against cold_queries, and for
+    constant cases both counts across the datasets.
+    Returns: list of (case name, problem) for every violation
+    """
+    problems = []
+    for case in cases or ROUTE_CASES:
+        per_tier = {tier: next(r for r in results if r['name'] == case.name)
+                    for tier, results in results_by_tier.items()}
+        for tier, result in per_tier.items():
+            if result['bad_status']:
+                problems.append((case.name, f"{tier}: unexpected status {result['bad_status']}"))
+            if case.max_queries is not None and result['max_queries'] > case.max_queries:
+                problems.append((case.name, f"{tier}: {result['max_queries']} queries > budget {case.max_queries}"))
+            if case.cold_queries is not None and result['cold_queries'] > case.cold_queries:
+                problems.append((case.name, f"{tier}: {result['cold_queries']} cold queries "
+                                            f"> budget {case.cold_queries}"))
+        if not case.constant:
+            continue
+        for key, label in (('max_queries', 'query count'), ('cold_queries', 'cold query count')):
+            counts = {tier: result[key] for tier, result in per_tier.items()}
+            if len(set(counts.values())) > 1:
+                problems.append((case.name, f"{label} grows with the dataset: {counts}"))
+    return problems
+
+def uncovered_endpoints(app):
+    """Endpoints that neither have a RouteCase nor are deliberately skipped"""
+    covered = {case.name.split(' ')[0] for case in ROUTE_CASES}
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                  if rule.endpoint not in SKIPPED_ENDPOINTS and rule.endpoint.split('.')[-1] not in covered)
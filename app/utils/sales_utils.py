@@ -0,0 +1,192 @@
+from app import db
+from app.models import DailyGameSales, DailyPaymentSales, Game, Order, OrderItem, PaymentMethod
+from sqlalchemy import func
+from datetime import date, datetime, timedelta
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# ==================== INCREMENTAL MAINTENANCE ====================
+
+def _upsert(model, keys, rows):
+    """
+    Add values to the counters of rollup rows, creating them if needed.
+    rows: list of dicts with the key columns plus the counters to add.
+    Uses INSERT .. ON CONFLICT DO UPDATE (one executemany) on SQLite and
+    Postgres so concurrent approvals never lose an increment.
+    """
+    if not rows:
+        return
+    session = db.session
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        table = model.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: table.c[name] + stmt.excluded[name] for name in rows[0] if name not in keys}
+        )
+        session.execute(stmt, rows)
+        return
+
+    for values in rows:
+        row = session.get(model, tuple(values[key] for key in keys), with_for_update=True)
+        if row is None:
+            session.add(model(**values))
+        else:
+            for name, value in values.items():
+                if name not in keys:
+                    setattr(row, name, getattr(row, name) + value)
+
+def apply_orders_sales(orders, sign):
+    """
+    Add (sign=1) or remove (sign=-1) orders from the daily rollups.
+    Lines are merged per (day, game) and (day, payment method) first, so
+    a batch of orders costs two statements. Runs inside the caller's
+    transaction, so the rollup commits or rolls back together with the
+    status change.
+    """
+    per_game, per_payment = {}, {}
+    for order in orders:
+        day = (order.created_at or datetime.utcnow()).date()
+        games = set()
+        for item in order.items:
+            quantity = item.quantity or 1
+            row = per_game.setdefault((day, item.game_id), {'units': 0, 'revenue': 0.0, 'orders': 0})
+            row['units'] += quantity
+            row['revenue'] += item.price * quantity
+            if item.game_id not in games:
+                games.add(item.game_id)
+                row['orders'] += 1
+        row = per_payment.setdefault((day, order.payment_method or ''), {'orders': 0, 'revenue': 0.0})
+        row['orders'] += 1
+        row['revenue'] += order.total_amount
+
+    _upsert(DailyGameSales, ('day', 'game_id'), [
+        {'day': day, 'game_id': game_id, **{name: sign * value for name, value in row.items()}}
+        for (day, game_id), row in sorted(per_game.items())
+    ])
+    _upsert(DailyPaymentSales, ('day', 'payment_method'), [
+        {'day': day, 'payment_method': method, **{name: sign * value for name, value in row.items()}}
+        for (day, method), row in sorted(per_payment.items())
+    ])
+
+# ==================== BACKFILL ====================
+
+def _as_date(value):
+    # func.date() mengembalikan string di SQLite, date di Postgres
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def backfill_sales(start=None, end=None):
+    """
+    Rebuild the rollups from paid orders, for all days or [start, end].
+    Returns: (game rows, payment rows) written
+    """
+    day = func.date(Order.created_at)
+    paid = [Order.status == 'paid']
+    if start:
+        paid.append(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        paid.append(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    game_rows = db.session.query(
+        day, OrderItem.game_id,
+        func.sum(OrderItem.quantity),
+        func.sum(OrderItem.price * OrderItem.quantity),
+        func.count(func.distinct(Order.id))
+    ).join(Order, OrderItem.order_id == Order.id).filter(*paid).group_by(day, OrderItem.game_id).all()
+
+    payment_rows = db.session.query(
+        day, func.coalesce(Order.payment_method, ''),
+        func.count(Order.id),
+        func.sum(Order.total_amount)
+    ).filter(*paid).group_by(day, func.coalesce(Order.payment_method, '')).all()
+
+    for model in (DailyGameSales, DailyPaymentSales):
+        query = model.query
+        if start:
+            query = query.filter(model.day >= start)
+        if end:
+            query = query.filter(model.day <= end)
+        query.delete(synchronize_session=False)
+
+    if game_rows:
+        db.session.execute(DailyGameSales.__table__.insert(), [{
+            'day': _as_date(d), 'game_id': game_id, 'units': int(units or 0),
+            'revenue': float(revenue or 0), 'orders': int(orders)
+        } for d, game_id, units, revenue, orders in game_rows])
+    if payment_rows:
+        db.session.execute(DailyPaymentSales.__table__.insert(), [{
+            'day': _as_date(d), 'payment_method': method, 'orders': int(orders), 'revenue': float(revenue or 0)
+        } for d, method, orders, revenue in payment_rows])
+    db.session.commit()
+    return len(game_rows), len(payment_rows)
+
+# ==================== REPORT ====================
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def sales_report(start=None, end=None, granularity='day', top=10):
+    """
+    Sales figures for [start, end] read only from the rollup tables,
+    so the cost grows with the number of days, not orders.
+    Returns: dict with totals, series, top_games and payment_methods
+    """
+    def ranged(query, model):
+        if start:
+            query = query.filter(model.day >= start)
+        if end:
+            query = query.filter(model.day <= end)
+        return query
+
+    payment_days = ranged(db.session.query(
+        DailyPaymentSales.day, func.sum(DailyPaymentSales.orders), func.sum(DailyPaymentSales.revenue)
+    ), DailyPaymentSales).group_by(DailyPaymentSales.day).all()
+    unit_days = dict(ranged(db.session.query(
+        DailyGameSales.day, func.sum(DailyGameSales.units)
+    ), DailyGameSales).group_by(DailyGameSales.day).all())
+
+    series = {}
+    for day, orders, revenue in payment_days:
+        bucket = series.setdefault(bucket_start(day, granularity), {'orders': 0, 'revenue': 0.0, 'units': 0})
+        bucket['orders'] += int(orders or 0)
+        bucket['revenue'] += float(revenue or 0)
+        bucket['units'] += int(unit_days.get(day) or 0)
+
+    top_games = ranged(db.session.query(
+        DailyGameSales.game_id,
+        func.coalesce(Game.title, ''),
+        func.sum(DailyGameSales.units).label('units'),
+        func.sum(DailyGameSales.revenue).label('revenue')
+    ).outerjoin(Game, Game.id == DailyGameSales.game_id), DailyGameSales).group_by(
+        DailyGameSales.game_id, Game.title
+    ).having(func.sum(DailyGameSales.units) > 0).order_by(db.desc('revenue')).limit(top).all()
+
+    method_names = {str(pm.id): pm.name for pm in PaymentMethod.query.all()}
+    methods = ranged(db.session.query(
+        DailyPaymentSales.payment_method,
+        func.sum(DailyPaymentSales.orders),
+        func.sum(DailyPaymentSales.revenue).label('revenue')
+    ), DailyPaymentSales).group_by(DailyPaymentSales.payment_method).order_by(db.desc('revenue')).all()
+
+    return {
+        'total_sales': sum(b['revenue'] for b in series.values()),
+        'total_orders': sum(b['orders'] for b in series.values()),
+        'total_units': sum(b['units'] for b in series.values()),
+        'series': [{'period': period, **values} for period, values in sorted(series.items())],
+        'top_games': [{
+            'game_id': game_id, 'title': title or f'Game #{game_id}',
+            'total_sold': int(units or 0), 'revenue': float(revenue or 0)
+        } for game_id, title, units, revenue in top_games],
+        'payment_methods': [{
+            'name': method_names.get(method, method or '-'), 'orders': int(orders or 0), 'revenue': float(revenue or 0)
+        } for method, orders, revenue in methods],
+    }
@@ -0,0 +1,236 @@
+from app import db
+from app.models import Game
+from markupsafe import escape, Markup
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+import re
+import time
+
+SEARCH_TABLE = 'game_search'
+
+# Penanda highlight sementara (private use area) sebelum di-escape ke HTML
+HL_START, HL_END = '\ue000', '\ue001'
+
+# Setelah gagal membuat index, coba lagi paling cepat setelah sekian detik
+RETRY_SECONDS = 60
+
+_ready = {}
+_failed_at = {}
+
+def _dialect(connection):
+    return connection.dialect.name
+
+def _table_exists(connection):
+    if _dialect(connection) == 'sqlite':
+        return connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': SEARCH_TABLE}).first() is not None
+    return connection.execute(text("SELECT to_regclass(:name)"), {'name': SEARCH_TABLE}).scalar() is not None
+
+def _index_rows(connection, game_ids=None):
+    """
+    (Re)build index rows from the game table, for all games or the given ids.
+    Only active games are indexed, so searches never need to join game
+    just to filter on is_active.
+    """
+    params = {}
+    where = 'WHERE is_active'
+    if game_ids is not None:
+        ids = sorted(game_ids)
+        where += ' AND id IN (' + ', '.join(f':id{i}' for i in range(len(ids))) + ')'
+        params = {f'id{i}': game_id for i, game_id in enumerate(ids)}
+
+    id_list = ', '.join(':' + key for key in params) or 'NULL'
+    if _dialect(connection) == 'sqlite':
+        if game_ids is not None:
+            connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({id_list})"), params)
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, category, short_description, description) "
+            f"SELECT id, title, category, short_description, description FROM game {where}"), params)
+    else:
+        if game_ids is not None:
+            connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE game_id IN ({id_list})"), params)
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (game_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(short_description, '')), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'D') "
+            f"FROM game {where}"), params)
+
+def _has_search_table(connection):
+    """True when the index table exists (only positive answers are cached)"""
+    key = str(connection.engine.url)
+    if _ready.get(key):
+        return True
+    if _dialect(connection) not in ('sqlite', 'postgresql'):
+        return False
+    if _table_exists(connection):
+        _ready[key] = True
+        return True
+    return False
+
+def ensure_search_index(engine):
+    """
+    Create the FTS5 table (SQLite) or tsvector table + GIN index
+    (Postgres) on first use and fill it from the game table.
+    Uses its own transaction so the index survives the request. A failed
+    attempt (lock timeout, missing privilege) is retried after RETRY_SECONDS.
+    Returns: False when full-text search is not available
+    """
+    key = str(engine.url)
+    if _ready.get(key):
+        return True
+    dialect = engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return False
+    if key in _failed_at and time.monotonic() - _failed_at[key] < RETRY_SECONDS:
+        return False
+
+    try:
+        with engine.begin() as connection:
+            if not _table_exists(connection):
+                if dialect == 'sqlite':
+                    connection.execute(text(
+                        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                        "title, category, short_description, description, "
+                        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"))
+                else:
+                    connection.execute(text(
+                        f"CREATE TABLE {SEARCH_TABLE} ("
+                        "game_id INTEGER PRIMARY KEY REFERENCES game (id) ON DELETE CASCADE, "
+                        "document TSVECTOR NOT NULL)"))
+                    connection.execute(text(
+                        f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"))
+                _index_rows(connection)
+    except Exception as e:
+        print(f"❌ Full-text search unavailable, falling back to ILIKE: {e}")
+        _failed_at[key] = time.monotonic()
+        return False
+    _ready[key] = True
+    _failed_at.pop(key, None)
+    return True
+
+def rebuild_search_index():
+    """Drop and refill every row of the search index"""
+    if not ensure_search_index(db.engine):
+        return False
+    with db.engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        _index_rows(connection)
+    return True
+
+# Kolom yang boleh dipakai untuk membatasi pencarian, dengan label bobot Postgres
+COLUMN_WEIGHTS = {'title': 'A', 'category': 'B', 'short_description': 'C', 'description': 'D'}
+
+def _fts5_query(terms, columns=None):
+    query = ' '.join(f'"{term}"*' for term in terms)
+    if columns:
+        return '{' + ' '.join(columns) + '} : (' + query + ')'
+    return query
+
+def _tsquery(terms, columns=None):
+    weights = ''.join(COLUMN_WEIGHTS[column] for column in columns) if columns else ''
+    return ' & '.join(f'{term}:*{weights}' for term in terms)
+
+def _highlight(snippet):
+    """Escape snippet text and turn markers into <mark> tags"""
+    return Markup(str(escape(snippet or '')).replace(HL_START, '<mark>').replace(HL_END, '</mark>'))
+
+def search_game_index(query, limit=20, columns=None, snippets=True):
+    """
+    Ranked full-text search over active games.
+    Every word is prefix-matched, so it works for typeahead; pass
+    columns=('title', 'category') to keep typeahead on short fields and
+    snippets=False when only the ranked ids are needed.
+    Returns: list of dicts with 'id', 'rank' and 'snippet' (safe HTML)
+    """
+    terms = [term.lower() for term in re.findall(r'\w+', query or '')]
+    if not terms:
+        return []
+
+    if not ensure_search_index(db.engine):
+        return _ilike_search(query, limit, columns)
+    connection = db.session.connection()
+
+    limit_sql = 'LIMIT :limit' if limit else ''
+    if _dialect(connection) == 'sqlite':
+        match = _fts5_query(terms, columns)
+        ranked = connection.execute(text(
+            f"SELECT rowid AS id, bm25({SEARCH_TABLE}, 10.0, 4.0, 2.0, 1.0) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query ORDER BY rank {limit_sql}"),
+            {'query': match, 'limit': limit}).all()
+        if not ranked or not snippets:
+            return [{'id': row.id, 'rank': float(row.rank), 'snippet': None} for row in ranked]
+
+        # Snippet hanya dihitung untuk baris yang ditampilkan
+        params = {f'id{i}': row.id for i, row in enumerate(ranked)}
+        snippets = dict(connection.execute(text(
+            f"SELECT rowid, snippet({SEARCH_TABLE}, -1, :hl_start, :hl_end, '…', 12) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query "
+            f"AND rowid IN ({', '.join(':' + key for key in params)})"),
+            {'query': match, 'hl_start': HL_START, 'hl_end': HL_END, **params}).all())
+        return [{'id': row.id, 'rank': float(row.rank), 'snippet': _highlight(snippets.get(row.id))}
+                for row in ranked]
+    else:
+        tsquery = _tsquery(terms, columns)
+        if not snippets:
+            ranked = connection.execute(text(
+                "SELECT s.game_id AS id, ts_rank(s.document, q) AS rank "
+                f"FROM {SEARCH_TABLE} s, to_tsquery('simple', :query) q "
+                f"WHERE s.document @@ q ORDER BY rank DESC {limit_sql}"),
+                {'query': tsquery, 'limit': limit}).all()
+            return [{'id': row.id, 'rank': float(row.rank), 'snippet': None} for row in ranked]
+
+        # Headline hanya dihitung untuk baris hasil LIMIT
+        rows = connection.execute(text(
+            "SELECT game.id, ranked.rank, "
+            "ts_headline('simple', coalesce(game.title, '') || ' - ' || coalesce(game.short_description, ''), "
+            "ranked.q, 'StartSel=' || :hl_start || ', StopSel=' || :hl_end || ', MaxWords=20, MinWords=5') AS snippet "
+            "FROM (SELECT s.game_id, ts_rank(s.document, q) AS rank, q "
+            f"FROM {SEARCH_TABLE} s, to_tsquery('simple', :query) q "
+            f"WHERE s.document @@ q ORDER BY rank DESC {limit_sql}) ranked "
+            "JOIN game ON game.id = ranked.game_id ORDER BY ranked.rank DESC"),
+            {'query': tsquery, 'limit': limit, 'hl_start': HL_START, 'hl_end': HL_END}).all()
+
+    return [{'id': row.id, 'rank': float(row.rank), 'snippet': _highlight(row.snippet)} for row in rows]
+
+def _ilike_search(query, limit, columns):
+    """Fallback lama untuk database tanpa full-text search"""
+    pattern = f'%{query}%'
+    q = Game.query.with_entities(Game.id, Game.title).filter(
+        db.or_(*[getattr(Game, column).ilike(pattern) for column in (columns or COLUMN_WEIGHTS)]),
+        Game.is_active == True
+    )
+    if limit:
+        q = q.limit(limit)
+    return [{'id': game_id, 'rank': 0.0, 'snippet': escape(title)} for game_id, title in q.all()]
+
+# ==================== SYNC ====================
+
+def _sync_after_flush(session, flush_context):
+    """Update index rows for games written in this flush, in the same transaction"""
+    game_ids = {obj.id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+                if isinstance(obj, Game) and obj.id is not None}
+    if not game_ids:
+        return
+    connection = session.connection()
+    # Kalau tabel index belum ada, nanti dibangun penuh dari tabel game
+    if _has_search_table(connection):
+        _index_rows(connection, game_ids)
+
+def sync_search_index(game_ids, chunk_size=500):
+    """
+    Refresh index rows for games written with bulk Core statements, which
+    bypass the after_flush hook. Runs in the current transaction.
+    """
+    connection = db.session.connection()
+    if not game_ids or not _has_search_table(connection):
+        return
+    ids = sorted(game_ids)
+    for start in range(0, len(ids), chunk_size):
+        _index_rows(connection, ids[start:start + chunk_size])
+
+def init_search(app):
+    if not event.contains(Session, 'after_flush', _sync_after_flush):
+        event.listen(Session, 'after_flush', _sync_after_flush)
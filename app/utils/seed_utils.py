@@ -0,0 +1,242 @@
+from app import db
+from app.models import Game, Order, OrderItem, PaymentMethod, User, UserLibrary
+from flask import current_app
+from sqlalchemy import String, case, cast, func, insert, literal, select
+from datetime import datetime, timedelta
+from itertools import accumulate
+import random
+import time
+import uuid
+
+CATEGORY_NAMES = ['Action', 'Adventure', 'RPG', 'Strategy', 'Racing', 'Sports', 'Simulation', 'Puzzle',
+                  'Horror', 'Shooter', 'Fighting', 'Platformer', 'Survival', 'Sandbox', 'MOBA', 'Rhythm']
+TITLE_WORDS = (['Shadow', 'Crystal', 'Iron', 'Neon', 'Lost', 'Eternal', 'Silent', 'Crimson', 'Star', 'Wild'],
+               ['Quest', 'Legends', 'Racer', 'Kingdom', 'Protocol', 'Frontier', 'Odyssey', 'Arena', 'Tactics', 'Drift'])
+# Campuran status dan jumlah item per order, kira-kira seperti produksi
+STATUS_WEIGHTS = {'paid': 70, 'cancelled': 20, 'pending': 10}
+ITEM_COUNT_WEIGHTS = {1: 60, 2: 25, 3: 10, 4: 5}
+START = datetime(2023, 1, 1)
+SEED_PASSWORD = 'password'
+ORDER_COLUMNS = ('id', 'user_id', 'total_amount', 'status', 'payment_method', 'created_at', 'updated_at')
+ITEM_COLUMNS = ('order_id', 'game_id', 'quantity', 'price')
+
+def _category_names(count):
+    names = CATEGORY_NAMES[:count]
+    names += [f'Category {n}' for n in range(len(names) + 1, count + 1)]
+    return names
+
+def _insert(model, rows, returning=None):
+    """executemany INSERT; with returning, the new ids in row order"""
+    if not rows:
+        return []
+    if returning is None:
+        db.session.execute(model.__table__.insert(), rows)
+        return []
+    return db.session.execute(insert(model).returning(returning, sort_by_parameter_order=True), rows).scalars().all()
+
+def _insert_tuples(table, columns, rows):
+    """
+    executemany INSERT of plain tuples. On SQLite the statement goes straight
+    to the driver: per-row bind processing in SQLAlchemy costs more than the
+    insert itself at this volume. Other dialects use Core (insertmanyvalues).
+    """
+    if not rows:
+        return
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+        return
+    quote = connection.dialect.identifier_preparer
+    sql = (f"INSERT INTO {quote.format_table(table)} ({', '.join(quote.quote(name) for name in columns)}) "
+           f"VALUES ({', '.join('?' * len(columns))})")
+    connection.exec_driver_sql(sql, rows)
+
+def _drop_indexes(tables):
+    """
+    Drop the secondary indexes of the bulk-loaded tables; building them
+    once at the end is several times cheaper than updating them per row.
+    Returns: the dropped Index objects, for _create_indexes()
+    """
+    connection = db.session.connection()
+    inspector = db.inspect(connection)
+    dropped = []
+    for table in tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                index.drop(bind=connection)
+                dropped.append(index)
+    return dropped
+
+def _create_indexes(indexes):
+    connection = db.session.connection()
+    for index in indexes:
+        index.create(bind=connection)
+
+def seed_scale(users=1000, games=500, orders=100000, categories=12, days=730, seed=42,
+               batch_size=20000, echo=print):
+    """
+    Append a deterministic synthetic dataset: users, games across
+    categories, orders with a realistic status mix and item counts, the
+    library grants of every paid order, and the sales rollups.
+    Everything is produced from random.Random(seed) with fixed
+    timestamps, so the same arguments always produce the same rows; only
+    pending orders are dated relative to now, inside
+    PENDING_ORDER_TTL_MINUTES, so the expiry sweeper leaves them alone.
+    Rows go in through Core executemany INSERTs, batch_size per statement.
+    Returns: dict with row counts and seconds per phase
+    """
+    from werkzeug.security import generate_password_hash
+    from app.utils.sales_utils import backfill_sales
+    from app.utils.search_utils import rebuild_search_index
+
+    rng = random.Random(seed)
+    timings = {}
+    tag = f's{seed}'
+
+    def phase(name, started):
+        timings[name] = time.perf_counter() - started
+        echo(f"  {name:<10} {timings[name]:6.1f}s")
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # Hanya untuk koneksi seeding ini: data sintetis, aman tanpa fsync
+        db.session.execute(db.text('PRAGMA synchronous = OFF'))
+        # Primary key order berupa uuid acak: cache besar supaya B-tree tidak bolak-balik ke disk
+        db.session.execute(db.text('PRAGMA cache_size = -262144'))
+
+    # --- payment methods
+    methods = [str(pm_id) for pm_id in db.session.execute(select(PaymentMethod.id).order_by(PaymentMethod.id)).scalars()]
+    if not methods:
+        _insert(PaymentMethod, [
+            {'name': 'BCA Transfer', 'type': 'bank_transfer', 'account_number': '1234567890', 'account_name': 'GAME STORE'},
+            {'name': 'Gopay', 'type': 'ewallet', 'account_number': '081234567890', 'account_name': 'GAME STORE'},
+            {'name': 'QRIS', 'type': 'qris', 'account_number': '-', 'account_name': 'GAME STORE'},
+        ])
+        methods = [str(pm_id) for pm_id in db.session.execute(select(PaymentMethod.id).order_by(PaymentMethod.id)).scalars()]
+
+    # --- users (satu hash dipakai bersama; hashing per user terlalu lambat)
+    started = time.perf_counter()
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    user_ids = []
+    for start in range(0, users, batch_size):
+        user_ids += _insert(User, [{
+            'username': f'{tag}_user{n}', 'email': f'{tag}_user{n}@example.com',
+            'password_hash': password_hash, 'is_admin': False, 'created_at': START + timedelta(minutes=n),
+        } for n in range(start, min(start + batch_size, users))], returning=User.id)
+    phase('users', started)
+
+    # --- games
+    started = time.perf_counter()
+    names = _category_names(categories)
+    game_rows = []
+    for n in range(games):
+        price = float(rng.choice([0, 5, 10, 15, 20, 30, 40, 60]) * 1000 + 9000)
+        stock = rng.choice([0, rng.randint(1, 10), rng.randint(10, 500), rng.randint(10, 500)])
+        share = 'account' if rng.random() < 0.2 else 'cloud_code'
+        title = f'{rng.choice(TITLE_WORDS[0])} {rng.choice(TITLE_WORDS[1])} {n + 1}'
+        game_rows.append({
+            'title': title, 'category': names[n % len(names)],
+            'short_description': f'{title} - synthetic game for scale testing',
+            'description': f'{title} is a synthetic {names[n % len(names)]} game generated by seed {seed}.',
+            'price': price, 'stock': stock, 'initial_stock': stock + rng.randint(0, 200),
+            'share_method': share, 'cloud_code': None,
+            'account_email': f'{tag}_game{n}@example.com' if share == 'account' else None,
+            'account_password': 'synthetic' if share == 'account' else None,
+            'image_url': None, 'is_active': rng.random() < 0.95,
+            'created_at': START + timedelta(days=days * n / max(games, 1)),
+        })
+    game_ids = []
+    for start in range(0, games, batch_size):
+        game_ids += _insert(Game, game_rows[start:start + batch_size], returning=Game.id)
+    prices = {game_id: row['price'] for game_id, row in zip(game_ids, game_rows)}
+    del game_rows
+    phase('games', started)
+
+    # --- orders + items; popularitas game mengikuti distribusi Zipf
+    started = time.perf_counter()
+    game_weights = list(accumulate(1.0 / (rank + 1) for rank in range(games)))
+    popularity = list(game_ids)
+    rng.shuffle(popularity)
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+    status_cum = list(accumulate(status_weights))
+    item_counts, item_weights = zip(*ITEM_COUNT_WEIGHTS.items())
+    item_cum = list(accumulate(item_weights))
+    step = days * 86400.0 / max(orders, 1)
+    # Order pending dibuat baru-baru ini (90% dari TTL), supaya sweeper tidak langsung
+    # membatalkannya dan mengembalikan stok yang tidak pernah direservasi seed
+    pending_window = max(current_app.config['PENDING_ORDER_TTL_MINUTES'], 1) * 0.9
+    pending_since = datetime.utcnow() - timedelta(minutes=pending_window)
+    pending_rng = random.Random(seed + 1)
+    item_total = 0
+    # SQLite menyimpan DATETIME sebagai teks; formatnya sama dengan yang ditulis SQLAlchemy
+    sqlite = db.session.get_bind().dialect.name == 'sqlite'
+    stamp = (lambda value: value.isoformat(' ', 'microseconds')) if sqlite else (lambda value: value)
+
+    # Index sekunder dibangun sekali di akhir, bukan per baris
+    dropped = _drop_indexes([Order.__table__, OrderItem.__table__, UserLibrary.__table__])
+    db.session.commit()
+    try:
+        for start in range(0, orders, batch_size):
+            order_rows, item_rows = [], []
+            for n in range(start, min(start + batch_size, orders)):
+                order_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                created = START + timedelta(seconds=n * step + rng.random() * step)
+                count = rng.choices(item_counts, cum_weights=item_cum)[0]
+                chosen = set(rng.choices(popularity, cum_weights=game_weights, k=count))
+                total = 0.0
+                for game_id in chosen:
+                    quantity = 1 if rng.random() < 0.9 else 2
+                    price = prices[game_id]
+                    total += price * quantity
+                    item_rows.append((order_id, game_id, quantity, price))
+                user_id = rng.choice(user_ids)
+                status = rng.choices(statuses, cum_weights=status_cum)[0]
+                method = rng.choice(methods)
+                updated = created + timedelta(hours=rng.randint(0, 48))
+                if status == 'pending':
+                    created = updated = pending_since + timedelta(minutes=pending_rng.random() * pending_window)
+                order_rows.append((order_id, user_id, total, status, method, stamp(created), stamp(updated)))
+            _insert_tuples(Order.__table__, ORDER_COLUMNS, order_rows)
+            _insert_tuples(OrderItem.__table__, ITEM_COLUMNS, item_rows)
+            item_total += len(item_rows)
+        phase('orders', started)
+
+        # Index order/order_item dulu: query library di bawah join lewat order_id
+        started = time.perf_counter()
+        _create_indexes([index for index in dropped if index.table is not UserLibrary.__table__])
+        dropped = [index for index in dropped if index.table is UserLibrary.__table__]
+        phase('indexes', started)
+
+        # --- library: satu baris per (user, game) dari order paid, set-based di database
+        started = time.perf_counter()
+        access_code = case(
+            (Game.share_method == 'cloud_code',
+             literal('SEED-') + cast(Order.user_id, String) + literal('-') + cast(OrderItem.game_id, String)),
+            else_=None
+        )
+        grants = select(
+            Order.user_id, OrderItem.game_id, func.min(Order.created_at), literal(0),
+            func.max(access_code), func.max(Game.account_email), func.max(Game.account_password)
+        ).join(Order, Order.id == OrderItem.order_id).join(Game, Game.id == OrderItem.game_id).where(
+            Order.status == 'paid', Order.user_id >= min(user_ids), OrderItem.game_id >= min(game_ids)
+        ).group_by(Order.user_id, OrderItem.game_id)
+        library = db.session.execute(insert(UserLibrary).from_select(
+            ['user_id', 'game_id', 'purchased_at', 'download_count', 'access_code', 'account_email', 'account_password'],
+            grants
+        )).rowcount
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        # Juga saat gagal: drop index sudah di-commit, jadi index harus dibangun lagi
+        _create_indexes(dropped)
+        db.session.commit()
+    phase('library', started)
+
+    started = time.perf_counter()
+    backfill_sales()
+    rebuild_search_index()
+    phase('rollups', started)
+
+    return {'users': users, 'games': games, 'orders': orders, 'order_items': item_total,
+            'library': library, 'timings': timings}
@@ -0,0 +1,236 @@
+from flask import has_request_context, request
+from sqlalchemy import event
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+# ==================== NORMALIZATION ====================
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+def normalize_sql(statement):
+    """Literals and placeholders -> ?, IN lists collapsed, whitespace squashed"""
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _VALUES_LIST.sub(r'\1, ...', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def _compress(types):
+    """['int', 'int', 'int', 'str'] -> 'int x3, str'"""
+    runs = []
+    for name in types:
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ', '.join(name if n == 1 else f'{name} x{n}' for name, n in runs)
+
+def bind_shape(parameters, executemany=False):
+    """Types of the bound values, never the values themselves"""
+    if executemany and parameters:
+        return f'{len(parameters)} rows of ({bind_shape(parameters[0])})'
+    if isinstance(parameters, dict):
+        return ', '.join(f'{key}:{type(value).__name__}' for key, value in parameters.items())
+    if isinstance(parameters, (list, tuple)):
+        return _compress([type(value).__name__ for value in parameters])
+    return ''
+
+# ==================== RECORDER ====================
+
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+class SlowQueryLog:
+    """
+    Records statements slower than threshold_ms to an append-only JSON
+    lines file. The first time a fingerprint is seen in this process its
+    plan is captured on a background thread with its own connection, so
+    the request that hit the slow query never waits for EXPLAIN.
+    """
+
+    def __init__(self, engine, path, threshold_ms=100, explain=True, max_bytes=5 * 1024 * 1024):
+        self.engine = engine
+        self.path = path
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self.max_bytes = max_bytes
+        self._seen = set()
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('slow_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < self.threshold or conn.info.get('slow_query_explain'):
+            return
+
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        entry = {
+            'fingerprint': key,
+            'sql': normalized,
+            'bind_shape': bind_shape(parameters, executemany),
+            'route': request.endpoint if has_request_context() else None,
+            'duration_ms': round(elapsed * 1000, 3),
+            'at': time.time(),
+        }
+        explain = None
+        if self.explain and key not in self._seen and not executemany:
+            self._seen.add(key)
+            explain = (statement, parameters)
+        self._submit(entry, explain)
+
+    def _submit(self, entry, explain):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait((entry, explain))
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            entry, explain = self._queue.get()
+            try:
+                if explain is not None:
+                    plan = explain_statement(self.engine, *explain)
+                    if plan is not None:
+                        self._write({'fingerprint': entry['fingerprint'], 'plan': plan, 'at': time.time()})
+                self._write(entry)
+            except Exception as e:
+                print(f"❌ Slow query log error: {e}")
+
+    def _write(self, record):
+        data = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        try:
+            if os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except FileNotFoundError:
+            pass
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def flush(self, timeout=5.0):
+        """Wait until queued records are written (CLI and benchmarks)"""
+        deadline = time.time() + timeout
+        while not self._queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+def explain_statement(engine, statement, parameters):
+    """
+    Plan for one statement on a separate connection.
+    EXPLAIN QUERY PLAN on SQLite, plain EXPLAIN (no ANALYZE) on Postgres,
+    so the statement itself is never executed.
+    Returns: list of plan lines, or None when the statement cannot be explained
+    """
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    with engine.connect() as connection:
+        connection.info['slow_query_explain'] = True
+        try:
+            return explain_on(connection, statement, parameters)
+        finally:
+            connection.rollback()
+            connection.info.pop('slow_query_explain', None)
+
+def explain_on(connection, statement, parameters):
+    """EXPLAIN a DBAPI-level statement on an open connection, as plan lines"""
+    sqlite = connection.dialect.name == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN '
+    rows = connection.exec_driver_sql(prefix + statement, parameters or ()).all()
+    if sqlite:
+        # (id, parent, notused, detail): indentasi mengikuti parent
+        depth = {0: -1}
+        lines = []
+        for row in rows:
+            depth[row[0]] = depth.get(row[1], -1) + 1
+            lines.append('  ' * depth[row[0]] + row[3])
+        return lines
+    return [row[0] for row in rows]
+
+# ==================== REPORTING ====================
+
+def load_offenders(path, limit=20):
+    """
+    Aggregate the log file(s) by fingerprint.
+    Returns: list of dicts sorted by total time, worst first
+    """
+    stats, plans = {}, {}
+    for name in (path + '.1', path):
+        try:
+            with open(name, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            key = record.get('fingerprint')
+            if 'plan' in record:
+                plans[key] = record['plan']
+                continue
+            item = stats.setdefault(key, {
+                'fingerprint': key, 'sql': record['sql'], 'bind_shape': record['bind_shape'],
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': {}, 'last_seen': 0
+            })
+            item['count'] += 1
+            item['total_ms'] += record['duration_ms']
+            item['max_ms'] = max(item['max_ms'], record['duration_ms'])
+            route = record.get('route') or '(no request)'
+            item['routes'][route] = item['routes'].get(route, 0) + 1
+            item['last_seen'] = max(item['last_seen'], record['at'])
+
+    offenders = sorted(stats.values(), key=lambda item: item['total_ms'], reverse=True)[:limit]
+    for item in offenders:
+        item['avg_ms'] = item['total_ms'] / item['count']
+        item['plan'] = plans.get(item['fingerprint'])
+        item['routes'] = sorted(item['routes'].items(), key=lambda pair: pair[1], reverse=True)
+    return offenders
+
+def slow_query_log_path(app):
+    return app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+
+def init_slow_query_log(app):
+    """Attach the recorder to this app's engine; SLOW_QUERY_MS < 0 disables it"""
+    from app import db
+
+    threshold = app.config.get('SLOW_QUERY_MS', 100)
+    if threshold is None or threshold < 0:
+        return None
+    with app.app_context():
+        engine = db.engine
+    log = SlowQueryLog(engine, slow_query_log_path(app), threshold_ms=threshold,
+                       explain=app.config.get('SLOW_QUERY_EXPLAIN', True))
+    event.listen(engine, 'before_cursor_execute', log.before_execute)
+    event.listen(engine, 'after_cursor_execute', log.after_execute)
+    app.extensions['slow_query_log'] = log
+    return log
@@ -0,0 +1,115 @@
+from app import db
+from app.models import Game
+from sqlalchemy import case, update, select
+
+def _merge_lines(lines):
+    """
+    Collapse (game_id, quantity) pairs into one quantity per game,
+    ordered by game_id so every transaction locks rows in the same order
+    """
+    merged = {}
+    for game_id, quantity in lines:
+        merged[int(game_id)] = merged.get(int(game_id), 0) + int(quantity)
+    return sorted(merged.items())
+
+def _adjust_stock(game_id, delta, require_available=False):
+    """
+    Run a single conditional UPDATE on game.stock
+    Returns: True if the row was updated
+    """
+    stmt = update(Game).where(Game.id == game_id).values(stock=Game.stock + delta)
+    if require_available:
+        stmt = stmt.where(Game.is_active == True, Game.stock >= -delta)
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+def _claim_each(merged):
+    """Per-row reservation: one conditional UPDATE per game, in game_id order"""
+    claimed = []
+    failed_ids = []
+    for game_id, quantity in merged:
+        if _adjust_stock(game_id, -quantity, require_available=True):
+            claimed.append((game_id, quantity))
+        else:
+            failed_ids.append(game_id)
+    return claimed, failed_ids
+
+def _claim_all(merged):
+    """
+    Set-based reservation: one UPDATE .. CASE for the whole cart, the
+    stock check evaluated per row. RETURNING tells which games were claimed.
+    """
+    quantities = dict(merged)
+    needed = case(quantities, value=Game.id, else_=0)
+    stmt = update(Game).where(
+        Game.id.in_(list(quantities)),
+        Game.is_active == True,
+        Game.stock >= needed
+    ).values(stock=Game.stock - needed).returning(Game.id)
+    claimed_ids = set(db.session.execute(stmt.execution_options(synchronize_session=False)).scalars())
+    claimed = [(game_id, quantity) for game_id, quantity in merged if game_id in claimed_ids]
+    failed_ids = [game_id for game_id, _ in merged if game_id not in claimed_ids]
+    return claimed, failed_ids
+
+def reserve_stock(lines):
+    """
+    Claim stock for a whole cart inside the current transaction.
+    Every game is decremented only WHERE stock >= quantity, so concurrent
+    workers can never drive stock below zero. With UPDATE .. RETURNING the
+    whole cart is one statement, otherwise one UPDATE per game.
+    If any line fails, lines already claimed are released again and the
+    caller should not create the order.
+    Returns: dict with 'success' and 'failed' (game_id, requested, available, title)
+    """
+    merged = [(game_id, quantity) for game_id, quantity in _merge_lines(lines) if quantity > 0]
+    if not merged:
+        return {'success': True, 'failed': []}
+
+    if len(merged) > 1 and db.engine.dialect.update_returning:
+        claimed, failed_ids = _claim_all(merged)
+    else:
+        claimed, failed_ids = _claim_each(merged)
+
+    if not failed_ids:
+        return {'success': True, 'failed': []}
+
+    # Lepaskan stok yang sudah sempat diambil
+    release_stock(claimed)
+
+    requested = dict(merged)
+    rows = db.session.execute(
+        select(Game.id, Game.title, Game.stock, Game.is_active).where(Game.id.in_(failed_ids))
+    ).all()
+    found = {row.id: row for row in rows}
+
+    failed = []
+    for game_id in failed_ids:
+        row = found.get(game_id)
+        failed.append({
+            'game_id': game_id,
+            'title': row.title if row else None,
+            'requested': requested[game_id],
+            'available': max(row.stock or 0, 0) if row and row.is_active else 0
+        })
+    return {'success': False, 'failed': failed}
+
+def release_stock(lines):
+    """
+    Return stock for (game_id, quantity) pairs, e.g. for a rejected or
+    expired order. One set-based UPDATE .. CASE for all games, inside the
+    current transaction.
+    """
+    deltas = {game_id: quantity for game_id, quantity in _merge_lines(lines) if quantity > 0}
+    if not deltas:
+        return
+    stmt = update(Game).where(Game.id.in_(list(deltas))).values(
+        stock=Game.stock + case(deltas, value=Game.id, else_=0)
+    )
+    db.session.execute(stmt.execution_options(synchronize_session=False))
+
+def format_stock_failures(failed):
+    """Human readable summary of failed reservation lines for flash messages"""
+    return ", ".join(
+        f"{item['title'] or 'Unknown game'} (Available: {item['available']})"
+        for item in failed
+    )
@@ -0,0 +1,314 @@
+from flask import current_app
+from collections import OrderedDict
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+_WORD = re.compile(r'\w+')
+
+def tokenize(text):
+    return [word.lower() for word in _WORD.findall(text or '')]
+
+def _trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _max_typos(term):
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 6 else 2
+
+def edit_distance(a, b, limit):
+    """
+    Damerau-Levenshtein (optimal string alignment) distance with early
+    exit, so a swapped pair of letters counts as one typo.
+    Returns: limit + 1 when the distance is above limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+            best = min(best, cost)
+        if best > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class TypeaheadIndex:
+    """
+    Token index over active game titles and categories.
+    Prefix lookups use a sorted vocabulary + bisect, typo tolerance uses
+    trigram candidates checked with edit distance. Each game holds
+    (record, popularity bonus, token weights); the index is rebuilt
+    incrementally by with_changes() and never mutated after publication.
+    """
+
+    TITLE_WEIGHT = 1.0
+    CATEGORY_WEIGHT = 0.5
+    MAX_EXPANSIONS = 1000
+    MAX_TYPO_CHECKS = 32
+
+    def __init__(self, version, games, postings, vocabulary, trigrams):
+        self.version = version
+        self.games = games            # game_id -> (record, popularity bonus, {token: weight})
+        self.postings = postings      # token -> {game_id: weight}
+        self.vocabulary = vocabulary  # sorted list of tokens
+        self.trigrams = trigrams      # trigram -> set of tokens
+        self._ranked = {}             # token -> game ids terurut (weight + popularitas), diisi saat dipakai
+
+    @staticmethod
+    def _popularity_bonus(sold):
+        return 0.1 * math.log1p(sold)
+
+    @staticmethod
+    def _tokens_for(record):
+        weights = {}
+        for token in tokenize(record.category):
+            weights[token] = max(weights.get(token, 0), TypeaheadIndex.CATEGORY_WEIGHT)
+        for token in tokenize(record.title):
+            weights[token] = TypeaheadIndex.TITLE_WEIGHT
+        return weights
+
+    @classmethod
+    def build(cls, version, records, popularity):
+        games, postings, trigrams = {}, {}, {}
+        for record in records:
+            if not record.is_active:
+                continue
+            tokens = cls._tokens_for(record)
+            games[record.id] = (record, cls._popularity_bonus(popularity.get(record.id, 0)), tokens)
+            for token, weight in tokens.items():
+                postings.setdefault(token, {})[record.id] = weight
+        for token in postings:
+            for gram in _trigrams(token):
+                trigrams.setdefault(gram, set()).add(token)
+        return cls(version, games, postings, sorted(postings), trigrams)
+
+    def with_changes(self, version, changed_records, removed_ids, popularity):
+        """Copy-on-write update for a handful of changed games"""
+        games = dict(self.games)
+        postings = dict(self.postings)
+        trigrams = dict(self.trigrams)
+        vocabulary = self.vocabulary
+        vocabulary_changed = False
+
+        def drop(game_id):
+            nonlocal vocabulary_changed
+            old = games.pop(game_id, None)
+            if old is None:
+                return
+            for token in old[2]:
+                entry = {k: v for k, v in postings.get(token, {}).items() if k != game_id}
+                if entry:
+                    postings[token] = entry
+                else:
+                    postings.pop(token, None)
+                    vocabulary_changed = True
+                    for gram in _trigrams(token):
+                        trigrams[gram] = trigrams.get(gram, set()) - {token}
+
+        for game_id in removed_ids:
+            drop(game_id)
+        for record in changed_records:
+            drop(record.id)
+            if not record.is_active:
+                continue
+            tokens = self._tokens_for(record)
+            games[record.id] = (record, self._popularity_bonus(popularity.get(record.id, 0)), tokens)
+            for token, weight in tokens.items():
+                if token not in postings:
+                    vocabulary_changed = True
+                    for gram in _trigrams(token):
+                        trigrams[gram] = trigrams.get(gram, set()) | {token}
+                postings[token] = {**postings.get(token, {}), record.id: weight}
+
+        if vocabulary_changed:
+            vocabulary = sorted(postings)
+        return TypeaheadIndex(version, games, postings, vocabulary, trigrams)
+
+    def _expand(self, term, is_last):
+        """Vocabulary tokens matching a query term -> match quality (0..1]"""
+        matches = {}
+        if term in self.postings:
+            matches[term] = 1.0
+        if is_last:
+            # Kata terakhir masih diketik: cocokkan sebagai prefix
+            i = bisect.bisect_left(self.vocabulary, term)
+            end = min(i + self.MAX_EXPANSIONS, len(self.vocabulary))
+            while i < end and self.vocabulary[i].startswith(term):
+                matches.setdefault(self.vocabulary[i], 0.8)
+                i += 1
+
+        # Typo hanya dicari kalau hasil exact/prefix masih sedikit
+        limit = _max_typos(term)
+        if limit and term not in self.postings and len(matches) < 3:
+            candidates = {}
+            for gram in _trigrams(term):
+                for token in self.trigrams.get(gram, ()):
+                    candidates[token] = candidates.get(token, 0) + 1
+            # q-gram lemma: satu typo merusak paling banyak 3-4 trigram.
+            # Huruf pertama jarang salah ketik, jadi dipakai sebagai filter murah
+            needed = max(len(term) + 1 - 4 * limit, 1)
+            checks = heapq.nlargest(
+                self.MAX_TYPO_CHECKS,
+                ((shared, token) for token, shared in candidates.items()
+                 if shared >= needed and token[0] == term[0] and token not in matches)
+            )
+            for _, token in checks:
+                distance = edit_distance(term, token, limit)
+                if is_last and distance > limit and len(token) > len(term):
+                    distance = edit_distance(term, token[:len(term)], limit)
+                if distance <= limit:
+                    matches[token] = 0.6 - 0.2 * (distance - 1)
+        return matches
+
+    def _ranked_postings(self, token):
+        ranked = self._ranked.get(token)
+        if ranked is None:
+            postings = self.postings[token]
+            ranked = sorted(postings, key=lambda game_id: (postings[game_id], self.games[game_id][1]), reverse=True)
+            self._ranked[token] = ranked
+        return ranked
+
+    def search(self, query, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        expansions = [self._expand(term, i == len(terms) - 1) for i, term in enumerate(terms)]
+        if not all(expansions):
+            return []
+
+        scores = {}
+        if len(terms) == 1:
+            # Cukup ambil `limit` teratas dari tiap token
+            for token, quality in expansions[0].items():
+                postings = self.postings[token]
+                for game_id in self._ranked_postings(token)[:limit]:
+                    score = quality * postings[game_id]
+                    if score > scores.get(game_id, 0):
+                        scores[game_id] = score
+        else:
+            # Mulai dari kata paling selektif, lalu cek kata lain lewat token milik game
+            sizes = [sum(len(self.postings[token]) for token in expansion) for expansion in expansions]
+            driver = sizes.index(min(sizes))
+            for token, quality in expansions[driver].items():
+                for game_id, weight in self.postings[token].items():
+                    score = quality * weight
+                    if score > scores.get(game_id, 0):
+                        scores[game_id] = score
+            for position, expansion in enumerate(expansions):
+                if position == driver:
+                    continue
+                narrowed = {}
+                for game_id, score in scores.items():
+                    tokens = self.games[game_id][2]
+                    best = max((quality * tokens[token] for token, quality in expansion.items() if token in tokens), default=0)
+                    if best:
+                        narrowed[game_id] = score + best
+                scores = narrowed
+                if not scores:
+                    return []
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1] + self.games[item[0]][1], -item[0]))
+        return [self.games[game_id][0] for game_id, _ in top]
+
+class Typeahead:
+    """Keeps a TypeaheadIndex in step with the catalog snapshot, plus an LRU result cache"""
+
+    def __init__(self, cache_size=1024, popularity_ttl=600):
+        self.index = None
+        self.snapshot = None
+        self.popularity = {}
+        self.popularity_loaded_at = 0.0
+        self.popularity_ttl = popularity_ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'full_builds': 0, 'incremental_builds': 0}
+
+    def _load_popularity(self):
+        from app import db
+        from app.models import Order, OrderItem
+        rows = db.session.query(OrderItem.game_id, db.func.sum(OrderItem.quantity)).join(
+            Order, OrderItem.order_id == Order.id
+        ).filter(Order.status == 'paid').group_by(OrderItem.game_id).all()
+        self.popularity = {game_id: int(total or 0) for game_id, total in rows}
+        self.popularity_loaded_at = time.monotonic()
+
+    def _sync(self, snapshot):
+        with self._lock:
+            if self.snapshot is snapshot:
+                return self.index
+            stale = time.monotonic() - self.popularity_loaded_at > self.popularity_ttl
+            changed = removed = ()
+            if self.index is not None and not stale:
+                old = self.snapshot.by_id
+                changed = [r for game_id, r in snapshot.by_id.items() if old.get(game_id) is not r]
+                removed = [game_id for game_id in old if game_id not in snapshot.by_id]
+            # Banyak perubahan (mis. katalog dibangun ulang penuh): lebih murah build dari awal
+            if self.index is None or stale or len(changed) + len(removed) > max(len(snapshot.by_id) // 10, 100):
+                self._load_popularity()
+                self.index = TypeaheadIndex.build(snapshot.version, snapshot.by_id.values(), self.popularity)
+                self.stats['full_builds'] += 1
+            else:
+                self.index = self.index.with_changes(snapshot.version, changed, removed, self.popularity)
+                self.stats['incremental_builds'] += 1
+            self.snapshot = snapshot
+            self._cache.clear()
+            return self.index
+
+    def invalidate(self):
+        """Drop the index and cached results; the next search rebuilds from scratch"""
+        with self._lock:
+            self.index = None
+            self.snapshot = None
+            self.popularity_loaded_at = 0.0
+            self._cache.clear()
+
+    def search(self, snapshot, query, limit, render):
+        """
+        Cached search. render(records) turns records into the response
+        payload; it only runs on a cache miss.
+        """
+        index = self.index if self.snapshot is snapshot else self._sync(snapshot)
+        key = (' '.join(tokenize(query)), limit)
+        with self._lock:
+            if index is self.index and key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._cache[key]
+        result = render(index.search(query, limit))
+        with self._lock:
+            self.stats['misses'] += 1
+            if index is self.index:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+def typeahead_search(query, limit, render):
+    """
+    Search the in-memory typeahead index.
+    Returns: None when the catalog snapshot is not available (caller falls back to the database)
+    """
+    snapshot = current_app.extensions['catalog'].get()
+    if snapshot is None:
+        return None
+    return current_app.extensions['typeahead'].search(snapshot, query, limit, render)
+
+def init_typeahead(app):
+    app.extensions['typeahead'] = Typeahead(
+        cache_size=app.config.get('TYPEAHEAD_CACHE_SIZE', 1024),
+        popularity_ttl=app.config.get('TYPEAHEAD_POPULARITY_TTL', 600)
+    )
@@ -0,0 +1,141 @@
+from app import db
+from app.models import Game, Order, UserLibrary
+from app.utils.sales_utils import apply_orders_sales
+from app.utils.stock_utils import release_stock
+from sqlalchemy import select, update
+from sqlalchemy.orm import load_only, selectinload
+from datetime import datetime
+import secrets
+import time
+
+ACTIONS = {'approve': 'paid', 'reject': 'cancelled'}
+
+def generate_access_code():
+    """Generate unique access code for cloud code sharing"""
+    return secrets.token_hex(8).upper()
+
+def library_entry(user_id, game):
+    """Access info for a new UserLibrary row, berdasarkan share method game"""
+    entry = {'user_id': user_id, 'game_id': game.id,
+             'access_code': None, 'account_email': None, 'account_password': None}
+    if game.share_method == 'cloud_code':
+        entry['access_code'] = generate_access_code()
+    elif game.share_method == 'account':
+        entry['account_email'] = game.account_email
+        entry['account_password'] = game.account_password
+    return entry
+
+def _claim_pending(order_ids, status, now):
+    """
+    Move the still-pending orders to status. The WHERE on status means two
+    admins working the same queue never process an order twice.
+    Returns: list of order ids claimed by this transaction
+    """
+    stmt = update(Order).where(
+        Order.id.in_(order_ids),
+        Order.status == 'pending'
+    ).values(status=status, updated_at=now).execution_options(synchronize_session=False)
+
+    if db.engine.dialect.update_returning:
+        return [row[0] for row in db.session.execute(stmt.returning(Order.id))]
+
+    # Fallback tanpa RETURNING: klaim satu per satu
+    claimed = []
+    for order_id in order_ids:
+        single = update(Order).where(
+            Order.id == order_id,
+            Order.status == 'pending'
+        ).values(status=status, updated_at=now).execution_options(synchronize_session=False)
+        if db.session.execute(single).rowcount == 1:
+            claimed.append(order_id)
+    return claimed
+
+def grant_library(orders):
+    """
+    Add the games of approved orders to the buyers' libraries: one query
+    for the games, one for rows users already own, one executemany insert.
+    Returns: number of library rows added
+    """
+    game_ids = {item.game_id for order in orders for item in order.items}
+    user_ids = {order.user_id for order in orders}
+    if not game_ids:
+        return 0
+
+    games = {game.id: game for game in Game.query.options(load_only(
+        Game.id, Game.share_method, Game.account_email, Game.account_password
+    )).filter(Game.id.in_(game_ids))}
+    owned = set(db.session.execute(
+        select(UserLibrary.user_id, UserLibrary.game_id)
+        .where(UserLibrary.user_id.in_(user_ids), UserLibrary.game_id.in_(game_ids))
+    ).tuples())
+
+    rows = []
+    now = datetime.utcnow()
+    for order in orders:
+        for item in order.items:
+            key = (order.user_id, item.game_id)
+            game = games.get(item.game_id)
+            if key in owned or game is None:
+                continue
+            owned.add(key)
+            rows.append({**library_entry(order.user_id, game), 'purchased_at': now, 'download_count': 0})
+    if rows:
+        db.session.execute(UserLibrary.__table__.insert(), rows)
+    return len(rows)
+
+def verify_orders(order_ids, action):
+    """
+    Approve or reject many pending orders in one transaction.
+    Approve: orders become paid, games are added to the libraries and the
+    sales rollups are updated. Reject: orders become cancelled and their
+    stock is returned with one set-based UPDATE.
+    Orders that are no longer pending are skipped and reported.
+    Returns: dict with 'results' (order_id, result, status), counts and 'elapsed'
+    """
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown action: {action}')
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return {'results': [], 'processed': 0, 'skipped': 0, 'library_rows': 0, 'elapsed': 0.0}
+
+    library_rows = 0
+    try:
+        claimed = _claim_pending(order_ids, ACTIONS[action], now)
+        orders = Order.query.options(selectinload(Order.items)).filter(Order.id.in_(claimed)).all() if claimed else []
+
+        if action == 'approve':
+            library_rows = grant_library(orders)
+            # Dari pending ke paid: rollup penjualan ikut transaksi yang sama
+            apply_orders_sales(orders, 1)
+        else:
+            release_stock([(item.game_id, item.quantity) for order in orders for item in order.items])
+
+        done = set(claimed)
+        unclaimed = [order_id for order_id in order_ids if order_id not in done]
+        statuses = dict(db.session.execute(
+            select(Order.id, Order.status).where(Order.id.in_(unclaimed))
+        ).tuples().all()) if unclaimed else {}
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    results = []
+    for order_id in order_ids:
+        if order_id in done:
+            results.append({'order_id': order_id, 'result': 'approved' if action == 'approve' else 'rejected',
+                            'status': ACTIONS[action]})
+        elif order_id in statuses:
+            results.append({'order_id': order_id, 'result': 'skipped', 'status': statuses[order_id]})
+        else:
+            results.append({'order_id': order_id, 'result': 'not_found', 'status': None})
+
+    return {
+        'results': results,
+        'processed': len(done),
+        'skipped': len(order_ids) - len(done),
+        'library_rows': library_rows,
+        'elapsed': time.perf_counter() - started,
+    }
@@ -10,13 +10,21 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Cloudinary Config
-    CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME', 'dzfkklsza')
-    CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY', '588474134734416')
-    CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET', '9c12YJe5rZSYSg7zROQuvmVZ7mg')
+    CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
+    CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
+    CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
+    
+    # Media Storage ('cloudinary', 'local' or 's3'; local disk when Cloudinary is not configured)
+    MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'cloudinary' if CLOUDINARY_CLOUD_NAME else 'local')
     
     # Session Config
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
+    # Pending Order Expiry
+    PENDING_ORDER_TTL_MINUTES = int(os.environ.get('PENDING_ORDER_TTL_MINUTES', 24 * 60))
+    ORDER_SWEEP_INTERVAL = int(os.environ.get('ORDER_SWEEP_INTERVAL', 0))  # seconds, 0 = disabled
+    ORDER_SWEEP_BATCH_SIZE = int(os.environ.get('ORDER_SWEEP_BATCH_SIZE', 500))
+    
     # Upload Config
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'pdf'}
@@ -0,0 +1,40 @@
+"""media blob index
+
+Content-addressed index of stored media (key = folder/sha256), used to
+skip re-uploading identical files and to garbage-collect unreferenced
+blobs. A new table, like media_job.
+
+Revision ID: 3a6c1f8e2b47
+Revises: e5b7c3a90f12
+Create Date: 2026-10-17 13:05:52
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a6c1f8e2b47'
+down_revision = 'e5b7c3a90f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'media_blob' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'media_blob',
+            sa.Column('key', sa.String(length=200), nullable=False),
+            sa.Column('backend', sa.String(length=20), nullable=False),
+            sa.Column('url', sa.String(length=500), nullable=False),
+            sa.Column('content_type', sa.String(length=50), nullable=True),
+            sa.Column('size', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_used_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key')
+        )
+
+
+def downgrade():
+    if 'media_blob' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('media_blob')
@@ -0,0 +1,53 @@
+"""daily sales rollups
+
+Per-day sales per game and per payment method, maintained by
+verify_payment. Run `flask backfill-sales` once after upgrading to fill
+them from existing paid orders.
+
+Revision ID: 4fa6f099a19d
+Revises: be7f6f7ec8e6
+Create Date: 2026-10-17 05:02:11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4fa6f099a19d'
+down_revision = 'be7f6f7ec8e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'daily_game_sales' not in tables:
+        op.create_table(
+            'daily_game_sales',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('game_id', sa.Integer(), sa.ForeignKey('game.id'), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('orders', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'game_id')
+        )
+    if 'daily_payment_sales' not in tables:
+        op.create_table(
+            'daily_payment_sales',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('payment_method', sa.String(length=50), nullable=False),
+            sa.Column('orders', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'payment_method')
+        )
+
+
+def downgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'daily_payment_sales' in tables:
+        op.drop_table('daily_payment_sales')
+    if 'daily_game_sales' in tables:
+        op.drop_table('daily_game_sales')
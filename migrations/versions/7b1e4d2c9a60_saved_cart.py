@@ -0,0 +1,35 @@
+"""saved cart
+
+Server-side cart store (CART_STORE='database'), keyed by 'user:<id>' or
+'anon:<session id>'. A new table, like media_job.
+
+Revision ID: 7b1e4d2c9a60
+Revises: 3a6c1f8e2b47
+Create Date: 2026-10-17 15:20:11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e4d2c9a60'
+down_revision = '3a6c1f8e2b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'saved_cart' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'saved_cart',
+            sa.Column('key', sa.String(length=64), nullable=False),
+            sa.Column('items', sa.Text(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key')
+        )
+
+
+def downgrade():
+    if 'saved_cart' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('saved_cart')
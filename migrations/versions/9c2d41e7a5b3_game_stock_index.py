@@ -0,0 +1,35 @@
+"""game stock index
+
+Index on game.stock for the admin dashboard stock alerts, which read
+the few lowest-stock games with a LIMIT instead of the whole table.
+
+Revision ID: 9c2d41e7a5b3
+Revises: 4fa6f099a19d
+Create Date: 2026-10-17 05:31:40
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2d41e7a5b3'
+down_revision = '4fa6f099a19d'
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'game' in inspector.get_table_names() and 'ix_game_stock' not in _existing_indexes(inspector, 'game'):
+        op.create_index('ix_game_stock', 'game', ['stock'], unique=False)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'game' in inspector.get_table_names() and 'ix_game_stock' in _existing_indexes(inspector, 'game'):
+        op.drop_index('ix_game_stock', table_name='game')
@@ -0,0 +1,70 @@
+"""hot path indexes
+
+Composite and unique indexes for the storefront, admin and ownership
+queries. Tables were historically created with db.create_all(), so this
+first revision only adds what is missing: on a database created from
+the current models it is a no-op and can simply be applied (or stamped).
+
+Revision ID: be7f6f7ec8e6
+Revises:
+Create Date: 2026-10-17 04:46:34
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'be7f6f7ec8e6'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns, unique)
+INDEXES = [
+    ('user_library', 'uq_user_library_user_game', ['user_id', 'game_id'], True),
+    ('order', 'ix_order_created_at_id', ['created_at', 'id'], False),
+    ('order', 'ix_order_status_created_at_id', ['status', 'created_at', 'id'], False),
+    ('order', 'ix_order_user_created_at', ['user_id', 'created_at'], False),
+    ('order_item', 'ix_order_item_order_id', ['order_id'], False),
+    ('order_item', 'ix_order_item_game_id', ['game_id'], False),
+    ('game', 'ix_game_active_category_created_at', ['is_active', 'category', 'created_at'], False),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if 'user_library' in tables and 'uq_user_library_user_game' not in _existing_indexes(inspector, 'user_library'):
+        # Duplikat lama (user, game) harus dibuang dulu sebelum index unik;
+        # simpan baris pertama, download_count digabung ke baris itu
+        op.execute(
+            "UPDATE user_library SET download_count = ("
+            "SELECT SUM(COALESCE(d.download_count, 0)) FROM user_library d "
+            "WHERE d.user_id = user_library.user_id AND d.game_id = user_library.game_id) "
+            "WHERE id IN (SELECT MIN(id) FROM user_library GROUP BY user_id, game_id HAVING COUNT(*) > 1)"
+        )
+        op.execute(
+            "DELETE FROM user_library WHERE id NOT IN ("
+            "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM user_library GROUP BY user_id, game_id) keep)"
+        )
+
+    for table, name, columns, unique in INDEXES:
+        if table in tables and name not in _existing_indexes(inspector, table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns, unique in reversed(INDEXES):
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
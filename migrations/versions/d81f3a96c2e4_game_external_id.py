@@ -0,0 +1,36 @@
+"""game external id
+
+Supplier identifiers used by the bulk catalog import to match rows to
+existing games. Kept in their own table so databases created with
+db.create_all() pick it up without altering game.
+
+Revision ID: d81f3a96c2e4
+Revises: 9c2d41e7a5b3
+Create Date: 2026-10-17 06:12:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f3a96c2e4'
+down_revision = '9c2d41e7a5b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'game_external_id' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'game_external_id',
+            sa.Column('game_id', sa.Integer(), sa.ForeignKey('game.id'), nullable=False),
+            sa.Column('external_id', sa.String(length=64), nullable=False),
+            sa.PrimaryKeyConstraint('game_id'),
+            sa.UniqueConstraint('external_id')
+        )
+
+
+def downgrade():
+    if 'game_external_id' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('game_external_id')
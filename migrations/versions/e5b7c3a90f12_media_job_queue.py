@@ -0,0 +1,55 @@
+"""media job queue
+
+Durable queue for Cloudinary uploads and deletes, worked off outside the
+request by the media worker. A new table, so databases created with
+db.create_all() pick it up without altering existing tables.
+
+Revision ID: e5b7c3a90f12
+Revises: d81f3a96c2e4
+Create Date: 2026-10-17 09:41:27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c3a90f12'
+down_revision = 'd81f3a96c2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'media_job' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'media_job',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('action', sa.String(length=20), nullable=False),
+            sa.Column('preset', sa.String(length=20), nullable=True),
+            sa.Column('folder', sa.String(length=200), nullable=True),
+            sa.Column('scratch_path', sa.String(length=500), nullable=True),
+            sa.Column('host', sa.String(length=100), nullable=True),
+            sa.Column('target_type', sa.String(length=30), nullable=True),
+            sa.Column('target_id', sa.String(length=36), nullable=True),
+            sa.Column('public_id', sa.String(length=200), nullable=True),
+            sa.Column('url', sa.String(length=500), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('max_attempts', sa.Integer(), nullable=False),
+            sa.Column('run_after', sa.DateTime(), nullable=False),
+            sa.Column('locked_at', sa.DateTime(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_media_job_status_run_after', 'media_job', ['status', 'run_after'])
+        op.create_index('ix_media_job_target', 'media_job', ['target_type', 'target_id'])
+
+
+def downgrade():
+    if 'media_job' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_media_job_target', table_name='media_job')
+        op.drop_index('ix_media_job_status_run_after', table_name='media_job')
+        op.drop_table('media_job')